@@ -12,15 +12,32 @@ INSTRUCTIONS:
 
 import ccxt
 import time
-import math
 import os
 import sys
 from datetime import datetime
 from collections import deque
-import statistics
 import logging
 from typing import Dict, Tuple, Optional, Any
 
+from market_data import OrderBookStream
+from order_book import L2Book, FAIR_PRICES
+from volatility import VolatilityEstimator
+from quote_manager import QuoteManager, QuoteLadder
+from order_entry import OrderEntry
+from recorder import MarketDataRecorder
+from balance import BalanceService
+from fill_ledger import FillLedger
+from order_tracker import OrderTracker
+from metrics import Metrics, TICK_STAGES
+from quote_kernel import QuoteConstants, quote_prices, order_sizes, inverse_step
+from fast_logging import EventLog, start_queued_logging
+from rate_limit import RateLimiter
+from venues import venue_for
+from market_cache import MarketCache
+from checkpoint import StateCheckpoint, WarmState
+from profiler import Profiler
+from global_risk import GlobalRisk
+
 # ============================================================================
 # CONFIGURATION - EDIT THESE VALUES
 # ============================================================================
@@ -42,10 +59,81 @@ K = 5.0  # Market impact parameter (k) - For fill intensity modeling
 ALPHA = 0.001  # Inventory penalty parameter (α) - Separate from gamma
 TIME_HORIZON = 0.1  # Time horizon in hours (6 minutes) - rolling calculation
 SIGMA_LOOKBACK = 50  # Price history length for volatility (matches server)
+VOLATILITY_MODE = "window"  # "window" (rolling stdev over SIGMA_LOOKBACK) or "ewma"
+VOLATILITY_HALFLIFE = 60.0  # EWMA half-life in seconds (ewma mode only)
 UPDATE_FREQUENCY = 1.0  # Update quotes every 1 second (ultra aggressive)
+MIN_SPREAD_BPS = 2.0  # Minimum spread (matches server)
+MAX_SPREAD_BPS = 20.0  # Maximum spread (matches server)
+MIN_QUOTE_DISTANCE_BPS = 5.0  # Each quote at least this far from mid (matches server)
+
+# Market Data
+MARKET_DATA_MODE = "rest"  # "rest" polls every tick, "websocket" streams the book (REST fallback)
+MARKET_DATA_WS_URL = ""  # Optional custom feed, e.g. ws://127.0.0.1:8765 from market_data.py replay
+STREAM_MAX_AGE = 5.0  # Seconds without a book update before falling back to REST
+MIN_UPDATE_INTERVAL = 0.2  # Minimum seconds between requotes when woken by the stream
+FAIR_PRICE = "mid"  # Quote around "mid", "microprice" (top sizes) or "weighted_mid" (top FAIR_PRICE_LEVELS levels)
+FAIR_PRICE_LEVELS = 5  # Book levels per side used by weighted_mid
+
+# Quote Maintenance
+QUOTE_TICK_TOLERANCE = 1  # Keep a resting order if it is within this many ticks of the new quote
+QUOTE_BPS_TOLERANCE = 0.5  # ...or within this many basis points, whichever is wider
+QUOTE_SIZE_TOLERANCE = 0.1  # ...and its size is within this fraction of the new size
+USE_AMEND = True  # Amend with edit_order instead of cancel + replace when supported
+POST_ONLY = False  # Send quotes as post-only so they never take liquidity
+QUOTE_LEVELS = 1  # Orders per side; above 1 quotes a ladder through batch create/cancel requests
+LEVEL_SPACING = 1.0  # Gap between ladder levels as a multiple of the A-S half spread
+LEVEL_SIZE_STEP = 1.0  # Size multiplier per level away from the inside quote
+ORDER_WORKERS = 4  # Worker threads sending bid, ask and cancels concurrently
+ORDER_DEADLINE = 0.8  # Seconds to wait for order requests each tick before moving on
+
+# Market Data Recording
+RECORD_MARKET_DATA = False  # Record books, quotes and fills for backtesting (see recorder.py)
+RECORD_DIRECTORY = "data"  # One sub-directory per symbol and UTC day
+RECORD_LEVELS = 5  # Book levels per side (5 levels at 10 Hz is ~76 MB/day)
+
+# Balance
+BALANCE_TTL = 30.0  # Seconds before the cached balance is refreshed over REST
+BALANCE_STREAM = True  # Keep the balance current from the private account stream
+
+# Fills
+FILL_STREAM = True  # Receive our fills from the private trade stream (REST backfills after reconnects)
+FILL_POLL_INTERVAL = 5.0  # Seconds between incremental fetch_my_trades polls without the stream
+POSITION_RECONCILE_INTERVAL = 60.0  # Seconds between fetch_positions checks of the inventory
+
+# Startup
+MARKET_CACHE_DIR = ""  # Cache market metadata here, e.g. "cache", so restarts skip the full market download ("" disables)
+MARKET_CACHE_TTL = 86400.0  # Seconds before the cached markets are reloaded at startup
+CHECKPOINT_DIR = ""  # Checkpoint inventory, prices, volatility and horizon here, e.g. "state", to resume after restarts ("" disables)
+CHECKPOINT_INTERVAL = 1.0  # Seconds between checkpoints
+CHECKPOINT_MAX_AGE = 300.0  # Checkpoints older than this at startup are ignored
+
+# Orders
+ORDER_STREAM = True  # Track our orders from the private order stream instead of polling fetch_open_orders
+
+# Metrics
+METRICS_PORT = 0  # Local Prometheus endpoint, e.g. 9108 for http://127.0.0.1:9108/metrics (0 disables)
+METRICS_SUMMARY_INTERVAL = 60.0  # Seconds between latency summary log lines
+
+# Rate Limiting
+RATE_LIMITER = True  # Schedule requests by priority (cancels first) against Bybit's per-endpoint limits
+RATE_LIMIT_HEADROOM = 0.9  # Fraction of the documented limits to use
+
+# Logging
+LOG_MODE = "sync"  # "sync" writes log lines inline, "queued" writes them from a background thread
+EVENT_LOG_FILE = ""  # JSON-lines log of order and fill events, e.g. "events.jsonl" ("" disables)
+STATUS_INTERVAL = 5.0  # Seconds between status displays (0 shows one every tick)
+
+# Profiling
+PROFILE_DIR = "profiles"  # Stack samples (flamegraph input) and top allocations are written here
+PROFILE_TICKS = 200  # Ticks per profiling session, started with --profile or kill -USR1 <pid>
+PROFILE_INTERVAL = 0.005  # Seconds between stack samples
+PROFILE_SIGNAL = False  # Start a session on SIGUSR1 without restarting
 
 # Risk Management (Server-tuned)
 MAX_INVENTORY_USD = 200.0  # Maximum inventory in USD
+GLOBAL_RISK_TABLE = ""  # Risk table shared with other bots or a supervisor, e.g. "/dev/shm/roboquant-risk" ("" disables)
+GLOBAL_MAX_INVENTORY_USD = 1000.0  # Gross inventory of every bot on the table (used if this bot creates it)
+GLOBAL_MAX_LOSS_USD = 100.0  # Combined loss of every bot on the table (used if this bot creates it)
 
 # ============================================================================
 # BOT CODE - NO NEED TO EDIT BELOW THIS LINE
@@ -67,19 +155,46 @@ class StandaloneMarketMaker:
     
     def __init__(self):
         """Initialize the market maker with hardcoded configuration"""
+        self.started = time.perf_counter()
+        self.startup: Dict[str, float] = {}  # Seconds from startup to each milestone
         self.exchange = None
+        self.market_cache = None
+        self.venue = venue_for('bybit')
         self.symbol = SYMBOL
         self.price_history = deque(maxlen=SIGMA_LOOKBACK)
         self.inventory = 0
         self.pnl = 0
         self.trades_count = 0
         self.current_orders = {'bid': None, 'ask': None}
+        self.quote_manager = None
+        self.order_entry = None
+        self.recorder = None
+        self.balance = None
+        self.fill_ledger = None
+        self.order_tracker = None
+        self.checkpoint = None
+        self.global_risk = None
+        self.metrics = None
+        self.events = None
+        self.rate_limiter = None
+        self.profiler = Profiler(PROFILE_DIR, ticks=PROFILE_TICKS, interval=PROFILE_INTERVAL)
+        self.last_status = 0.0
+        self.stage_latency = {}
+        self.constants = None
         self.volatility = 0.01
+        self.volatility_estimator = VolatilityEstimator(
+            lookback=SIGMA_LOOKBACK, mode=VOLATILITY_MODE,
+            halflife=VOLATILITY_HALFLIFE, initial=self.volatility
+        )
         self.running = False
-        self.last_trade_check = 0
+        self.book_stream = None
+        self.book = L2Book()  # Filled from REST when there is no fresh stream
+        self.book_version = 0
+        self.using_rest_fallback = False
         
         # Timing - use strategy start time instead of wall clock (matches server)
-        self.start_time = time.time()
+        self.clock = time.time  # Replaced by a simulated clock when backtesting
+        self.start_time = self.clock()
         
         # Validate configuration
         self._validate_config()
@@ -94,6 +209,10 @@ class StandaloneMarketMaker:
             logger.error("Please set your actual Bybit API_SECRET in the configuration section")
             sys.exit(1)
             
+        if FAIR_PRICE not in FAIR_PRICES:
+            logger.error(f"FAIR_PRICE must be one of {', '.join(FAIR_PRICES)}")
+            sys.exit(1)
+            
         logger.info("Configuration validated successfully")
     
     def initialize_exchange(self) -> None:
@@ -114,14 +233,23 @@ class StandaloneMarketMaker:
         
         # Initialize Bybit exchange
         self.exchange = ccxt.bybit(exchange_config)
+        self.venue.resolve(self.exchange)
         
-        # Load markets
+        # Load markets: just SYMBOL from the cache when it is fresh (the full list is refreshed
+        # in the background), else everything from the exchange
+        self.market_cache = MarketCache(MARKET_CACHE_DIR, ttl=MARKET_CACHE_TTL) if MARKET_CACHE_DIR else None
         try:
-            self.exchange.load_markets()
+            if self.market_cache is not None and self.market_cache.load(self.exchange, [self.symbol]):
+                self.market_cache.refresh(self.exchange, exchange_config, [self.symbol])
+            else:
+                self.exchange.load_markets()
+                if self.market_cache is not None:
+                    self.market_cache.save(self.exchange)
             logger.info("Successfully connected to Bybit")
         except Exception as e:
             logger.error(f"Failed to connect to Bybit: {e}")
             raise
+        self.startup['markets'] = time.perf_counter() - self.started
     
     def validate_symbol(self) -> None:
         """Validate and set the trading symbol"""
@@ -144,127 +272,112 @@ class StandaloneMarketMaker:
         except Exception as e:
             logger.warning(f"Could not set leverage: {e}")
     
+    def start_market_data(self) -> None:
+        """Start the WebSocket order book stream if enabled"""
+        if MARKET_DATA_MODE != 'websocket':
+            logger.info("Market data mode: REST polling")
+            return
+        
+        self.book_stream = OrderBookStream(
+            self.symbol,
+            exchange_id='bybit',
+            exchange_config={'options': {'defaultType': 'future'}, 'sandbox': SANDBOX_MODE,
+                             'markets': self.quoted_markets()},
+            ws_url=MARKET_DATA_WS_URL or None
+        )
+        self.book_stream.start()
+        logger.info("Market data mode: WebSocket stream with REST fallback")
+        
+        if not self.book_stream.wait_for_update(STREAM_MAX_AGE):
+            logger.warning("No order book from stream yet, using REST until it arrives")
+    
+    def quoted_markets(self) -> Dict[str, Any]:
+        """Markets for stream clients to start from instead of downloading the full list again"""
+        return {self.symbol: self.exchange.markets[self.symbol]}
+    
+    def read_order_book(self) -> Optional[Tuple[float, float, float]]:
+        """Best bid, best ask and fair price from the stream, or over REST if the stream is stale"""
+        if self.book_stream is not None:
+            top = self.book_stream.read(FAIR_PRICE, FAIR_PRICE_LEVELS, STREAM_MAX_AGE)
+            if top is not None:
+                if self.using_rest_fallback:
+                    logger.info("Order book stream recovered")
+                    self.using_rest_fallback = False
+                self.book_version = top[3]
+                return top[:3]
+            if not self.using_rest_fallback:
+                logger.warning("Order book stream stale, falling back to REST")
+                self.using_rest_fallback = True
+        
+        orderbook = self.exchange.fetch_order_book(self.symbol)
+        if not orderbook['bids'] or not orderbook['asks']:
+            return None
+        self.book.apply_snapshot(orderbook['bids'], orderbook['asks'])
+        return self.book.top(FAIR_PRICE, FAIR_PRICE_LEVELS)
+    
+    def book_levels(self) -> Dict[str, Any]:
+        """Top levels of the book the last tick read, for the recorder"""
+        if self.book_stream is not None and not self.using_rest_fallback:
+            return self.book_stream.get_order_book() or self.book.as_dict()
+        return self.book.as_dict()
+    
+    def wait_for_next_tick(self, start_time: float) -> None:
+        """Sleep until the next update, waking early when the streamed top of book moves"""
+        elapsed = time.time() - start_time
+        sleep_time = max(0, UPDATE_FREQUENCY - elapsed)
+        
+        if self.book_stream is None or self.using_rest_fallback:
+            time.sleep(sleep_time)
+            return
+        
+        # Never requote faster than MIN_UPDATE_INTERVAL, however busy the book is
+        time.sleep(min(max(0, MIN_UPDATE_INTERVAL - elapsed), sleep_time))
+        remaining = UPDATE_FREQUENCY - (time.time() - start_time)
+        self.book_stream.wait_for_update(remaining, self.book_version)
+    
     def calculate_volatility(self) -> float:
-        """Calculate realized volatility from price history"""
-        if len(self.price_history) < 2:
-            return self.volatility
-        
-        returns = []
-        for i in range(1, len(self.price_history)):
-            ret = math.log(self.price_history[i] / self.price_history[i-1])
-            returns.append(ret)
-        
-        if len(returns) > 1:
-            self.volatility = statistics.stdev(returns) * math.sqrt(3600)
-            self.volatility = max(self.volatility, 0.001)
-        
+        """Return the current realized volatility (updated in O(1) per tick)"""
+        self.volatility = self.volatility_estimator.volatility
         return self.volatility
     
-    def calculate_reservation_price(self, mid_price: float) -> float:
-        """Calculate reservation price with proper inventory penalty (matches server)"""
-        sigma = self.calculate_volatility()
-        time_remaining = self.get_time_remaining()
-        
-        # Correct A-S formula: r = m - α * q * σ² * T
-        # Note: Using alpha (inventory penalty), not gamma (risk aversion)
-        inventory_penalty = ALPHA * self.inventory * sigma**2 * time_remaining
-        reservation_price = mid_price - inventory_penalty
-        
-        return reservation_price
-    
     def get_time_remaining(self) -> float:
         """Get time remaining in current strategy horizon (matches server)"""
         # Use rolling time horizon from strategy start, not wall clock
-        elapsed_hours = (time.time() - self.start_time) / 3600
+        elapsed_hours = (self.clock() - self.start_time) / 3600
         cycle_position = elapsed_hours % TIME_HORIZON
         time_remaining = TIME_HORIZON - cycle_position
         return max(time_remaining, 0.01)  # Minimum time remaining
     
-    def calculate_optimal_spread(self, mid_price: float) -> float:
-        """Calculate optimal bid-ask spread using Avellaneda-Stoikov (matches server)"""
-        sigma = self.calculate_volatility()
-        time_remaining = self.get_time_remaining()
-        
-        # Correct A-S optimal spread: δ* = γσ²T + (2/γ)ln(1 + γ/k)
-        risk_term = GAMMA * sigma**2 * time_remaining
-        market_impact_term = (2 / GAMMA) * math.log(1 + GAMMA / K)
-        
-        spread = risk_term + market_impact_term
-        
-        # Server's constraints: minimum spread (wider than before)
-        min_spread_bps = 2.0  # 2 basis points minimum
-        min_spread = (min_spread_bps / 10000) * mid_price
-        spread = max(spread * mid_price, min_spread)
-        
-        # Server's maximum spread constraint (CRITICAL!)
-        max_spread_bps = 20.0  # 20 basis points maximum
-        max_spread = (max_spread_bps / 10000) * mid_price
-        spread = min(spread, max_spread)
-        
-        return spread
+    def load_quote_constants(self) -> None:
+        """Precompute the quote kernel constants (server's spread and distance limits)"""
+        market = self.exchange.markets[self.symbol]
+        self.constants = QuoteConstants(
+            gamma=GAMMA, k=K,
+            inventory_risk=ALPHA,  # Inventory penalty uses alpha, not gamma
+            min_spread=MIN_SPREAD_BPS / 10000,
+            max_spread=MAX_SPREAD_BPS / 10000,
+            min_distance=MIN_QUOTE_DISTANCE_BPS / 10000,
+            inverse_tick=inverse_step(market['precision']['price'] or 0),
+            inverse_lot=inverse_step(market['precision']['amount'] or 0),
+            max_inventory=MAX_INVENTORY_USD,
+            min_amount=market['limits']['amount']['min'] or 0
+        )
     
     def calculate_quote_prices(self, mid_price: float) -> Tuple[float, float]:
         """Calculate optimal bid and ask prices (matches server exactly)"""
-        reservation_price = self.calculate_reservation_price(mid_price)
-        spread = self.calculate_optimal_spread(mid_price)
-        
-        # Calculate base bid and ask around reservation price
-        bid_price = reservation_price - spread / 2
-        ask_price = reservation_price + spread / 2
-        
-        # Server's exact quote distance constraint (CRITICAL!)
-        min_spread_from_mid = mid_price * 0.0005  # 5 bps minimum from mid (not 10bps!)
-        bid_price = min(bid_price, mid_price - min_spread_from_mid)
-        ask_price = max(ask_price, mid_price + min_spread_from_mid)
-        
-        # Round to exchange precision
-        market = self.exchange.markets[self.symbol]
-        price_precision = market['precision']['price'] or 0
-        
-        if isinstance(price_precision, int):
-            bid_price = round(bid_price, price_precision)
-            ask_price = round(ask_price, price_precision)
-        else:
-            # Handle tick size
-            tick_size = float(price_precision)
-            bid_price = round(bid_price / tick_size) * tick_size
-            ask_price = round(ask_price / tick_size) * tick_size
-        
-        return bid_price, ask_price
+        # r = m - α * q * σ² * T, δ* = γσ²T + (2/γ)ln(1 + γ/k), clamped to the server's limits
+        return quote_prices(mid_price, self.inventory, self.calculate_volatility(),
+                            self.get_time_remaining(), self.constants)
     
     def calculate_position_size(self, price: float) -> float:
         """Calculate position size based on configuration"""
-        market = self.exchange.markets[self.symbol]
-        min_size = market['limits']['amount']['min'] or 0
-        
-        # Use fixed order size (matches server behavior)
-        base_size = ORDER_SIZE_FIXED
-        
-        # Inventory adjustment - reduce size when inventory is high
-        inventory_value = abs(self.inventory * price)
-        
-        if inventory_value > MAX_INVENTORY_USD * 0.7:
-            size_multiplier = 0.5
-        elif inventory_value > MAX_INVENTORY_USD * 0.5:
-            size_multiplier = 0.75
-        else:
-            size_multiplier = 1.0
-        
-        size = base_size * size_multiplier
-        
-        # Round to exchange precision
-        amount_precision = market['precision']['amount'] or 0
-        if isinstance(amount_precision, int):
-            size = round(size, amount_precision)
-        else:
-            # Handle lot size
-            lot_size = float(amount_precision)
-            size = round(size / lot_size) * lot_size
-        
-        return max(size, min_size)
+        # Use fixed order size (matches server behavior), reduced when inventory is high
+        return order_sizes(price, self.inventory, ORDER_SIZE_FIXED, self.constants)
     
     def get_available_balance(self) -> float:
-        """Get available balance in USDT"""
+        """Get available balance in USDT, from the balance service cache when running"""
+        if self.balance is not None:
+            return self.balance.get()
         try:
             balance = self.exchange.fetch_balance()
             return balance.get('USDT', {}).get('free', 0)
@@ -272,70 +385,70 @@ class StandaloneMarketMaker:
             logger.error(f"Error fetching balance: {e}")
             return 0
     
+    def cancel_orders(self, order_ids: list) -> list:
+        """Cancel orders by ID, concurrently when the order entry pool is running"""
+        def cancel(order_id):
+            try:
+                return self.exchange.cancel_order(order_id, self.symbol)
+            except Exception as e:
+                return e
+        
+        if self.order_entry is not None:
+            return self.order_entry.map(cancel, order_ids)
+        return [cancel(order_id) for order_id in order_ids]
+    
     def cancel_all_orders(self) -> None:
         """Cancel all open orders"""
         try:
-            if hasattr(self.exchange, 'cancel_all_orders'):
-                self.exchange.cancel_all_orders(self.symbol)
-            else:
-                open_orders = self.exchange.fetch_open_orders(self.symbol)
-                for order in open_orders:
-                    self.exchange.cancel_order(order['id'], self.symbol)
+            resting = self.order_tracker.resting_ids() if self.order_tracker is not None else None
+            self.venue.cancel_all(self.exchange, self.symbol, self.cancel_orders, resting)
             
             self.current_orders = {'bid': None, 'ask': None}
+            if self.order_tracker is not None:
+                self.order_tracker.on_cancel_all()
+            if self.events is not None:
+                self.events.record('cancel_all', symbol=self.symbol)
         except Exception as e:
             logger.error(f"Error cancelling orders: {e}")
     
     def place_orders(self, bid_price: float, ask_price: float, size: float) -> None:
-        """Place bid and ask orders"""
-        self.cancel_all_orders()
-        
-        try:
-            # Place bid order
-            bid_order = self.exchange.create_limit_order(
-                self.symbol, 'buy', size, bid_price
-            )
-            self.current_orders['bid'] = bid_order
-            logger.info(f"Bid placed: {size} @ {bid_price}")
-        except Exception as e:
-            logger.error(f"Error placing bid: {e}")
-        
-        try:
-            # Place ask order
-            ask_order = self.exchange.create_limit_order(
-                self.symbol, 'sell', size, ask_price
-            )
-            self.current_orders['ask'] = ask_order
-            logger.info(f"Ask placed: {size} @ {ask_price}")
-        except Exception as e:
-            logger.error(f"Error placing ask: {e}")
+        """Bring the resting bid and ask in line with the new quotes"""
+        self.current_orders = self.quote_manager.update(self.current_orders, bid_price, ask_price, size)
     
     def update_inventory(self) -> None:
-        """Update inventory from recent trades"""
+        """Update inventory from new fills and reconcile it with the exchange position"""
         try:
-            # Only check trades every 30 seconds to avoid rate limits
-            current_time = time.time()
-            if current_time - self.last_trade_check < 30:
-                return
-            
-            self.last_trade_check = current_time
-            since = int((current_time - 300) * 1000)  # Last 5 minutes
-            trades = self.exchange.fetch_my_trades(self.symbol, since=since, limit=50)
+            for trade in self.fill_ledger.poll():
+                if trade['side'] == 'buy':
+                    self.inventory += trade['amount']
+                else:
+                    self.inventory -= trade['amount']
+                
+                self.trades_count += 1
+                
+                # Update PnL
+                fee = (trade.get('fee') or {}).get('cost') or 0
+                self.pnl -= fee
+                
+                logger.info(f"Trade: {trade['side']} {trade['amount']} @ {trade['price']}")
+                if self.events is not None:
+                    self.events.record('fill', symbol=self.symbol, id=trade.get('id'), order=trade.get('order'),
+                                       side=trade['side'], price=trade['price'], amount=trade['amount'],
+                                       fee=fee, inventory=self.inventory)
+                if self.recorder is not None:
+                    self.recorder.record_fill(trade)
+                if self.balance is not None:
+                    self.balance.on_fill(trade)
+                if self.order_tracker is not None:
+                    self.order_tracker.on_fill(trade)
+                if self.global_risk is not None:
+                    self.global_risk.on_fill(trade)
             
-            for trade in trades:
-                if trade['timestamp'] > since:
-                    if trade['side'] == 'buy':
-                        self.inventory += trade['amount']
-                    else:
-                        self.inventory -= trade['amount']
-                    
-                    self.trades_count += 1
-                    
-                    # Update PnL
-                    fee = trade.get('fee', {}).get('cost', 0)
-                    self.pnl -= fee
-                    
-                    logger.info(f"Trade: {trade['side']} {trade['amount']} @ {trade['price']}")
+            min_amount = self.exchange.markets[self.symbol]['limits']['amount']['min'] or 0
+            position = self.fill_ledger.check_inventory(self.inventory, max(min_amount / 2, 1e-9))
+            if position is not None:
+                logger.warning(f"Inventory {self.inventory:.3f} differs from exchange position {position:.3f} on two checks, using exchange position")
+                self.inventory = position
         except Exception as e:
             logger.error(f"Error updating inventory: {e}")
     
@@ -349,21 +462,72 @@ class StandaloneMarketMaker:
         # Use dynamic time remaining to match server
         time_remaining = self.get_time_remaining()
         
-        print(f"\n{'='*80}")
-        print(f"ETH: ${mid_price:.2f} | Spread: {spread_bps:.1f}bps | σ: {self.volatility:.3f} | T-rem: {time_remaining:.3f}h")
-        print(f"Inventory: {self.inventory:.3f} ETH (${inventory_value:.2f}) | Target: 0")
-        print(f"Quotes: ${bid_price:.2f} / ${ask_price:.2f} | Size: {size:.3f} ETH")
-        print(f"Stats: {self.trades_count} trades | PnL: ${self.pnl:.2f}")
-        print(f"Balance: ${balance:.2f} USDT | k: {K:.2f} | γ: {GAMMA:.3f}")
+        lines = [
+            f"\n{'='*80}",
+            f"ETH: ${mid_price:.2f} | Spread: {spread_bps:.1f}bps | σ: {self.volatility:.3f} | T-rem: {time_remaining:.3f}h",
+            f"Inventory: {self.inventory:.3f} ETH (${inventory_value:.2f}) | Target: 0",
+            f"Quotes: ${bid_price:.2f} / ${ask_price:.2f} | Size: {size:.3f} ETH",
+            f"Stats: {self.trades_count} trades | PnL: ${self.pnl:.2f}",
+            f"Balance: ${balance:.2f} USDT ({self.balance.describe()}) | k: {K:.2f} | γ: {GAMMA:.3f}",
+            f"Orders: {self.quote_manager.summary()}",
+            f"Order states: {self.order_tracker.summary()}"
+        ]
+        if self.rate_limiter is not None:
+            lines.append(f"Rate limit: {self.rate_limiter.describe()}")
         
         # Risk indicators
         inventory_percent = abs(inventory_value) / MAX_INVENTORY_USD * 100
         if inventory_percent > 70:
-            print(f"⚠️  HIGH INVENTORY RISK: {inventory_percent:.1f}%")
+            lines.append(f"⚠️  HIGH INVENTORY RISK: {inventory_percent:.1f}%")
         elif inventory_percent > 50:
-            print(f"⚡ MEDIUM INVENTORY: {inventory_percent:.1f}%")
+            lines.append(f"⚡ MEDIUM INVENTORY: {inventory_percent:.1f}%")
         else:
-            print(f"✅ INVENTORY OK: {inventory_percent:.1f}%")
+            lines.append(f"✅ INVENTORY OK: {inventory_percent:.1f}%")
+        
+        # One write per refresh rather than one per line
+        print('\n'.join(lines))
+    
+    def report_startup(self, now: float) -> None:
+        """Record and log how long startup took until the first quotes"""
+        self.startup['first_quote'] = now - self.started
+        for stage, seconds in self.startup.items():
+            self.metrics.histogram('startup', symbol=self.symbol, stage=stage).observe(seconds)
+        logger.info(f"Time to first quote: {self.startup['first_quote']:.2f}s ("
+                    + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.startup.items()
+                                if stage != 'first_quote') + ")")
+    
+    def restore_state(self) -> None:
+        """Resume inventory, PnL, prices, volatility and the horizon cycle from a fresh checkpoint"""
+        state = self.checkpoint.load()
+        if state is not None:
+            self.inventory = state.inventory
+            self.pnl = state.pnl
+            self.trades_count = state.trades_count
+            self.price_history.extend(state.prices)
+            if state.estimator is not None:
+                self.volatility_estimator.restore(*state.estimator)
+                self.volatility = self.volatility_estimator.volatility
+            if state.horizon_start is not None:
+                self.start_time = state.horizon_start
+            # Fills up to the cursor are already in the inventory; those made while down are fetched
+            if state.fill_cursor:
+                self.fill_ledger.since = state.fill_cursor + 1
+            logger.info(f"Resumed from a {time.time() - state.saved:.0f}s old checkpoint: "
+                        f"inventory {self.inventory:.4f}, volatility {self.volatility:.4f}")
+        self.checkpoint.open()
+    
+    def save_state(self, now: float) -> None:
+        """Checkpoint the strategy state"""
+        self.checkpoint.save(WarmState(
+            now, self.inventory, self.pnl, self.trades_count, self.start_time, self.fill_ledger.since,
+            self.volatility_estimator.volatility, self.volatility_estimator.state(), list(self.price_history)
+        ))
+    
+    def _lap(self, stage: str, start: float) -> float:
+        """Record the latency of a tick stage that began at ``start`` and return the time now"""
+        now = time.perf_counter()
+        self.stage_latency[stage].observe(now - start)
+        return now
     
     def run(self) -> None:
         """Main bot loop"""
@@ -375,12 +539,83 @@ class StandaloneMarketMaker:
         print(f"   Max Inventory: ${MAX_INVENTORY_USD}")
         print(f"   Update Frequency: {UPDATE_FREQUENCY}s")
         print(f"   Parameters: γ={GAMMA}, k={K}, T={TIME_HORIZON}h (rolling)")
+        print(f"   Market Data: {MARKET_DATA_MODE}")
         print(f"   Sandbox Mode: {SANDBOX_MODE}")
         
         # Initialize exchange
         self.initialize_exchange()
+        self.metrics = Metrics(summary_interval=METRICS_SUMMARY_INTERVAL)
+        if METRICS_PORT:
+            self.metrics.serve('127.0.0.1', METRICS_PORT)
+        self.metrics.instrument(self.exchange)
+        if RATE_LIMITER:
+            self.rate_limiter = RateLimiter.for_exchange('bybit', self.exchange, headroom=RATE_LIMIT_HEADROOM,
+                                                         metrics=self.metrics)
+            self.rate_limiter.instrument(self.exchange)
+        self.stage_latency = self.metrics.stages(self.symbol, TICK_STAGES)
         self.validate_symbol()
+        self.load_quote_constants()
         self.set_leverage()
+        self.start_market_data()
+        self.order_entry = OrderEntry(max_workers=ORDER_WORKERS, deadline=ORDER_DEADLINE)
+        if EVENT_LOG_FILE:
+            self.events = EventLog(EVENT_LOG_FILE)
+        private_stream_config = {'apiKey': API_KEY, 'secret': API_SECRET,
+                                 'options': {'defaultType': 'future'}, 'sandbox': SANDBOX_MODE,
+                                 'markets': self.quoted_markets()}
+        self.order_tracker = OrderTracker(
+            self.exchange, self.symbol, venue=self.venue, stream=ORDER_STREAM,
+            exchange_id='bybit', exchange_config=private_stream_config
+        )
+        self.order_tracker.start()
+        if QUOTE_LEVELS > 1:
+            self.quote_manager = QuoteLadder(
+                self.exchange, self.symbol, self.constants, levels=QUOTE_LEVELS,
+                spacing=LEVEL_SPACING, size_step=LEVEL_SIZE_STEP,
+                tick_tolerance=QUOTE_TICK_TOLERANCE, bps_tolerance=QUOTE_BPS_TOLERANCE,
+                size_tolerance=QUOTE_SIZE_TOLERANCE, order_entry=self.order_entry, events=self.events,
+                order_params=self.venue.order_params(POST_ONLY), tracker=self.order_tracker
+            )
+        else:
+            self.quote_manager = QuoteManager(
+                self.exchange, self.symbol,
+                tick_tolerance=QUOTE_TICK_TOLERANCE, bps_tolerance=QUOTE_BPS_TOLERANCE,
+                size_tolerance=QUOTE_SIZE_TOLERANCE, use_amend=USE_AMEND,
+                order_entry=self.order_entry, events=self.events,
+                order_params=self.venue.order_params(POST_ONLY), tracker=self.order_tracker
+            )
+        self.balance = BalanceService(
+            self.exchange, 'USDT', ttl=BALANCE_TTL, background=self.order_entry is not None, stream=BALANCE_STREAM,
+            exchange_id='bybit', exchange_config=private_stream_config
+        )
+        self.balance.start()
+        self.fill_ledger = FillLedger(
+            self.exchange, self.symbol, poll_interval=FILL_POLL_INTERVAL,
+            reconcile_interval=POSITION_RECONCILE_INTERVAL, stream=FILL_STREAM,
+            exchange_id='bybit', exchange_config=private_stream_config
+        )
+        self.fill_ledger.start()
+        if CHECKPOINT_DIR:
+            self.checkpoint = StateCheckpoint(
+                StateCheckpoint.path_for(CHECKPOINT_DIR, 'bybit', self.symbol), self.symbol,
+                self.volatility_estimator.lookback, VOLATILITY_MODE,
+                interval=CHECKPOINT_INTERVAL, max_age=CHECKPOINT_MAX_AGE
+            )
+            self.restore_state()
+        if GLOBAL_RISK_TABLE:
+            self.global_risk = GlobalRisk.open(GLOBAL_RISK_TABLE, GlobalRisk.name_for('bybit', self.symbol),
+                                               max_inventory_usd=GLOBAL_MAX_INVENTORY_USD,
+                                               max_loss_usd=GLOBAL_MAX_LOSS_USD,
+                                               contract_size=self.exchange.markets[self.symbol].get('contractSize') or 1.0)
+        if RECORD_MARKET_DATA:
+            self.recorder = MarketDataRecorder.for_market(
+                RECORD_DIRECTORY, self.symbol, self.exchange.markets[self.symbol], levels=RECORD_LEVELS
+            )
+        # Quotes left on the book by an earlier run are not in current_orders; pull them before quoting
+        self.cancel_all_orders()
+        self.startup['setup'] = time.perf_counter() - self.started
+        if PROFILE_SIGNAL:
+            self.profiler.install_signal()
         
         self.running = True
         
@@ -389,24 +624,40 @@ class StandaloneMarketMaker:
         while self.running:
             try:
                 start_time = time.time()
+                tick_start = lap = time.perf_counter()
                 
-                # Fetch orderbook
-                orderbook = self.exchange.fetch_order_book(self.symbol)
-                if not orderbook['bids'] or not orderbook['asks']:
+                # Read the book
+                top = self.read_order_book()
+                lap = self._lap('order_book', lap)
+                if top is None:
                     logger.warning("Empty orderbook, retrying...")
                     time.sleep(1)
                     continue
                 
-                # Calculate mid price
-                best_bid = orderbook['bids'][0][0]
-                best_ask = orderbook['asks'][0][0]
+                if self.recorder is not None:
+                    self.recorder.record_book(start_time, self.book_levels())
+                
+                # Mid price for risk and volatility, fair price for the quotes
+                best_bid, best_ask, fair_price = top
                 mid_price = (best_bid + best_ask) / 2
                 
                 # Update price history
                 self.price_history.append(mid_price)
+                self.volatility_estimator.push(mid_price, start_time)
                 
                 # Update inventory
                 self.update_inventory()
+                lap = self._lap('inventory', lap)
+                
+                # Firm-wide limits, shared with every bot on the same risk table
+                if self.global_risk is not None:
+                    halted = self.global_risk.update(self.inventory, mid_price, start_time)
+                    if halted is not None:
+                        logger.error(f"🚨 GLOBAL RISK LIMIT REACHED, stopping: {halted}")
+                        self.cancel_all_orders()
+                        self._lap('cancel', lap)
+                        self.running = False
+                        continue
                 
                 # Check risk limits
                 inventory_value = abs(self.inventory * mid_price)
@@ -414,23 +665,44 @@ class StandaloneMarketMaker:
                 if inventory_value > MAX_INVENTORY_USD:
                     logger.warning(f"🚨 INVENTORY LIMIT REACHED: ${inventory_value:.2f} > ${MAX_INVENTORY_USD}")
                     self.cancel_all_orders()
+                    self._lap('cancel', lap)
+                    if self.checkpoint is not None and self.checkpoint.due(start_time):
+                        self.save_state(start_time)
                     time.sleep(10)
                     continue
                 
                 # Calculate quotes
-                bid_price, ask_price = self.calculate_quote_prices(mid_price)
+                bid_price, ask_price = self.calculate_quote_prices(fair_price)
+                lap = self._lap('quote', lap)
                 size = self.calculate_position_size(mid_price)
+                lap = self._lap('sizing', lap)
+                if self.recorder is not None:
+                    self.recorder.record_quote(start_time, bid_price, ask_price, size)
                 
-                # Display status
-                self.display_status(mid_price, bid_price, ask_price, size)
+                # Display status, at most once per STATUS_INTERVAL
+                if start_time - self.last_status >= STATUS_INTERVAL:
+                    self.last_status = start_time
+                    self.display_status(mid_price, bid_price, ask_price, size)
+                    lap = self._lap('status', lap)
                 
                 # Place orders
+                sent = self.quote_manager.stats['sent']
                 self.place_orders(bid_price, ask_price, size)
+                lap = self._lap('orders', lap)
+                if self.quote_manager.stats['sent'] != sent:
+                    self.stage_latency['quote_live'].observe(lap - tick_start)
+                    if 'first_quote' not in self.startup:
+                        self.report_startup(lap)
+                
+                if self._lap('tick', tick_start) - tick_start > UPDATE_FREQUENCY:
+                    self.metrics.count('loop_overruns', symbol=self.symbol)
+                self.metrics.maybe_log_summary(start_time)
+                if self.checkpoint is not None and self.checkpoint.due(start_time):
+                    self.save_state(start_time)
+                self.profiler.tick()
                 
                 # Sleep until next update
-                elapsed = time.time() - start_time
-                sleep_time = max(0, UPDATE_FREQUENCY - elapsed)
-                time.sleep(sleep_time)
+                self.wait_for_next_tick(start_time)
                 
             except KeyboardInterrupt:
                 logger.info("Shutting down...")
@@ -440,7 +712,32 @@ class StandaloneMarketMaker:
                 time.sleep(5)
         
         # Cleanup
+        self.profiler.close()
+        # Orders still being sent must be known before the final cancel-all
+        if self.quote_manager is not None:
+            self.quote_manager.drain(self.current_orders)
+        if self.book_stream is not None:
+            self.book_stream.stop()
+        if self.balance is not None:
+            self.balance.stop()
+        if self.fill_ledger is not None:
+            self.fill_ledger.stop()
+        if self.order_tracker is not None:
+            self.order_tracker.stop()
         self.cancel_all_orders()
+        if self.checkpoint is not None:
+            self.save_state(time.time())
+            self.checkpoint.close()
+        if self.global_risk is not None:
+            self.global_risk.close()
+        if self.order_entry is not None:
+            self.order_entry.shutdown()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.metrics is not None:
+            self.metrics.stop()
+        if self.events is not None:
+            self.events.close()
         logger.info("🛑 Bot stopped")
     
     def stop(self) -> None:
@@ -458,7 +755,10 @@ def main():
     
     # Create and run bot
     bot = StandaloneMarketMaker()
+    if '--profile' in sys.argv[1:]:
+        bot.profiler.request()
     
+    listener = start_queued_logging() if LOG_MODE == "queued" else None
     try:
         bot.run()
     except KeyboardInterrupt:
@@ -466,6 +766,9 @@ def main():
     except Exception as e:
         logger.error(f"💥 Fatal error: {e}")
         sys.exit(1)
+    finally:
+        if listener is not None:
+            listener.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Backtest Engine - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Replays recorded order books and trades through the live quoting code
+against a simulated exchange
+"""
+
+import copy
+import itertools
+import json
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Any
+
+import ccxt
+import numpy as np
+
+from market_maker_bot import UniversalMarketMaker
+from order_book import microprice
+from quote_manager import QuoteManager
+
+logger = logging.getLogger(__name__)
+
+
+class MarketData:
+    """Top-of-book snapshots and public trades as NumPy columns
+
+    Timestamps are in seconds. Trade ``side`` is the taker side: +1 for a
+    buy that lifts asks, -1 for a sell that hits bids.
+    """
+
+    def __init__(self, timestamps, bid_prices, bid_sizes, ask_prices, ask_sizes,
+                 trade_timestamps=None, trade_prices=None, trade_amounts=None, trade_sides=None):
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.bid_prices = np.asarray(bid_prices, dtype=np.float64)
+        self.bid_sizes = np.asarray(bid_sizes, dtype=np.float64)
+        self.ask_prices = np.asarray(ask_prices, dtype=np.float64)
+        self.ask_sizes = np.asarray(ask_sizes, dtype=np.float64)
+        empty = np.empty(0, dtype=np.float64)
+        self.trade_timestamps = np.asarray(trade_timestamps if trade_timestamps is not None else empty, dtype=np.float64)
+        self.trade_prices = np.asarray(trade_prices if trade_prices is not None else empty, dtype=np.float64)
+        self.trade_amounts = np.asarray(trade_amounts if trade_amounts is not None else empty, dtype=np.float64)
+        self.trade_sides = np.asarray(trade_sides if trade_sides is not None else empty, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def from_jsonl(cls, books_path: str, trades_path: Optional[str] = None) -> 'MarketData':
+        """Load books (``{"timestamp": ms, "bids": [[p, s]], "asks": [[p, s]]}`` per line) and optional trades"""
+        columns = ([], [], [], [], [])
+        with open(books_path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                book = json.loads(line)
+                if not book['bids'] or not book['asks']:
+                    continue
+                columns[0].append(book['timestamp'] / 1000)
+                columns[1].append(book['bids'][0][0])
+                columns[2].append(book['bids'][0][1])
+                columns[3].append(book['asks'][0][0])
+                columns[4].append(book['asks'][0][1])
+
+        trades = ([], [], [], [])
+        if trades_path:
+            with open(trades_path, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    trade = json.loads(line)
+                    trades[0].append(trade['timestamp'] / 1000)
+                    trades[1].append(trade['price'])
+                    trades[2].append(trade['amount'])
+                    trades[3].append(1 if trade['side'] == 'buy' else -1)
+
+        return cls(*columns, *trades)
+
+    @classmethod
+    def from_npz(cls, path: str) -> 'MarketData':
+        """Load columns saved with ``save_npz``"""
+        data = np.load(path)
+        return cls(data['timestamps'], data['bid_prices'], data['bid_sizes'],
+                   data['ask_prices'], data['ask_sizes'], data['trade_timestamps'],
+                   data['trade_prices'], data['trade_amounts'], data['trade_sides'])
+
+    def save_npz(self, path: str) -> None:
+        """Save the columns for fast reloading"""
+        np.savez(path, timestamps=self.timestamps, bid_prices=self.bid_prices,
+                 bid_sizes=self.bid_sizes, ask_prices=self.ask_prices, ask_sizes=self.ask_sizes,
+                 trade_timestamps=self.trade_timestamps, trade_prices=self.trade_prices,
+                 trade_amounts=self.trade_amounts, trade_sides=self.trade_sides)
+
+
+class SimulatedExchange:
+    """ccxt-shaped exchange with a queue- and latency-aware fill model
+
+    New orders and cancels take effect ``latency`` seconds after they are
+    sent. A resting order joins the back of the displayed queue at its price
+    level; the queue ahead shrinks as the displayed size at that level
+    shrinks and as trades print at the level. The order fills when trades
+    eat through the queue ahead of it, when a trade prints through its price,
+    or when the opposite side of the book crosses it.
+    """
+
+    def __init__(self, symbol: str, tick_size: float = 0.01, lot_size: float = 0.001,
+                 min_amount: float = 0.001, latency: float = 0.05, fee_rate: float = 0.0,
+                 initial_balance: float = 10000.0, quote_currency: str = 'USDT'):
+        self.symbol = symbol
+        self.latency = latency
+        self.fee_rate = fee_rate
+        self.quote_currency = quote_currency
+        self.initial_balance = initial_balance
+        self.markets = {symbol: {
+            'symbol': symbol,
+            'precision': {'price': tick_size, 'amount': lot_size},
+            'limits': {'amount': {'min': min_amount}},
+        }}
+        self.has = {'cancelAllOrders': True, 'editOrder': False}
+        self.now = 0.0
+        self.book = (0.0, 0.0, 0.0, 0.0)
+        self.orders: Dict[str, Dict] = {}
+        self.pending_cancels: Dict[str, float] = {}
+        self.trades: List[Dict] = []
+        self.cash = initial_balance
+        self.position = 0.0
+        self.fees = 0.0
+        self.orders_placed = 0
+        self.orders_filled = 0
+        self.volume_quoted = 0.0
+        self.volume_filled = 0.0
+        self._ids = itertools.count(1)
+
+    # -- ccxt surface -----------------------------------------------------------------
+
+    def fetch_balance(self) -> Dict[str, Any]:
+        return {self.quote_currency: {'free': self.cash, 'total': self.cash}}
+
+    def fetch_order_book(self, symbol: str, limit: Optional[int] = None) -> Dict[str, Any]:
+        bid_price, bid_size, ask_price, ask_size = self.book
+        return {'symbol': symbol, 'bids': [[bid_price, bid_size]], 'asks': [[ask_price, ask_size]],
+                'timestamp': int(self.now * 1000)}
+
+    def create_limit_order(self, symbol: str, side: str, amount: float, price: float,
+                           params: Optional[Dict] = None) -> Dict[str, Any]:
+        order = {
+            'id': str(next(self._ids)), 'symbol': symbol, 'side': side, 'type': 'limit',
+            'price': price, 'amount': amount, 'filled': 0.0, 'status': 'open',
+            'timestamp': int(self.now * 1000), 'active_at': self.now + self.latency,
+            'queue_ahead': None, 'level_size': None,
+        }
+        self.orders[order['id']] = order
+        self.orders_placed += 1
+        self.volume_quoted += amount
+        return dict(order)
+
+    def cancel_order(self, order_id: str, symbol: Optional[str] = None,
+                     params: Optional[Dict] = None) -> Dict[str, Any]:
+        if order_id not in self.orders:
+            raise ccxt.OrderNotFound(f"Order {order_id} not found")
+        self.pending_cancels.setdefault(order_id, self.now + self.latency)
+        return {'id': order_id, 'status': 'canceled'}
+
+    def cancel_all_orders(self, symbol: Optional[str] = None, params: Optional[Dict] = None) -> List[Dict]:
+        return [self.cancel_order(order_id) for order_id in list(self.orders)]
+
+    def fetch_open_orders(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                          limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict]:
+        return [dict(order) for order in self.orders.values()]
+
+    def fetch_my_trades(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                        limit: Optional[int] = None, params: Optional[Dict] = None) -> List[Dict]:
+        trades = [t for t in self.trades if since is None or t['timestamp'] >= since]
+        return trades[-limit:] if limit else trades
+
+    # -- simulation -------------------------------------------------------------------
+
+    def on_book(self, now: float, bid_price: float, bid_size: float,
+                ask_price: float, ask_size: float) -> None:
+        """Advance to a new top-of-book snapshot"""
+        self.now = now
+        self.book = (bid_price, bid_size, ask_price, ask_size)
+
+        for order_id, effective_at in list(self.pending_cancels.items()):
+            if now >= effective_at:
+                del self.pending_cancels[order_id]
+                self.orders.pop(order_id, None)
+
+        for order in list(self.orders.values()):
+            if now < order['active_at']:
+                continue
+            price = order['price']
+            if order['side'] == 'buy':
+                crossed, level_price, level_size, improving = ask_price <= price, bid_price, bid_size, price > bid_price
+            else:
+                crossed, level_price, level_size, improving = bid_price >= price, ask_price, ask_size, price < ask_price
+
+            if crossed:
+                self._fill(order, order['amount'] - order['filled'])
+            elif improving:
+                order['queue_ahead'] = 0.0
+                order['level_size'] = None
+            elif level_price == price:
+                if order['queue_ahead'] is None:
+                    order['queue_ahead'] = level_size
+                elif order['level_size'] is not None and level_size < order['level_size']:
+                    order['queue_ahead'] = max(0.0, order['queue_ahead'] - (order['level_size'] - level_size))
+                order['level_size'] = level_size
+
+    def on_trade(self, now: float, price: float, amount: float, taker_side: int) -> None:
+        """Match a public trade against resting orders"""
+        self.now = now
+        for order in list(self.orders.values()):
+            if now < order['active_at'] or amount <= 0:
+                continue
+            if taker_side < 0 and order['side'] == 'buy' and price <= order['price']:
+                through = price < order['price']
+            elif taker_side > 0 and order['side'] == 'sell' and price >= order['price']:
+                through = price > order['price']
+            else:
+                continue
+
+            if not through:
+                ahead = order['queue_ahead']
+                if ahead is None:
+                    continue  # Joined behind the touch, position in queue unknown
+                eaten = min(ahead, amount)
+                order['queue_ahead'] = ahead - eaten
+                amount -= eaten
+            fill = min(order['amount'] - order['filled'], amount)
+            if fill > 0:
+                amount -= fill
+                self._fill(order, fill)
+
+    def _fill(self, order: Dict, amount: float) -> None:
+        """Book a (partial) fill of a resting order"""
+        if amount <= 0:
+            return
+        notional = amount * order['price']
+        fee = notional * self.fee_rate
+        if order['side'] == 'buy':
+            self.position += amount
+            self.cash -= notional
+        else:
+            self.position -= amount
+            self.cash += notional
+        self.cash -= fee
+        self.fees += fee
+        self.volume_filled += amount
+        order['filled'] += amount
+        self.trades.append({
+            'id': str(len(self.trades) + 1), 'order': order['id'], 'symbol': order['symbol'],
+            'side': order['side'], 'price': order['price'], 'amount': amount,
+            'timestamp': int(self.now * 1000), 'fee': {'cost': fee, 'currency': self.quote_currency},
+        })
+        if order['filled'] >= order['amount'] - 1e-12:
+            order['status'] = 'closed'
+            self.orders_filled += 1
+            del self.orders[order['id']]
+            self.pending_cancels.pop(order['id'], None)
+
+    def live_sides(self) -> int:
+        """Number of sides with an active, uncancelled order"""
+        sides = {order['side'] for order in self.orders.values()
+                 if self.now >= order['active_at'] and order['id'] not in self.pending_cancels}
+        return len(sides)
+
+    def equity(self, mid_price: float) -> float:
+        """Cash plus inventory marked to mid"""
+        return self.cash + self.position * mid_price
+
+
+class BacktestEngine:
+    """Drives ``UniversalMarketMaker``'s quoting math over recorded market data
+
+    Quotes are recomputed every ``update_frequency`` seconds of simulated time
+    with the bot's own ``calculate_quote_prices`` and ``calculate_position_size``.
+    Each side is kept or replaced by the live ``QuoteManager``'s rules from
+    the ``quoting`` section: an order within ``tick_tolerance`` /
+    ``bps_tolerance`` of the new price and ``size_tolerance`` of the new size
+    (by its remaining size once partly filled) keeps its place in the queue,
+    anything else is cancelled and replaced at the back of the queue. The
+    simulated exchange has no amend, which moves an order to the back of
+    the queue on most venues anyway, so it only differs in request count.
+    All orders are pulled while inventory is over limit.
+    """
+
+    def __init__(self, config: Dict[str, Any], data: MarketData, latency: float = 0.05,
+                 fee_rate: float = 0.0, tick_size: float = 0.01, lot_size: float = 0.001,
+                 min_amount: float = 0.001, initial_balance: float = 10000.0):
+        self.config = copy.deepcopy(config)
+        self.data = data
+        self.symbol = self.config['trading']['symbol']
+        quote_currency = self.symbol.split('/')[1].split(':')[0]
+        self.exchange = SimulatedExchange(
+            self.symbol, tick_size=tick_size, lot_size=lot_size, min_amount=min_amount,
+            latency=latency, fee_rate=fee_rate, initial_balance=initial_balance,
+            quote_currency=quote_currency
+        )
+        self.bot = UniversalMarketMaker(config=self.config)
+        self.bot.exchange = self.exchange
+        self.bot.symbol = self.symbol
+        self.bot.load_strategy()
+        self.bot.show_status = False
+        # Keep/replace decisions only; orders are sent to the simulated exchange directly
+        self.quotes = QuoteManager.from_config(self.exchange, self.symbol, self.config.get('quoting', {}))
+        self.now = 0.0
+        self.bot.clock = lambda: self.now
+
+    def run(self, sample_every: int = 1) -> Dict[str, Any]:
+        """Run the replay and return summary statistics plus the inventory/PnL path"""
+        data = self.data
+        exchange = self.exchange
+        bot = self.bot
+        update_frequency = self.config['strategy']['update_frequency']
+        max_inventory = self.config['risk']['max_inventory_usd']
+
+        timestamps = data.timestamps.tolist()
+        bid_prices = data.bid_prices.tolist()
+        bid_sizes = data.bid_sizes.tolist()
+        ask_prices = data.ask_prices.tolist()
+        ask_sizes = data.ask_sizes.tolist()
+        trade_timestamps = data.trade_timestamps.tolist()
+        trade_prices = data.trade_prices.tolist()
+        trade_amounts = data.trade_amounts.tolist()
+        trade_sides = data.trade_sides.tolist()
+
+        resting = {'buy': None, 'sell': None}
+        path_time, path_inventory, path_pnl = [], [], []
+        next_quote = timestamps[0] if timestamps else 0.0
+        trade_index = 0
+        quotes = 0
+        kept = 0
+        api_calls = 0
+        size_tolerance = self.quotes.size_tolerance
+        uptime = 0.0
+        previous_time = None
+        mid_price = 0.0
+
+        for i in range(len(timestamps)):
+            now = timestamps[i]
+            if previous_time is not None and exchange.live_sides() == 2:
+                uptime += now - previous_time
+            previous_time = now
+
+            while trade_index < len(trade_timestamps) and trade_timestamps[trade_index] <= now:
+                exchange.on_trade(trade_timestamps[trade_index], trade_prices[trade_index],
+                                  trade_amounts[trade_index], trade_sides[trade_index])
+                trade_index += 1
+            exchange.on_book(now, bid_prices[i], bid_sizes[i], ask_prices[i], ask_sizes[i])
+
+            if now < next_quote:
+                continue
+
+            # Same per-tick sequence as UniversalMarketMaker.tick()
+            self.now = now
+            mid_price = (bid_prices[i] + ask_prices[i]) / 2
+            bot.price_history.append(mid_price)
+            bot.volatility_estimator.push(mid_price, now)
+            bot.inventory = exchange.position
+            quotes += 1
+
+            if quotes % sample_every == 0:
+                path_time.append(now)
+                path_inventory.append(exchange.position)
+                path_pnl.append(exchange.equity(mid_price) - exchange.initial_balance)
+
+            if abs(bot.inventory * mid_price) > max_inventory:
+                for side, order in resting.items():
+                    if order is not None and order['id'] in exchange.orders:
+                        exchange.cancel_order(order['id'])
+                        api_calls += 1
+                    resting[side] = None
+                next_quote = now + 10
+                continue
+
+            # Recorded books keep only the top level, where weighted_mid is the mid
+            fair_price = microprice(bid_prices[i], bid_sizes[i], ask_prices[i], ask_sizes[i]) \
+                if bot.strategy.fair_price == 'microprice' else mid_price
+            bid_price, ask_price = bot.calculate_quote_prices(fair_price)
+            size = bot.calculate_position_size(mid_price)
+            for side, price in (('buy', bid_price), ('sell', ask_price)):
+                order = resting[side] and exchange.orders.get(resting[side]['id'])
+                if order is not None:
+                    remaining = order['amount'] - order['filled']
+                    if (abs(order['price'] - price) <= self.quotes.tolerance(price)
+                            and abs(remaining - size) <= size * size_tolerance):
+                        kept += 1
+                        continue
+                    exchange.cancel_order(order['id'])
+                    api_calls += 1
+                if size > 0:
+                    resting[side] = exchange.create_limit_order(self.symbol, side, size, price)
+                    api_calls += 1
+
+            next_quote = now + update_frequency
+
+        duration = timestamps[-1] - timestamps[0] if len(timestamps) > 1 else 0.0
+        pnl = exchange.equity(mid_price) - exchange.initial_balance
+        path_pnl_array = np.asarray(path_pnl)
+        returns = np.diff(path_pnl_array) if len(path_pnl_array) > 1 else np.empty(0)
+
+        return {
+            'snapshots': len(timestamps),
+            'trades_replayed': trade_index,
+            'duration_hours': duration / 3600,
+            'quote_updates': quotes,
+            'pnl': pnl,
+            'fees': exchange.fees,
+            'final_inventory': exchange.position,
+            'max_inventory': float(np.max(np.abs(path_inventory))) if path_inventory else 0.0,
+            'fills': len(exchange.trades),
+            'orders_placed': exchange.orders_placed,
+            'quotes_kept': kept,
+            'api_calls': api_calls,
+            'api_calls_per_update': api_calls / quotes if quotes else 0.0,
+            'orders_filled': exchange.orders_filled,
+            'fill_rate': exchange.orders_filled / exchange.orders_placed if exchange.orders_placed else 0.0,
+            'volume_filled': exchange.volume_filled,
+            'quote_uptime': uptime / duration if duration else 0.0,
+            'sharpe': float(returns.mean() / returns.std() * math.sqrt(len(returns) * 86400 / duration))
+                      if len(returns) > 1 and duration > 0 and returns.std() > 0 else 0.0,
+            'path': {
+                'timestamp': np.asarray(path_time),
+                'inventory': np.asarray(path_inventory),
+                'pnl': path_pnl_array,
+            },
+        }
+
+
+def print_summary(result: Dict[str, Any]) -> None:
+    """Print backtest statistics"""
+    print(f"\n{'='*60}")
+    print(f"Snapshots: {result['snapshots']} | Trades: {result['trades_replayed']} | "
+          f"Duration: {result['duration_hours']:.2f}h")
+    print(f"PnL: ${result['pnl']:.2f} | Fees: ${result['fees']:.2f} | Sharpe (daily): {result['sharpe']:.2f}")
+    print(f"Fills: {result['fills']} | Fill rate: {result['fill_rate'] * 100:.1f}% "
+          f"({result['orders_filled']}/{result['orders_placed']} orders)")
+    print(f"Orders kept: {result['quotes_kept']} | API calls: {result['api_calls']} "
+          f"({result['api_calls_per_update']:.2f}/update)")
+    print(f"Inventory: final {result['final_inventory']:.4f} | max {result['max_inventory']:.4f}")
+    print(f"Quote uptime: {result['quote_uptime'] * 100:.1f}% | Quote updates: {result['quote_updates']}")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Backtest the market maker on recorded market data')
+    parser.add_argument('--config', type=str, default='config.json', help='Bot configuration (default: config.json)')
+    parser.add_argument('--books', type=str, required=True, help='Order books: JSON-lines, .npz from MarketData.save_npz, or a recorder day directory')
+    parser.add_argument('--trades', type=str, help='Public trades as JSON-lines (optional)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Order entry latency in seconds (default: 0.05)')
+    parser.add_argument('--fee-bps', type=float, default=0.0, help='Maker fee in basis points, negative for rebates')
+    parser.add_argument('--tick-size', type=float, help='Price tick (default: the recorded tick, else 0.01)')
+    parser.add_argument('--lot-size', type=float, default=0.001, help='Amount step (default: 0.001)')
+    parser.add_argument('--balance', type=float, default=10000.0, help='Starting quote balance (default: 10000)')
+    parser.add_argument('--output', type=str, help='Write the inventory/PnL path to this CSV file')
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+
+    start = time.time()
+    tick_size = args.tick_size
+    if os.path.isdir(args.books):
+        from recorder import load_day, recorded_tick_size, to_market_data
+        data = to_market_data(load_day(args.books))
+        tick_size = tick_size or recorded_tick_size(args.books)
+    elif args.books.endswith('.npz'):
+        data = MarketData.from_npz(args.books)
+    else:
+        data = MarketData.from_jsonl(args.books, args.trades)
+    loaded = time.time()
+
+    engine = BacktestEngine(config, data, latency=args.latency, fee_rate=args.fee_bps / 10000,
+                            tick_size=tick_size or 0.01, lot_size=args.lot_size,
+                            min_amount=args.lot_size, initial_balance=args.balance)
+    result = engine.run()
+    print_summary(result)
+    print(f"Loaded in {loaded - start:.2f}s, simulated in {time.time() - loaded:.2f}s")
+
+    if args.output:
+        path = result['path']
+        np.savetxt(args.output, np.column_stack([path['timestamp'], path['inventory'], path['pnl']]),
+                   delimiter=',', header='timestamp,inventory,pnl', comments='')
+        print(f"Path written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
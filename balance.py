@@ -0,0 +1,203 @@
+"""
+Balance Service - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Cached account balance kept fresh by a private stream, fills and a REST TTL
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceService:
+    """Serves the free balance of one currency from memory
+
+    Reads never wait on the network once a first balance is known. The value
+    is refreshed over REST when it is older than ``ttl`` seconds or after one
+    of our fills (``on_fill``), at most once per ``min_refresh_interval``.
+    With ``background`` the refresh runs on the service's own worker thread,
+    never on the order-entry pool, so a slow ``fetch_balance`` cannot hold
+    a worker a bid, ask or cancel needs; the cached value is served
+    meanwhile. With ``stream`` enabled, ccxt.pro ``watch_balance`` pushes
+    updates from the private account stream and the REST refresh only runs
+    when the stream goes quiet for longer than ``ttl``.
+    """
+
+    def __init__(self, exchange, currency: str, ttl: float = 30.0,
+                 min_refresh_interval: float = 1.0, background: bool = False,
+                 stream: bool = False, exchange_id: Optional[str] = None,
+                 exchange_config: Optional[Dict[str, Any]] = None,
+                 reconnect_delay: float = 5.0):
+        self.exchange = exchange
+        self.currency = currency
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"balance-{currency}"
+        ) if background else None
+        self.stream = stream and exchange_id is not None
+        self.exchange_id = exchange_id
+        self.exchange_config = dict(exchange_config or {})
+        self.reconnect_delay = reconnect_delay
+        self.free: Optional[float] = None
+        self.total: Optional[float] = None
+        self.updated = 0.0
+        self.source = 'none'
+        self.dirty = False
+        self.last_attempt = 0.0
+        self.rest_calls = 0
+        self.stream_updates = 0
+        self.running = False
+        self._pending = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, exchange, currency: str, config: Dict[str, Any], background: bool = False,
+                    exchange_id: Optional[str] = None,
+                    exchange_config: Optional[Dict[str, Any]] = None) -> 'BalanceService':
+        """Build a service from the ``balance`` config section"""
+        return cls(
+            exchange, currency,
+            ttl=config.get('ttl', 30.0),
+            min_refresh_interval=config.get('min_refresh_interval', 1.0),
+            background=background,
+            stream=config.get('stream', False),
+            exchange_id=exchange_id,
+            exchange_config=exchange_config
+        )
+
+    def start(self) -> None:
+        """Load the first balance and start the private stream if enabled"""
+        self.refresh()
+        if self.stream and not self.running:
+            self.running = True
+            self._thread = threading.Thread(
+                target=self._run_loop, name=f"balance-stream-{self.currency}", daemon=True
+            )
+            self._thread.start()
+            logger.info(f"Balance stream started for {self.currency} ({self.exchange_id})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the private stream and the refresh worker"""
+        self.running = False
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        if self._loop is not None and self._task is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the cached balance was last updated"""
+        return time.time() - self.updated if self.updated else float('inf')
+
+    def get(self) -> float:
+        """Free balance, refreshing in the background when stale"""
+        if self.free is None:
+            self.refresh()
+            return self.free or 0
+        if self.dirty or self.age > self.ttl:
+            self.request_refresh()
+        return self.free
+
+    def on_fill(self, trade: Dict[str, Any]) -> None:
+        """A fill changed the balance; refresh on the next read"""
+        self.dirty = True
+
+    def request_refresh(self) -> None:
+        """Refresh over REST, on the refresh worker with ``background``"""
+        now = time.time()
+        if now - self.last_attempt < self.min_refresh_interval:
+            return
+        if self.executor is None:
+            self.refresh()
+            return
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return
+            self.last_attempt = now
+            try:
+                self._pending = self.executor.submit(self.refresh)
+            except RuntimeError:
+                pass  # Stopped
+
+    def refresh(self) -> bool:
+        """Fetch the balance over REST now; True on success"""
+        self.last_attempt = time.time()
+        try:
+            self.rest_calls += 1
+            self._apply(self.exchange.fetch_balance(), 'rest')
+            return True
+        except Exception as e:
+            logger.error(f"Error fetching balance: {e}")
+            return False
+
+    def describe(self) -> str:
+        """Staleness note for status output"""
+        if self.free is None:
+            return "unavailable"
+        return f"{self.age:.1f}s old via {self.source}"
+
+    def _apply(self, balance: Dict[str, Any], source: str) -> None:
+        """Store the balance of our currency from a ccxt balance structure"""
+        entry = balance.get(self.currency)
+        if not entry:
+            if source == 'stream':
+                return  # Partial update for other currencies
+            entry = {}
+        with self._lock:
+            self.free = entry.get('free') or 0
+            self.total = entry.get('total')
+            self.updated = time.time()
+            self.source = source
+            self.dirty = False
+
+    def _run_loop(self) -> None:
+        """Thread target that owns the asyncio loop"""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._task = self._loop.create_task(self._consume())
+            if not self.running:
+                self._task.cancel()
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _consume(self) -> None:
+        """Consume the private balance stream, reconnecting after errors until stopped"""
+        import ccxt.pro as ccxtpro
+
+        while self.running:
+            config = dict(self.exchange_config)
+            sandbox = config.pop('sandbox', False)
+            exchange = getattr(ccxtpro, self.exchange_id)(config)
+            if sandbox:
+                exchange.set_sandbox_mode(True)
+            try:
+                while self.running:
+                    balance = await exchange.watch_balance()
+                    self.stream_updates += 1
+                    self._apply(balance, 'stream')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Balance stream error: {e}, reconnecting in {self.reconnect_delay}s")
+            finally:
+                await exchange.close()
+            if self.running:
+                await asyncio.sleep(self.reconnect_delay)
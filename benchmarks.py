@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Benchmarks - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Microbenchmarks of the quoting tick's hot path in both bots, with a saved baseline and regression thresholds
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+from market_data import OrderBookStream
+from quote_kernel import quote_prices
+
+logger = logging.getLogger(__name__)
+
+SYMBOL = 'ETH/USDT:USDT'
+BOTS = ('universal', 'standalone')
+LOOKBACKS = (50, 500, 5000)  # sigma_lookback values, from the HFTBOT default to a long window
+# ccxt precision modes: step sizes (TICK_SIZE) and numbers of decimal places (DECIMAL_PLACES)
+PRECISIONS = {
+    'tick': {'price': 0.01, 'amount': 0.001},
+    'decimals': {'price': 2, 'amount': 3},
+}
+BOOK_LEVELS = 20  # Levels per side of the benchmark order book
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.25  # Fractional slowdown against the baseline that counts as a regression
+
+
+class BookExchange:
+    """Just enough of a ccxt client for the hot path: one market and a fixed REST order book"""
+
+    def __init__(self, market: Dict[str, Any], book: Dict[str, Any]):
+        self.markets = {market['symbol']: market}
+        self.book = book
+
+    def fetch_order_book(self, symbol: str, limit: Optional[int] = None) -> Dict[str, Any]:
+        return self.book
+
+
+def fake_market(precision: str) -> Dict[str, Any]:
+    """ccxt market for ``SYMBOL`` in one of the ``PRECISIONS`` modes"""
+    return {
+        'symbol': SYMBOL, 'base': 'ETH', 'quote': 'USDT', 'settle': 'USDT', 'type': 'swap', 'contract': True,
+        'precision': dict(PRECISIONS[precision]),
+        'limits': {'amount': {'min': 0.001, 'max': None}, 'price': {'min': None, 'max': None}},
+    }
+
+
+def fake_book(mid: float = 2500.0, tick: float = 0.01, levels: int = BOOK_LEVELS,
+              seed: int = 7) -> Dict[str, Any]:
+    """ccxt order book with ``levels`` levels per side around ``mid``"""
+    rng = random.Random(seed)
+    bid = round(mid - tick, 2)
+    return {
+        'symbol': SYMBOL,
+        'bids': [[round(bid - i * tick, 2), round(rng.uniform(0.1, 20.0), 3)] for i in range(levels)],
+        'asks': [[round(bid + (i + 2) * tick, 2), round(rng.uniform(0.1, 20.0), 3)] for i in range(levels)],
+    }
+
+
+def price_path(count: int = 10007, start: float = 2500.0, seed: int = 11) -> List[float]:
+    """Random-walk mid prices (a prime count, so cycling never lines up with the window)"""
+    rng = random.Random(seed)
+    prices = [start]
+    for _ in range(count - 1):
+        prices.append(prices[-1] * math.exp(rng.gauss(0.0, 0.0002)))
+    return prices
+
+
+def universal_bot(lookback: int, precision: str, config_path: str):
+    """``UniversalMarketMaker`` on ``config_path`` with a fixed order size, quoting the fake market"""
+    from market_maker_bot import UniversalMarketMaker
+
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    config['trading'].update(symbol=SYMBOL, order_size_type='fixed', order_size=0.01)
+    config['strategy']['sigma_lookback'] = lookback
+    config['symbols'] = []
+
+    bot = UniversalMarketMaker(config=config)
+    bot.exchange = BookExchange(fake_market(precision), fake_book())
+    bot.symbol = SYMBOL
+    bot.show_status = False
+    bot.load_strategy()
+    return bot
+
+
+def standalone_bot(lookback: int, precision: str):
+    """``StandaloneMarketMaker`` with ``SIGMA_LOOKBACK`` set to ``lookback``, quoting the fake market"""
+    import HFTBOT
+
+    default = HFTBOT.SIGMA_LOOKBACK
+    HFTBOT.SIGMA_LOOKBACK = lookback
+    try:
+        bot = HFTBOT.StandaloneMarketMaker()
+    finally:
+        HFTBOT.SIGMA_LOOKBACK = default
+    bot.exchange = BookExchange(fake_market(precision), fake_book())
+    bot.load_quote_constants()
+    return bot
+
+
+def fair_price_settings(bot) -> Tuple[str, int]:
+    """The bot's fair price method and levels"""
+    if getattr(bot, 'strategy', None) is not None:
+        return bot.strategy.fair_price, bot.strategy.fair_price_levels
+    import HFTBOT
+    return HFTBOT.FAIR_PRICE, HFTBOT.FAIR_PRICE_LEVELS
+
+
+def cases(bot, prices: List[float]) -> Dict[str, Callable[[], Any]]:
+    """The hot-path calls of one tick, each as a zero-argument callable over ``bot``
+
+    The bot is warmed up first: its price window and volatility estimator
+    are full and it carries some inventory, as in a running bot.
+    """
+    clock = itertools.count(1.0, 0.2)
+    for price in prices[:bot.volatility_estimator.lookback + 1]:
+        bot.price_history.append(price)
+        bot.volatility_estimator.push(price, next(clock))
+    bot.inventory = 0.3
+    mid = prices[-1]
+    path = itertools.cycle(prices)
+
+    def calculate_volatility():
+        # The tick's volatility step: record the mid, update the estimator, read sigma
+        price = next(path)
+        bot.price_history.append(price)
+        bot.volatility_estimator.push(price, next(clock))
+        return bot.calculate_volatility()
+
+    sigma = bot.calculate_volatility()
+    time_remaining = bot.get_time_remaining()
+    constants = bot.constants
+
+    def reservation_and_spread():
+        # Reservation price and optimal spread, without the bot's lookups
+        return quote_prices(mid, 0.3, sigma, time_remaining, constants)
+
+    def calculate_quote_prices():
+        return bot.calculate_quote_prices(mid)
+
+    def calculate_position_size():
+        return bot.calculate_position_size(mid)
+
+    def read_order_book_rest():
+        return bot.read_order_book()
+
+    # The streamed book: a snapshot plus one changing level per update, as a delta feed delivers it
+    fair_price, levels = fair_price_settings(bot)
+    stream = OrderBookStream(SYMBOL, ws_url='ws://127.0.0.1:0')
+    book = fake_book()
+    stream._apply(book['bids'], book['asks'])
+    level = book['bids'][3]
+    sizes = itertools.cycle([level[1], level[1] * 2])
+
+    def read_order_book_stream():
+        stream._apply_delta([[level[0], next(sizes)]], [])
+        return stream.read(fair_price, levels, 5.0)
+
+    return {
+        'calculate_volatility': calculate_volatility,
+        'reservation_and_spread': reservation_and_spread,
+        'calculate_quote_prices': calculate_quote_prices,
+        'calculate_position_size': calculate_position_size,
+        'read_order_book_rest': read_order_book_rest,
+        'read_order_book_stream': read_order_book_stream,
+    }
+
+
+def calibrate(fn: Callable[[], Any], target: float = 0.01) -> int:
+    """Number of calls to ``fn`` that take about ``target`` seconds"""
+    number = 1
+    elapsed = sample(fn, number) * 1e-9
+    while elapsed * number < target / 10:
+        number *= 10
+        elapsed = sample(fn, number) * 1e-9
+    return max(1, int(target / max(elapsed, 1e-12)))
+
+
+def sample(fn: Callable[[], Any], number: int) -> float:
+    """Nanoseconds per call over ``number`` calls"""
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for _ in itertools.repeat(None, number):
+        fn()
+    return (perf_counter() - start) / number * 1e9
+
+
+def case_name(case: str, lookback: int, precision: str) -> str:
+    return f"{case}[lookback={lookback},precision={precision}]"
+
+
+def run_benchmarks(bots=BOTS, lookbacks=LOOKBACKS, precisions=tuple(PRECISIONS),
+                   config_path: str = 'config.example.json', repeat: int = 7,
+                   only: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Nanoseconds per call by bot and case name
+
+    Every round builds fresh bots and times each case once, and each case
+    keeps its best round: a slow spell of the machine or an unlucky
+    memory layout of one bot instance costs a case one sample instead of
+    skewing its result. The garbage collector is off while timing.
+    """
+    prices = price_path()
+    numbers: Dict[str, int] = {}
+    results: Dict[str, Dict[str, float]] = {bot: {} for bot in bots}
+    collecting = gc.isenabled()
+    for _ in range(repeat):
+        for name in bots:
+            for lookback, precision in itertools.product(lookbacks, precisions):
+                bot = universal_bot(lookback, precision, config_path) if name == 'universal' \
+                    else standalone_bot(lookback, precision)
+                for case, fn in cases(bot, prices).items():
+                    key = case_name(case, lookback, precision)
+                    if only and only not in key:
+                        continue
+                    if key not in numbers:
+                        numbers[key] = calibrate(fn)
+                    gc.disable()
+                    try:
+                        ns = sample(fn, numbers[key])
+                    finally:
+                        if collecting:
+                            gc.enable()
+                    results[name][key] = min(ns, results[name].get(key, math.inf))
+    return results
+
+
+def _quiet() -> None:
+    """Keep the bots' startup logging out of the report (importing them configures logging at INFO)"""
+    import market_maker_bot  # noqa: F401
+    import HFTBOT  # noqa: F401
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def run_suite(processes: int = 3, **kwargs) -> Dict[str, Dict[str, float]]:
+    """``run_benchmarks`` in ``processes`` fresh interpreters, keeping each case's best time
+
+    The same code can run up to half again slower in one interpreter
+    process than in the next (memory layout), far more than it varies
+    within a process, so a single process cannot hold a tight threshold.
+    The processes run one after another so they never share a core.
+    """
+    if processes <= 1:
+        return run_benchmarks(**kwargs)
+    results: Dict[str, Dict[str, float]] = {}
+    context = multiprocessing.get_context('spawn')
+    for _ in range(processes):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_quiet) as pool:
+            for bot, cases_ns in pool.submit(run_benchmarks, **kwargs).result().items():
+                best = results.setdefault(bot, {})
+                for key, ns in cases_ns.items():
+                    best[key] = min(ns, best.get(key, math.inf))
+    return results
+
+
+# -- baseline ---------------------------------------------------------------------------
+
+def environment() -> Dict[str, str]:
+    """Where the numbers were taken; baselines only compare on the same machine and Python"""
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'processor': platform.processor(), 'node': platform.node()}
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]], threshold: float,
+                  thresholds: Optional[Dict[str, float]] = None) -> None:
+    """Write the results as the new baseline, keeping any per-case thresholds"""
+    baseline = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'threshold': threshold,
+        'thresholds': thresholds or {},
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any],
+            threshold: Optional[float] = None) -> List[Tuple[str, str, float, float, float]]:
+    """(bot, case, baseline ns, current ns, allowed slowdown) for every case slower than allowed
+
+    The allowed slowdown is ``threshold`` if given, else the baseline's
+    ``thresholds`` entry for the case (by name without parameters, e.g.
+    ``read_order_book_rest``), else the baseline's default ``threshold``.
+    """
+    default = threshold if threshold is not None else baseline.get('threshold', DEFAULT_THRESHOLD)
+    per_case = baseline.get('thresholds', {}) if threshold is None else {}
+    regressions = []
+    for bot, cases_ns in results.items():
+        reference = baseline.get('results', {}).get(bot, {})
+        for key, current in cases_ns.items():
+            if key not in reference:
+                continue
+            allowed = per_case.get(key.split('[')[0], default)
+            if current > reference[key] * (1 + allowed):
+                regressions.append((bot, key, reference[key], current, allowed))
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Any]]) -> None:
+    """One row per case, one column per bot, with the change against the baseline"""
+    bots = list(results)
+    keys = sorted({key for cases_ns in results.values() for key in cases_ns})
+    reference = baseline.get('results', {}) if baseline else {}
+    width = max((len(key) for key in keys), default=10) + 2
+    lines = [f"{'case':<{width}}" + ''.join(f"{bot:>24}" for bot in bots)]
+    for key in keys:
+        row = f"{key:<{width}}"
+        for bot in bots:
+            current = results[bot].get(key)
+            if current is None:
+                row += f"{'-':>24}"
+                continue
+            previous = reference.get(bot, {}).get(key)
+            change = f" ({(current / previous - 1) * 100:+5.1f}%)" if previous else ''
+            row += f"{f'{current:,.0f} ns{change}':>24}"
+        lines.append(row)
+    print('\n'.join(lines))
+
+
+def main():
+    """Run the suite, compare it with the baseline and exit non-zero on a regression"""
+    parser = argparse.ArgumentParser(description='Benchmark the quoting hot path of both bots')
+    parser.add_argument('--bot', choices=['universal', 'standalone', 'both'], default='both',
+                        help='Bot to benchmark (default: both)')
+    parser.add_argument('--config', default='config.example.json', help='Config for the universal bot')
+    parser.add_argument('--lookbacks', default=','.join(map(str, LOOKBACKS)),
+                        help='Comma-separated sigma_lookback values (default: 50,500,5000)')
+    parser.add_argument('--precision', choices=['tick', 'decimals', 'both'], default='both',
+                        help='Market precision mode (default: both)')
+    parser.add_argument('--filter', help='Only run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=7, help='Timing rounds per case, best kept (default: 7)')
+    parser.add_argument('--processes', type=int, default=3,
+                        help='Interpreter processes to run the suite in, best kept (default: 3)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=f'Baseline file (default: {DEFAULT_BASELINE})')
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baseline')
+    parser.add_argument('--threshold', type=float,
+                        help=f'Allowed slowdown as a fraction, overriding the baseline (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--json', help='Also write the results to this file')
+
+    args = parser.parse_args()
+    _quiet()
+
+    results = run_suite(
+        processes=args.processes,
+        bots=BOTS if args.bot == 'both' else (args.bot,),
+        lookbacks=[int(value) for value in args.lookbacks.split(',')],
+        precisions=tuple(PRECISIONS) if args.precision == 'both' else (args.precision,),
+        config_path=args.config, repeat=args.repeat, only=args.filter
+    )
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    baseline = load_baseline(args.baseline)
+    print_results(results, None if args.save else baseline)
+
+    if args.save:
+        save_baseline(args.baseline, results, args.threshold if args.threshold is not None else
+                      (baseline or {}).get('threshold', DEFAULT_THRESHOLD), (baseline or {}).get('thresholds'))
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one")
+        return
+
+    if baseline.get('environment') != environment():
+        print(f"\nWarning: baseline was taken on {baseline.get('environment')}, timings may not compare")
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        print(f"\nNo regressions against the baseline from {baseline.get('created')}")
+        return
+    print(f"\n{len(regressions)} regression(s):")
+    for bot, key, previous, current, allowed in regressions:
+        print(f"  {bot} {key}: {previous:,.0f} ns -> {current:,.0f} ns "
+              f"({(current / previous - 1) * 100:+.1f}%, allowed +{allowed * 100:.0f}%)")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
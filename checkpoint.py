@@ -0,0 +1,209 @@
+"""
+State Checkpoint - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Memory-mapped snapshot of strategy state so a restarted bot quotes without a warm-up
+"""
+
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RQCK'
+FORMAT_VERSION = 1
+
+# magic, format version, window capacity, volatility mode, symbol
+HEADER = struct.Struct('<4sII8s48s')
+# sequence, CRC32 of everything after it in the slot
+SLOT_HEADER = struct.Struct('<QI')
+# saved, inventory, pnl, trades, horizon start, fill cursor, volatility,
+# estimator count/mean/m2/ewma_var/last price/last time, prices kept, returns kept
+SCALARS = struct.Struct('<7d6dII')
+
+
+class WarmState:
+    """Strategy state worth carrying across a restart"""
+
+    __slots__ = ('saved', 'inventory', 'pnl', 'trades_count', 'horizon_start', 'fill_cursor',
+                 'volatility', 'estimator', 'prices')
+
+    def __init__(self, saved: float, inventory: float, pnl: float, trades_count: int,
+                 horizon_start: Optional[float], fill_cursor: int, volatility: float,
+                 estimator: Optional[Tuple], prices: List[float]):
+        self.saved = saved
+        self.inventory = inventory
+        self.pnl = pnl
+        self.trades_count = trades_count
+        self.horizon_start = horizon_start  # Start of a rolling horizon, None when it follows the wall clock
+        self.fill_cursor = fill_cursor  # Fill ledger cursor (ms): fills after it were not yet counted
+        self.volatility = volatility
+        self.estimator = estimator  # VolatilityEstimator.state(), None if it cannot be resumed
+        self.prices = prices  # Recent mid prices, oldest first
+
+
+class StateCheckpoint:
+    """Keeps the latest ``WarmState`` of one symbol in a small memory-mapped file
+
+    The file holds two slots written alternately, each with a sequence
+    number and a CRC, so a process killed in the middle of a write still
+    leaves the previous snapshot intact. A save is one ``pack_into`` and a
+    copy into the page cache (no system call, no fsync), cheap enough to
+    run from the quoting tick every ``interval`` seconds; the operating
+    system writes the pages out even if the process crashes. On startup
+    ``load`` returns the newest valid snapshot if it is at most
+    ``max_age`` seconds old. Estimator state is only resumed when the
+    volatility mode and lookback are unchanged; otherwise the estimate
+    starts over from the restored inventory and prices.
+    """
+
+    def __init__(self, path: str, symbol: str, capacity: int, mode: str,
+                 interval: float = 1.0, max_age: float = 300.0):
+        self.path = path
+        self.symbol = symbol
+        self.capacity = capacity
+        self.mode = mode
+        self.interval = interval
+        self.max_age = max_age
+        self.slot_size = SLOT_HEADER.size + SCALARS.size + 16 * capacity
+        self.last_save = 0.0
+        self.saves = 0
+        self.sequence = 0
+        self._map: Optional[mmap.mmap] = None
+        self._buffer = bytearray(self.slot_size)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], exchange_name: str, symbol: str,
+                    capacity: int, mode: str) -> Optional['StateCheckpoint']:
+        """Build a checkpoint from the ``checkpoint`` config section, or None when disabled"""
+        if not config.get('enabled', False):
+            return None
+        return cls(cls.path_for(config.get('directory', 'state'), exchange_name, symbol), symbol, capacity, mode,
+                   interval=config.get('interval', 1.0), max_age=config.get('max_age', 300.0))
+
+    @staticmethod
+    def path_for(directory: str, exchange_name: str, symbol: str) -> str:
+        """One file per exchange and symbol"""
+        return os.path.join(directory, f"{exchange_name.lower()}-{re.sub(r'[^A-Za-z0-9]+', '-', symbol)}.state")
+
+    # -- restore --------------------------------------------------------------------------
+
+    def load(self, now: Optional[float] = None) -> Optional[WarmState]:
+        """The newest valid snapshot, or None when there is none or it is too old"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read checkpoint {self.path}: {e}")
+            return None
+
+        if len(data) < HEADER.size:
+            return None
+        magic, version, capacity, mode, symbol = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            logger.warning(f"Ignoring checkpoint {self.path} in an unknown format")
+            return None
+        if symbol.rstrip(b'\0').decode() != self.symbol[:48]:
+            logger.warning(f"Ignoring checkpoint {self.path} written for another symbol")
+            return None
+
+        slot_size = SLOT_HEADER.size + SCALARS.size + 16 * capacity
+        best = None
+        for offset in (HEADER.size, HEADER.size + slot_size):
+            slot = data[offset:offset + slot_size]
+            if len(slot) < slot_size:
+                continue
+            sequence, crc = SLOT_HEADER.unpack_from(slot)
+            if sequence and zlib.crc32(slot[SLOT_HEADER.size:]) == crc and (best is None or sequence > best[0]):
+                best = (sequence, slot)
+        if best is None:
+            return None
+
+        self.sequence = best[0]
+        state = self._unpack(best[1], capacity, mode.rstrip(b'\0').decode())
+        age = (now if now is not None else time.time()) - state.saved
+        if age > self.max_age:
+            logger.info(f"Checkpoint for {self.symbol} is {age:.0f}s old, starting cold")
+            return None
+        return state
+
+    def _unpack(self, slot: bytes, capacity: int, mode: str) -> WarmState:
+        (saved, inventory, pnl, trades_count, horizon_start, fill_cursor, volatility,
+         count, mean, m2, ewma_var, last_price, last_time, prices_kept, returns_kept) = \
+            SCALARS.unpack_from(slot, SLOT_HEADER.size)
+        offset = SLOT_HEADER.size + SCALARS.size
+        prices = list(struct.unpack_from(f'<{prices_kept}d', slot, offset))
+        returns = list(struct.unpack_from(f'<{returns_kept}d', slot, offset + 8 * capacity))
+
+        estimator = None
+        if mode == self.mode and capacity == self.capacity:
+            estimator = (int(count), mean, m2, ewma_var, None if math.isnan(last_price) else last_price,
+                         None if math.isnan(last_time) else last_time, volatility, returns)
+        return WarmState(saved, inventory, pnl, int(trades_count),
+                         None if math.isnan(horizon_start) else horizon_start, int(fill_cursor),
+                         volatility, estimator, prices)
+
+    # -- save -----------------------------------------------------------------------------
+
+    def open(self) -> None:
+        """Create the file for the current layout and map it (after ``load``, which reads the old one)"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        size = HEADER.size + 2 * self.slot_size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)  # Different layout: start from zeroed (invalid) slots
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(self._map, 0, MAGIC, FORMAT_VERSION, self.capacity,
+                         self.mode.encode(), self.symbol.encode()[:48])
+
+    def due(self, now: float) -> bool:
+        return self._map is not None and now - self.last_save >= self.interval
+
+    def save(self, state: WarmState) -> None:
+        """Write ``state`` over the older of the two slots"""
+        if self._map is None:
+            return
+        estimator = state.estimator or (0, 0.0, 0.0, 0.0, None, None, state.volatility, [])
+        count, mean, m2, ewma_var, last_price, last_time, _, returns = estimator
+        prices = state.prices[-self.capacity:]
+        returns = returns[-self.capacity:]
+
+        buffer = self._buffer
+        SCALARS.pack_into(
+            buffer, SLOT_HEADER.size,
+            state.saved, state.inventory, state.pnl, state.trades_count,
+            math.nan if state.horizon_start is None else state.horizon_start,
+            state.fill_cursor, state.volatility, count, mean, m2, ewma_var,
+            math.nan if last_price is None else last_price,
+            math.nan if last_time is None else last_time,
+            len(prices), len(returns)
+        )
+        offset = SLOT_HEADER.size + SCALARS.size
+        struct.pack_into(f'<{len(prices)}d', buffer, offset, *prices)
+        struct.pack_into(f'<{len(returns)}d', buffer, offset + 8 * self.capacity, *returns)
+
+        self.sequence += 1
+        SLOT_HEADER.pack_into(buffer, 0, self.sequence, zlib.crc32(memoryview(buffer)[SLOT_HEADER.size:]))
+        start = HEADER.size + (self.sequence % 2) * self.slot_size
+        self._map[start:start + self.slot_size] = buffer
+        self.last_save = state.saved
+        self.saves += 1
+
+    def close(self) -> None:
+        """Flush and unmap the file"""
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
@@ -7,7 +7,7 @@ Website: https://roboquant.ai
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import json
 import os
 import sys
@@ -17,6 +17,7 @@ class ConfigWizard:
         self.root = root
         self.root.title("Roboquant Market Maker Bot - Configuration Wizard")
         self.root.geometry("800x700")
+        self.min_spread = 0.0001  # Not shown in the wizard; set by presets and loaded configs
         
         # Create notebook for tabs
         self.notebook = ttk.Notebook(root)
@@ -184,6 +185,8 @@ Tips:
                  bg='blue', fg='white').pack(side='left', padx=5)
         tk.Button(preset_frame, text="Aggressive", command=lambda: self.load_preset('aggressive'),
                  bg='red', fg='white').pack(side='left', padx=5)
+        tk.Button(preset_frame, text="From Sweep...", command=lambda: self.load_preset('sweep'),
+                 bg='purple', fg='white').pack(side='left', padx=5)
         
         # Gamma (risk aversion)
         tk.Label(tab, text="Risk Aversion (gamma):").grid(row=2, column=0, sticky='e', padx=5, pady=5)
@@ -319,6 +322,7 @@ The bot will automatically stop if:
             self.max_spread_var.set(0.5)
             self.leverage_var.set(2)
             self.order_percent_var.set(0.5)
+            self.min_spread = 0.0001
             messagebox.showinfo("Preset Loaded", "Conservative settings loaded - Good for beginners")
         elif preset_type == 'balanced':
             self.gamma_var.set(0.1)
@@ -327,6 +331,7 @@ The bot will automatically stop if:
             self.max_spread_var.set(0.3)
             self.leverage_var.set(5)
             self.order_percent_var.set(1.0)
+            self.min_spread = 0.0001
             messagebox.showinfo("Preset Loaded", "Balanced settings loaded - Good for most users")
         elif preset_type == 'aggressive':
             self.gamma_var.set(0.01)
@@ -335,7 +340,30 @@ The bot will automatically stop if:
             self.max_spread_var.set(0.2)
             self.leverage_var.set(10)
             self.order_percent_var.set(2.0)
+            self.min_spread = 0.0001
             messagebox.showinfo("Preset Loaded", "Aggressive settings loaded - For experienced users only!")
+        elif preset_type == 'sweep':
+            self.load_sweep_preset()
+    
+    def load_sweep_preset(self):
+        """Load strategy parameters from a config written by param_sweep.py --write-config"""
+        path = filedialog.askopenfilename(title="Select sweep result",
+                                          filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, 'r') as f:
+                strategy = json.load(f)['strategy']
+            
+            self.gamma_var.set(strategy['gamma'])
+            self.k_var.set(strategy['k'])
+            self.time_horizon_var.set(strategy['time_horizon'])
+            self.lookback_var.set(strategy['sigma_lookback'])
+            self.max_spread_var.set(strategy['max_spread_percent'] * 100)
+            self.min_spread = strategy.get('min_spread', 0.0001)
+            messagebox.showinfo("Preset Loaded", f"Sweep result loaded from {os.path.basename(path)}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load sweep result: {str(e)}")
     
     def save_config(self):
         """Save configuration to file"""
@@ -359,7 +387,7 @@ The bot will automatically stop if:
                 "time_horizon": self.time_horizon_var.get(),
                 "sigma_lookback": self.lookback_var.get(),
                 "update_frequency": self.update_freq_var.get(),
-                "min_spread": 0.0001,
+                "min_spread": self.min_spread,
                 "max_spread_percent": self.max_spread_var.get() / 100,
                 "max_quote_distance_percent": 0.005
             },
@@ -408,6 +436,7 @@ The bot will automatically stop if:
             self.lookback_var.set(config['strategy']['sigma_lookback'])
             self.update_freq_var.set(config['strategy']['update_frequency'])
             self.max_spread_var.set(config['strategy']['max_spread_percent'] * 100)
+            self.min_spread = config['strategy'].get('min_spread', self.min_spread)
             
             self.max_inventory_var.set(config['risk']['max_inventory_usd'])
             self.max_position_var.set(config['risk']['max_position_size_usd'])
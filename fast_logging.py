@@ -0,0 +1,99 @@
+"""
+Fast Logging - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Queued log output and a structured order/fill event log, written off the
+quoting thread
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedHandler(QueueHandler):
+    """Hands records to the listener thread unformatted; formatting and I/O happen there"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_queued_logging() -> QueueListener:
+    """Move the root logger's handlers behind a queue and a background writer thread
+
+    The handlers configured by ``logging.basicConfig`` (log file and console)
+    keep their formats; they just run on the listener thread, so a slow disk
+    or terminal no longer stalls quoting. Stop the returned listener at exit
+    to flush what is still queued.
+    """
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    records = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueuedHandler(records))
+
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class EventLog:
+    """Compact JSON-lines log of order and fill events
+
+    ``record`` only appends a tuple to a deque, well under a microsecond; a
+    writer thread serialises and flushes every ``flush_interval`` seconds.
+    Each line is ``{"t": <unix seconds>, "event": <kind>, ...fields}``.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._pending: deque = deque()
+        self._stop = threading.Event()
+        self._file = open(path, 'a', buffering=1 << 16)
+        self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['EventLog']:
+        """Event log from the ``logging`` config section, or None when no file is set"""
+        path = config.get('event_log')
+        return cls(path, config.get('event_flush_interval', 1.0)) if path else None
+
+    def record(self, event: str, **fields) -> None:
+        self._pending.append((time.time(), event, fields))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def _drain(self) -> None:
+        """Write everything queued so far"""
+        pending = self._pending
+        if not pending:
+            return
+        try:
+            while pending:
+                timestamp, event, fields = pending.popleft()
+                self._file.write(json.dumps(dict(fields, t=round(timestamp, 6), event=event),
+                                            separators=(',', ':'), default=str))
+                self._file.write('\n')
+                self.written += 1
+            self._file.flush()
+        except Exception as e:
+            logger.error(f"Error writing event log: {e}")
+
+    def close(self) -> None:
+        """Flush and close the event log"""
+        self._stop.set()
+        self._thread.join()
+        self._file.close()
@@ -0,0 +1,246 @@
+"""
+Fill Ledger - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Incremental, de-duplicated record of our own fills
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class FillLedger:
+    """Tracks our fills for one symbol exactly once each
+
+    Fills are pulled from ``fetch_my_trades`` starting at a timestamp cursor
+    (paging forward while full pages come back) and de-duplicated by trade
+    ID, so overlapping windows never count a fill twice and busy periods
+    never drop one. With ``stream`` enabled, ccxt.pro ``watch_my_trades``
+    delivers fills as they happen and REST is only used to backfill after a
+    (re)connect. The net position is reconciled against ``fetch_positions``
+    every ``reconcile_interval`` seconds where the exchange supports it; a
+    mismatch is only acted on once a second check, after the fills in flight
+    have been polled, still shows it.
+    """
+
+    def __init__(self, exchange, symbol: str, poll_interval: float = 2.0, limit: int = 100,
+                 reconcile_interval: float = 60.0, stream: bool = False,
+                 exchange_id: Optional[str] = None, exchange_config: Optional[Dict[str, Any]] = None,
+                 max_pages: int = 10, remember: int = 10000, reconnect_delay: float = 5.0):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.poll_interval = poll_interval
+        self.limit = limit
+        self.reconcile_interval = reconcile_interval
+        self.stream = stream and exchange_id is not None
+        self.exchange_id = exchange_id
+        self.exchange_config = dict(exchange_config or {})
+        self.max_pages = max_pages
+        self.reconnect_delay = reconnect_delay
+        self.since = int(time.time() * 1000)
+        self.last_poll = 0.0
+        self.last_reconcile = 0.0
+        self.position = 0.0
+        self.mismatch = False
+        self.fills = 0
+        self.fees = 0.0
+        self.rest_calls = 0
+        self.duplicates = 0
+        self.stream_connected = False
+        self.backfill = True
+        self.running = False
+        self._seen = set()
+        self._seen_order = deque(maxlen=remember)
+        self._queue: deque = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, exchange, symbol: str, config: Dict[str, Any],
+                    exchange_id: Optional[str] = None,
+                    exchange_config: Optional[Dict[str, Any]] = None) -> 'FillLedger':
+        """Build a ledger from the ``fills`` config section"""
+        return cls(
+            exchange, symbol,
+            poll_interval=config.get('poll_interval', 2.0),
+            limit=config.get('limit', 100),
+            reconcile_interval=config.get('reconcile_interval', 60.0),
+            stream=config.get('stream', False),
+            exchange_id=exchange_id,
+            exchange_config=exchange_config
+        )
+
+    def start(self) -> None:
+        """Start the private fill stream if enabled"""
+        if self.stream and not self.running:
+            self.running = True
+            self._thread = threading.Thread(
+                target=self._run_loop, name=f"fill-stream-{self.symbol}", daemon=True
+            )
+            self._thread.start()
+            logger.info(f"Fill stream started for {self.symbol} ({self.exchange_id})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the private fill stream"""
+        self.running = False
+        if self._loop is not None and self._task is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Return fills not seen before, oldest first"""
+        trades = []
+        while self._queue:
+            trades.append(self._queue.popleft())
+
+        now = time.time()
+        if (not self.stream_connected or self.backfill) and now - self.last_poll >= self.poll_interval:
+            self.last_poll = now
+            trades.extend(self._fetch())
+            if self.stream_connected:
+                self.backfill = False
+
+        new = [trade for trade in sorted(trades, key=lambda t: t.get('timestamp') or 0) if self._add(trade)]
+        return new
+
+    def reconcile(self, force: bool = False) -> Optional[float]:
+        """Net position reported by the exchange, when a check is due and supported"""
+        now = time.time()
+        if not force and now - self.last_reconcile < self.reconcile_interval:
+            return None
+        self.last_reconcile = now
+        if not self.exchange.has.get('fetchPositions'):
+            return None
+
+        try:
+            self.rest_calls += 1
+            positions = self.exchange.fetch_positions([self.symbol])
+        except Exception as e:
+            logger.warning(f"Could not reconcile position: {e}")
+            return None
+
+        # In contracts, like the trade amounts the ledger and the bots' inventory add up
+        net = 0.0
+        for position in positions:
+            if position.get('symbol') != self.symbol:
+                continue
+            amount = position.get('contracts') or 0
+            net += -amount if position.get('side') == 'short' else amount
+        return net
+
+    def check_inventory(self, inventory: float, tolerance: float) -> Optional[float]:
+        """Exchange position to adopt as inventory, once it differs on two consecutive checks
+
+        ``fetch_positions`` already includes fills the ledger may not have
+        delivered yet (poll or stream lag), so a first mismatch only brings the
+        next check forward to just after the following poll. If those fills
+        close the gap, nothing is overwritten and they are not counted twice.
+        """
+        position = self.reconcile()
+        if position is None:
+            return None
+        if abs(position - inventory) <= tolerance:
+            self.mismatch = False
+            return None
+        if not self.mismatch:
+            self.mismatch = True
+            self.last_reconcile -= max(self.reconcile_interval - 2 * self.poll_interval, 0.0)
+            return None
+        self.mismatch = False
+        return position
+
+    def _fetch(self) -> List[Dict[str, Any]]:
+        """Page forward from the cursor over REST"""
+        trades = []
+        since = self.since
+        for _ in range(self.max_pages):
+            try:
+                self.rest_calls += 1
+                page = self.exchange.fetch_my_trades(self.symbol, since=since, limit=self.limit)
+            except Exception as e:
+                logger.error(f"Error fetching fills: {e}")
+                break
+            trades.extend(page)
+            if len(page) < self.limit:
+                break
+            last = max(trade.get('timestamp') or 0 for trade in page)
+            if last <= since:
+                logger.warning(f"More than {self.limit} fills at {since}, some may be missed until the next reconcile")
+                break
+            since = last  # Inclusive: the overlap is removed by trade ID
+        return trades
+
+    def _add(self, trade: Dict[str, Any]) -> bool:
+        """Record a fill unless it was already counted; True if it is new"""
+        key = trade.get('id') or (trade.get('order'), trade.get('timestamp'), trade['side'],
+                                  trade['price'], trade['amount'])
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        if len(self._seen_order) == self._seen_order.maxlen:
+            self._seen.discard(self._seen_order[0])
+        self._seen_order.append(key)
+        self._seen.add(key)
+
+        self.position += trade['amount'] if trade['side'] == 'buy' else -trade['amount']
+        self.fills += 1
+        self.fees += (trade.get('fee') or {}).get('cost') or 0
+        self.since = max(self.since, trade.get('timestamp') or 0)
+        return True
+
+    def _run_loop(self) -> None:
+        """Thread target that owns the asyncio loop"""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._task = self._loop.create_task(self._consume())
+            if not self.running:
+                self._task.cancel()
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _consume(self) -> None:
+        """Consume the private fill stream, reconnecting after errors until stopped"""
+        import ccxt.pro as ccxtpro
+
+        while self.running:
+            config = dict(self.exchange_config)
+            sandbox = config.pop('sandbox', False)
+            exchange = getattr(ccxtpro, self.exchange_id)(config)
+            if sandbox:
+                exchange.set_sandbox_mode(True)
+            exchange.on_connected = self._on_connected(exchange.on_connected)
+            try:
+                while self.running:
+                    self._queue.extend(await exchange.watch_my_trades(self.symbol))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Fill stream error: {e}, reconnecting in {self.reconnect_delay}s")
+            finally:
+                self.stream_connected = False
+                await exchange.close()
+            if self.running:
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _on_connected(self, hook):
+        """Wrap ccxt.pro's connection hook to mark the stream live as soon as its websocket opens"""
+        def on_connected(client, message=None):
+            hook(client, message)
+            # Fills between the last REST poll and this subscription are backfilled
+            self.stream_connected = True
+            self.backfill = True
+        return on_connected
@@ -0,0 +1,317 @@
+"""
+Global Risk - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Shared-memory risk table that enforces firm-wide inventory and loss limits across bot processes
+"""
+
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RQRT'
+FORMAT_VERSION = 1
+
+# Shared memory where the platform has it; any file works, the pages are shared through the page cache
+DEFAULT_PATH = '/dev/shm/roboquant-risk' if os.path.isdir('/dev/shm') else os.path.join('state', 'risk.table')
+
+# magic, format version, slots, slots in use, halted, max gross inventory (USD), max loss (USD), halted at, reason
+HEADER = struct.Struct('<4sIIII4xddd64s')
+USED_OFFSET = 12
+HALTED_OFFSET = 16
+LIMITS_OFFSET = 24
+U32 = struct.Struct('<I')
+LIMITS = struct.Struct('<dd')
+
+# Every slot starts with a sequence number, odd while its single writer is updating it
+SEQUENCE = struct.Struct('<Q')
+# pid, name, updated, inventory, notional (inventory * mid), PnL, cash
+ROW = struct.Struct('<I4x40sddddd')
+SLOT_SIZE = SEQUENCE.size + ROW.size
+# Notional and PnL only, for the per-tick aggregation
+NOTIONAL_OFFSET = SEQUENCE.size + 64
+TOTALS = struct.Struct('<dd')
+READ_RETRIES = 100
+
+
+class RiskRow:
+    """One symbol's last published risk"""
+
+    __slots__ = ('name', 'pid', 'updated', 'inventory', 'notional', 'pnl')
+
+    def __init__(self, name: str, pid: int, updated: float, inventory: float, notional: float, pnl: float):
+        self.name = name
+        self.pid = pid
+        self.updated = updated
+        self.inventory = inventory
+        self.notional = notional
+        self.pnl = pnl
+
+
+class RiskTable:
+    """Fixed-size table of per-symbol inventory, notional and PnL in a memory-mapped file
+
+    Every process that maps the file sees the same pages, so a worker
+    publishes its row and reads everyone else's with plain memory reads
+    and writes: no lock, no message, no system call per tick. Each row
+    has exactly one writer (the symbol it was registered for) and is
+    guarded by a sequence lock: the writer makes the sequence odd, writes
+    the row and makes it even again, and readers retry until they see the
+    same even sequence before and after their read, so a row is never read
+    half-written. Rows of workers that died keep their last values, since
+    their positions are still open.
+
+    The header holds the limits and a halt flag. ``check`` adds up the gross
+    notional and the PnL of every row and raises the flag when a limit is
+    crossed; every worker reads the flag on its next tick and stops.
+    """
+
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.slots = slots
+        self._map: Optional[mmap.mmap] = None
+
+    @classmethod
+    def create(cls, path: str, slots: int = 64, max_inventory_usd: float = 0.0,
+               max_loss_usd: float = 0.0) -> 'RiskTable':
+        """A new, empty table at ``path``
+
+        It is built under a temporary name and renamed over any previous
+        table, so processes still mapping the old file keep valid pages.
+        """
+        table = cls(path, slots)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        table._map_file(temporary, os.O_RDWR | os.O_CREAT | os.O_TRUNC)
+        HEADER.pack_into(table._map, 0, MAGIC, FORMAT_VERSION, slots, 0, 0,
+                         max_inventory_usd, max_loss_usd, 0.0, b'')
+        os.replace(temporary, path)
+        return table
+
+    @classmethod
+    def open(cls, path: str, slots: int = 64, max_inventory_usd: float = 0.0,
+             max_loss_usd: float = 0.0) -> 'RiskTable':
+        """The table at ``path``, created with these limits if there is no valid one yet"""
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER.size)
+        except FileNotFoundError:
+            header = b''
+        if len(header) == HEADER.size:
+            magic, version, existing, *_ = HEADER.unpack(header)
+            if magic == MAGIC and version == FORMAT_VERSION and \
+                    os.path.getsize(path) == HEADER.size + existing * SLOT_SIZE:
+                table = cls(path, existing)
+                table._map_file(path, os.O_RDWR)
+                return table
+        return cls.create(path, slots, max_inventory_usd, max_loss_usd)
+
+    def _map_file(self, path: str, flags: int) -> None:
+        size = HEADER.size + self.slots * SLOT_SIZE
+        fd = os.open(path, flags, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    # -- registration -----------------------------------------------------------------
+
+    def register(self, name: str) -> int:
+        """Index of the row for ``name``, taking the next free row if it has none yet
+
+        Names are registered once at startup (the supervisor registers every
+        worker's before starting them); a restarted worker gets its old row
+        back. Where the platform has file locks, concurrent registrations
+        from independent processes are serialised with one.
+        """
+        encoded = name.encode()[:40]
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            try:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            used = U32.unpack_from(self._map, USED_OFFSET)[0]
+            for index in range(used):
+                if ROW.unpack_from(self._map, self._offset(index) + SEQUENCE.size)[1].rstrip(b'\0') == encoded:
+                    return index
+            if used >= self.slots:
+                raise RuntimeError(f"Risk table {self.path} is full ({self.slots} rows), raise global_risk.slots")
+            ROW.pack_into(self._map, self._offset(used) + SEQUENCE.size, 0, encoded, 0.0, 0.0, 0.0, 0.0, 0.0)
+            U32.pack_into(self._map, USED_OFFSET, used + 1)
+            return used
+        finally:
+            os.close(fd)  # Also releases the lock
+
+    def _offset(self, index: int) -> int:
+        return HEADER.size + index * SLOT_SIZE
+
+    # -- rows -------------------------------------------------------------------------
+
+    def write(self, index: int, sequence: int, pid: int, name: bytes, updated: float, inventory: float,
+              notional: float, pnl: float, cash: float) -> int:
+        """Publish a row (only from its own writer); returns the new sequence number"""
+        offset = self._offset(index)
+        SEQUENCE.pack_into(self._map, offset, sequence + 1)
+        ROW.pack_into(self._map, offset + SEQUENCE.size, pid, name, updated, inventory, notional, pnl, cash)
+        SEQUENCE.pack_into(self._map, offset, sequence + 2)
+        return sequence + 2
+
+    def read(self, index: int) -> Tuple[int, Tuple]:
+        """Sequence number and a consistent copy of a row"""
+        buffer, offset = self._map, self._offset(index)
+        for _ in range(READ_RETRIES):
+            sequence = SEQUENCE.unpack_from(buffer, offset)[0]
+            if sequence & 1:
+                continue
+            row = ROW.unpack_from(buffer, offset + SEQUENCE.size)
+            if SEQUENCE.unpack_from(buffer, offset)[0] == sequence:
+                return sequence, row
+        # The writer died mid-update; the row is as complete as it will get
+        return SEQUENCE.unpack_from(buffer, offset)[0], ROW.unpack_from(buffer, offset + SEQUENCE.size)
+
+    def rows(self) -> List[RiskRow]:
+        """Every registered row"""
+        rows = []
+        for index in range(U32.unpack_from(self._map, USED_OFFSET)[0]):
+            _, (pid, name, updated, inventory, notional, pnl, _) = self.read(index)
+            rows.append(RiskRow(name.rstrip(b'\0').decode(errors='replace'), pid, updated, inventory, notional, pnl))
+        return rows
+
+    def totals(self) -> Tuple[float, float]:
+        """Gross notional (sum of absolute notionals) and total PnL over every row"""
+        buffer = self._map
+        gross = pnl = 0.0
+        for index in range(U32.unpack_from(buffer, USED_OFFSET)[0]):
+            offset = HEADER.size + index * SLOT_SIZE
+            for _ in range(READ_RETRIES):
+                sequence = SEQUENCE.unpack_from(buffer, offset)[0]
+                if sequence & 1:
+                    continue
+                notional, row_pnl = TOTALS.unpack_from(buffer, offset + NOTIONAL_OFFSET)
+                if SEQUENCE.unpack_from(buffer, offset)[0] == sequence:
+                    break
+            else:
+                notional, row_pnl = TOTALS.unpack_from(buffer, offset + NOTIONAL_OFFSET)
+            gross += abs(notional)
+            pnl += row_pnl
+        return gross, pnl
+
+    # -- limits -----------------------------------------------------------------------
+
+    @property
+    def limits(self) -> Tuple[float, float]:
+        """Max gross inventory and max loss in USD (0 means no limit)"""
+        return LIMITS.unpack_from(self._map, LIMITS_OFFSET)
+
+    def set_limits(self, max_inventory_usd: float, max_loss_usd: float) -> None:
+        LIMITS.pack_into(self._map, LIMITS_OFFSET, max_inventory_usd, max_loss_usd)
+
+    @property
+    def halted(self) -> Optional[str]:
+        """Why the table was halted, or None while trading is allowed"""
+        if not U32.unpack_from(self._map, HALTED_OFFSET)[0]:
+            return None
+        return HEADER.unpack_from(self._map)[-1].rstrip(b'\0').decode(errors='replace')
+
+    def halt(self, reason: str, now: Optional[float] = None) -> None:
+        """Stop every worker on the table; the reason is written before the flag readers check"""
+        struct.pack_into('<d64s', self._map, HEADER.size - 72, now if now is not None else time.time(),
+                         reason.encode()[:64])
+        U32.pack_into(self._map, HALTED_OFFSET, 1)
+
+    def check(self, now: Optional[float] = None) -> Optional[str]:
+        """Halt the table if the totals cross a limit; returns the halt reason, if halted"""
+        if U32.unpack_from(self._map, HALTED_OFFSET)[0]:
+            return self.halted
+        max_inventory, max_loss = LIMITS.unpack_from(self._map, LIMITS_OFFSET)
+        gross, pnl = self.totals()
+        if max_inventory > 0 and gross > max_inventory:
+            self.halt(f"gross inventory ${gross:.2f} > ${max_inventory:.2f}", now)
+        elif max_loss > 0 and pnl < -max_loss:
+            self.halt(f"PnL ${pnl:.2f} below -${max_loss:.2f}", now)
+        else:
+            return None
+        return self.halted
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class GlobalRisk:
+    """One symbol's row in a ``RiskTable``, updated from its quoting tick
+
+    ``on_fill`` tracks the cash flow of our fills; ``update`` marks the
+    inventory to the mid, publishes inventory, notional and PnL (cash plus
+    marked inventory, fees included) and checks the firm-wide totals.
+    Inventory changes not explained by fills (a restart, a reconcile
+    against the exchange position) are taken on at the mid, so they move
+    the exposure but not the PnL. A restarted worker picks its cash and
+    inventory up from its old row, so the PnL carries over. Inventory is in
+    contracts, like the bots' own; ``contract_size`` (the market's
+    ``contractSize``) turns it into base currency for notional and cash.
+    """
+
+    def __init__(self, table: RiskTable, name: str, contract_size: float = 1.0):
+        self.table = table
+        self.name = name
+        self.contract_size = contract_size
+        self.index = table.register(name)
+        self.reason: Optional[str] = None
+        self._encoded = name.encode()[:40]
+        self._pid = os.getpid()
+        self.sequence, (_, _, _, self.inventory, _, _, self.cash) = table.read(self.index)
+        self.sequence += self.sequence & 1  # Left odd by a writer that died mid-update
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], name: str, contract_size: float = 1.0) -> Optional['GlobalRisk']:
+        """Join the table of the ``global_risk`` config section, or None when disabled"""
+        if not config.get('enabled', False):
+            return None
+        return cls.open(config.get('path') or DEFAULT_PATH, name, slots=config.get('slots', 64),
+                        max_inventory_usd=config.get('max_inventory_usd', 0.0),
+                        max_loss_usd=config.get('max_loss_usd', 0.0), contract_size=contract_size)
+
+    @classmethod
+    def open(cls, path: str, name: str, slots: int = 64, max_inventory_usd: float = 0.0,
+             max_loss_usd: float = 0.0, contract_size: float = 1.0) -> 'GlobalRisk':
+        """Join the table at ``path``, creating it with these limits if nobody has yet"""
+        risk = cls(RiskTable.open(path, slots, max_inventory_usd, max_loss_usd), name, contract_size)
+        max_inventory, max_loss = risk.table.limits
+        logger.info(f"Sharing risk limits through {path} as {name}: "
+                    f"gross inventory ${max_inventory:.0f}, loss ${max_loss:.0f} (0 = no limit)")
+        return risk
+
+    @staticmethod
+    def name_for(exchange_name: str, symbol: str) -> str:
+        """Row name of a symbol on an exchange"""
+        return f"{exchange_name.lower()}:{symbol}"
+
+    def on_fill(self, trade: Dict[str, Any]) -> None:
+        """Account a fill's cash flow and fee"""
+        amount = trade['amount'] if trade['side'] == 'buy' else -trade['amount']
+        self.inventory += amount
+        self.cash -= amount * self.contract_size * trade['price'] + ((trade.get('fee') or {}).get('cost') or 0)
+
+    def update(self, inventory: float, mid_price: float, now: float) -> Optional[str]:
+        """Publish this symbol's risk and check the totals; returns the halt reason once halted"""
+        if inventory != self.inventory:
+            self.cash -= (inventory - self.inventory) * self.contract_size * mid_price
+            self.inventory = inventory
+        notional = inventory * self.contract_size * mid_price
+        self.sequence = self.table.write(self.index, self.sequence, self._pid, self._encoded, now, inventory,
+                                         notional, self.cash + notional, self.cash)
+        self.reason = self.table.check(now)
+        return self.reason
+
+    def close(self) -> None:
+        self.table.close()
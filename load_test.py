@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Load Test - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Runs the market makers end to end against the local mock exchange and reports throughput and latency
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Any
+
+from mock_exchange import MockMarket, MockExchangeServer, MockExchange
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+SYMBOL = 'ETH/USDT:USDT'  # HFTBOT's symbol, so both bots quote the same mock market
+
+# HFTBOT settings for a run against the mock: public book feed only, nothing written to disk
+STANDALONE_SETTINGS = {
+    'BALANCE_STREAM': False,
+    'FILL_STREAM': False,
+    'ORDER_STREAM': False,
+    'METRICS_PORT': 0,
+    'MARKET_CACHE_DIR': '',
+    'CHECKPOINT_DIR': '',
+    'EVENT_LOG_FILE': '',
+    'RECORD_MARKET_DATA': False,
+    'STATUS_INTERVAL': float('inf'),
+}
+
+
+def mock_client(server: MockExchangeServer) -> MockExchange:
+    """ccxt client for the server; pacing is left to the bot's own rate limiter"""
+    return MockExchange({'urls': {'api': {'rest': server.url}}, 'enableRateLimit': False})
+
+
+def mock_symbols(count: int) -> List[str]:
+    """``SYMBOL`` plus ``count - 1`` more synthetic perpetuals for the multi-symbol engine"""
+    return [SYMBOL] + [f"MOCK{index}/USDT:USDT" for index in range(1, count)]
+
+
+def mock_config(server: MockExchangeServer, config_path: str, symbols: List[str],
+                update_frequency: Optional[float] = None) -> Dict[str, Any]:
+    """Config from ``config_path`` with the exchange and streams pointed at the mock and no disk output"""
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    config['exchange'] = {'name': 'mock'}
+    config['trading']['symbol'] = symbols[0]
+    config['symbols'] = symbols if len(symbols) > 1 else []
+    if update_frequency is not None:
+        config['strategy']['update_frequency'] = update_frequency
+    config.setdefault('market_data', {}).update(mode='websocket' if server.ws_url else 'rest',
+                                                ws_url=server.ws_url or '')
+    config.setdefault('balance', {})['stream'] = False
+    config.setdefault('fills', {})['stream'] = False
+    config.setdefault('orders', {})['stream'] = False
+    config.setdefault('recorder', {})['enabled'] = False
+    config.setdefault('reload', {})['enabled'] = False
+    config.setdefault('checkpoint', {})['enabled'] = False
+    config.setdefault('metrics', {})['port'] = 0
+    config.setdefault('logging', {}).update(mode='sync', event_log='')
+    config.setdefault('engine', {})['status_interval'] = float('inf')
+    return config
+
+
+def use_mock(bot, server: MockExchangeServer) -> None:
+    """Point a ``UniversalMarketMaker``'s ``initialize_exchange`` at the mock"""
+    def initialize_exchange(symbols: Optional[List[str]] = None) -> None:
+        symbols = symbols or [bot.config['trading']['symbol']]
+        bot.exchange = mock_client(server)
+        bot.exchange_config = {}
+        bot.venue.resolve(bot.exchange)
+        bot.exchange.load_markets()
+        bot.startup['markets'] = time.perf_counter() - bot.started
+        bot.exchange_config['markets'] = {symbol: bot.exchange.markets[symbol] for symbol in symbols}
+
+    bot.initialize_exchange = initialize_exchange
+
+
+def universal_bot(server: MockExchangeServer, config_path: str = 'config.example.json',
+                  update_frequency: Optional[float] = None):
+    """``UniversalMarketMaker`` on ``config_path`` with its exchange and streams pointed at the mock"""
+    from market_maker_bot import UniversalMarketMaker
+
+    bot = UniversalMarketMaker(config=mock_config(server, config_path, [SYMBOL], update_frequency))
+    bot.show_status = False
+    use_mock(bot, server)
+    return bot
+
+
+def multi_symbol_engine(server: MockExchangeServer, symbols: List[str], config_path: str = 'config.example.json',
+                        update_frequency: Optional[float] = None):
+    """``MultiSymbolEngine`` quoting ``symbols`` on the mock over one shared client"""
+    from multi_symbol import MultiSymbolEngine
+
+    engine = MultiSymbolEngine(mock_config(server, config_path, symbols, update_frequency))
+    use_mock(engine.bots[0], server)
+    return engine
+
+
+def standalone_bot(server: MockExchangeServer, update_frequency: Optional[float] = None):
+    """``StandaloneMarketMaker`` with its Bybit client and book feed swapped for the mock"""
+    import HFTBOT
+
+    settings = dict(STANDALONE_SETTINGS, MARKET_DATA_WS_URL=server.ws_url or '',
+                    MARKET_DATA_MODE='websocket' if server.ws_url else 'rest')
+    if update_frequency is not None:
+        settings['UPDATE_FREQUENCY'] = update_frequency
+    for name, value in settings.items():
+        setattr(HFTBOT, name, value)
+
+    bot = HFTBOT.StandaloneMarketMaker()
+
+    def initialize_exchange() -> None:
+        bot.exchange = mock_client(server)
+        bot.venue.resolve(bot.exchange)
+        bot.exchange.load_markets()
+        bot.startup['markets'] = time.perf_counter() - bot.started
+
+    bot.initialize_exchange = initialize_exchange
+    return bot
+
+
+def run_load_test(name: str, bot, server: MockExchangeServer, duration: float,
+                  setup_timeout: float = 30.0) -> Dict[str, Any]:
+    """Run ``bot`` for ``duration`` seconds after its setup and measure the window
+
+    ``bot`` is a single bot or a ``MultiSymbolEngine``, whose per-symbol bots
+    are measured together: ticks are summed, and tick latencies are those
+    of the slowest symbol. Tick rate and API calls per tick count only the
+    measured window; request counts come from the server, so retries and
+    calls made from background threads (balance, fills, reconciliation) are
+    included.
+    """
+    quoting = getattr(bot, 'bots', [bot])
+    thread = threading.Thread(target=bot.run, name=f"load-{name}", daemon=True)
+    thread.start()
+    deadline = time.time() + setup_timeout
+    while (not all('setup' in each.startup for each in quoting) and thread.is_alive()
+           and time.time() < deadline):
+        time.sleep(0.01)
+    if not all('setup' in each.startup for each in quoting):
+        bot.stop()
+        raise RuntimeError(f"{name} bot did not finish its setup within {setup_timeout:.0f}s")
+
+    markets = [server.markets[each.symbol] for each in quoting]
+    requests = dict(server.requests)
+    errors = server.injected_errors
+    ticks = [each.stage_latency['tick'].count for each in quoting]
+    server.book_to_order = LatencyHistogram()
+    started = time.perf_counter()
+    time.sleep(duration)
+    elapsed = time.perf_counter() - started
+    ticks = [each.stage_latency['tick'].count - count for each, count in zip(quoting, ticks)]
+    calls = {path: count - requests.get(path, 0) for path, count in server.requests.items()
+             if count > requests.get(path, 0)}
+    errors = server.injected_errors - errors
+
+    bot.stop()
+    thread.join(15.0)
+    if thread.is_alive():
+        logger.warning(f"{name} bot did not stop within 15s")
+
+    total = sum(ticks)
+    result = {
+        'bot': name,
+        'seconds': elapsed,
+        'setup_seconds': max(each.startup['setup'] for each in quoting),
+        'ticks': total,
+        'ticks_per_second': total / elapsed,
+        'tick_p50_ms': max(each.stage_latency['tick'].quantile(0.5) for each in quoting) * 1000,
+        'tick_p99_ms': max(each.stage_latency['tick'].quantile(0.99) for each in quoting) * 1000,
+        'tick_to_trade_p50_ms': max(each.stage_latency['quote_live'].quantile(0.5) for each in quoting) * 1000,
+        'tick_to_trade_p99_ms': max(each.stage_latency['quote_live'].quantile(0.99) for each in quoting) * 1000,
+        'book_to_order_p50_ms': server.book_to_order.quantile(0.5) * 1000,
+        'book_to_order_p99_ms': server.book_to_order.quantile(0.99) * 1000,
+        'api_calls': sum(calls.values()),
+        'api_calls_per_tick': sum(calls.values()) / total if total else 0.0,
+        'calls': calls,
+        'injected_errors': errors,
+        'fills': sum(len(market.engine.trades) for market in markets),
+        'position': sum(market.engine.position for market in markets),
+        'pnl': sum(market.engine.equity((market.best_bid + market.best_ask) / 2) - market.engine.initial_balance
+                   for market in markets),
+    }
+    if len(quoting) > 1:
+        result['symbols'] = {each.symbol: count / elapsed for each, count in zip(quoting, ticks)}
+    return result
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """One block per bot"""
+    lines = [f"\n{'='*80}", "LOAD TEST RESULTS", f"{'='*80}"]
+    for result in results:
+        lines.extend([
+            f"{result['bot']}: {result['ticks']} ticks in {result['seconds']:.1f}s "
+            f"({result['ticks_per_second']:.1f}/s), setup {result['setup_seconds']:.2f}s"
+            + (f", {len(result['symbols'])} symbols (latencies of the slowest)" if 'symbols' in result else ''),
+            f"  Tick:           p50 {result['tick_p50_ms']:.2f}ms  p99 {result['tick_p99_ms']:.2f}ms",
+            f"  Tick-to-trade:  p50 {result['tick_to_trade_p50_ms']:.2f}ms  p99 {result['tick_to_trade_p99_ms']:.2f}ms",
+            f"  Book-to-order:  p50 {result['book_to_order_p50_ms']:.2f}ms  p99 {result['book_to_order_p99_ms']:.2f}ms "
+            f"(exchange side)",
+            f"  API calls:      {result['api_calls']} ({result['api_calls_per_tick']:.2f}/tick): "
+            + ', '.join(f"{path} {count}" for path, count in sorted(result['calls'].items())),
+            f"  Errors injected: {result['injected_errors']} | Fills: {result['fills']} | "
+            f"Position: {result['position']:.4f} | PnL: ${result['pnl']:.2f}",
+        ])
+        if 'symbols' in result:
+            rates = sorted(result['symbols'].values())
+            lines.append(f"  Updates/s per symbol: min {rates[0]:.1f}  median {rates[len(rates) // 2]:.1f}  "
+                         f"max {rates[-1]:.1f}")
+    print('\n'.join(lines))
+
+
+def main():
+    """Load test one or both bots, or the multi-symbol engine, against a fresh mock exchange each"""
+    parser = argparse.ArgumentParser(description='End-to-end load test against a local mock exchange')
+    parser.add_argument('--bot', choices=['universal', 'standalone', 'both'], default='both',
+                        help='Bot to run (default: both, one after the other)')
+    parser.add_argument('--config', default='config.example.json',
+                        help='Config for the universal bot, exchange and streams are overridden')
+    parser.add_argument('--symbols', type=int, default=1,
+                        help='Run the universal bot as a multi-symbol engine over this many mock markets (default: 1)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to measure per bot (default: 30)')
+    parser.add_argument('--update-frequency', type=float, help="Override the bots' seconds between updates")
+    parser.add_argument('--latency', type=float, default=0.005, help='Seconds added to every request (default: 0.005)')
+    parser.add_argument('--jitter', type=float, default=0.005, help='Up to this many more seconds (default: 0.005)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests failing with 429')
+    parser.add_argument('--volatility', type=float, default=0.02, help='Mock mid volatility per sqrt hour')
+    parser.add_argument('--trade-rate', type=float, default=5.0, help='Public trades per second')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the mock market (default: 1)')
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help="Show the bots' log output")
+
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    if args.symbols > 1 and args.bot == 'standalone':
+        parser.error('the standalone bot quotes one symbol; --symbols runs the universal bot')
+
+    results = []
+    if args.symbols > 1:
+        names = ['universal']
+    else:
+        names = ['universal', 'standalone'] if args.bot == 'both' else [args.bot]
+    for name in names:
+        symbols = mock_symbols(args.symbols)
+        server = MockExchangeServer(
+            [MockMarket(symbol, volatility=args.volatility, trade_rate=args.trade_rate,
+                        rng=random.Random(args.seed + index))
+             for index, symbol in enumerate(symbols)],
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate, seed=args.seed
+        )
+        server.start()
+        try:
+            if len(symbols) > 1:
+                name = f"multi-symbol x{len(symbols)}"
+                bot = multi_symbol_engine(server, symbols, args.config, args.update_frequency)
+            elif name == 'universal':
+                bot = universal_bot(server, args.config, args.update_frequency)
+            else:
+                bot = standalone_bot(server, args.update_frequency)
+            print(f"Load testing the {name} bot for {args.duration:.0f}s...")
+            results.append(run_load_test(name, bot, server, args.duration))
+        finally:
+            server.stop()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
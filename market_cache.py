@@ -0,0 +1,129 @@
+"""
+Market Cache - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+On-disk cache of exchange market metadata so restarts skip the full market download
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Market fields whose change makes cached metadata unsafe to quote with
+CHECKED_FIELDS = ('precision', 'limits', 'contractSize', 'active')
+
+
+class MarketCache:
+    """Market metadata from the last full ``load_markets``, kept on disk between runs
+
+    ``load_markets`` downloads every market on the venue, thousands on
+    Binance or OKX, before the first quote can go out. The cache keeps the
+    full list with one market or currency per line, so a restart parses and
+    installs (``set_markets``) only the configured symbols. Files older than
+    ``ttl`` seconds are ignored. After starting from the cache, ``refresh``
+    downloads the full list again on a separate client in the background,
+    ``refresh_delay`` seconds later so it does not compete with the first
+    quotes, rewrites the file and warns if a quoted market has changed.
+    """
+
+    def __init__(self, directory: str = 'cache', ttl: float = 86400.0, refresh_delay: float = 30.0):
+        self.directory = directory
+        self.ttl = ttl
+        self.refresh_delay = refresh_delay
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['MarketCache']:
+        """Build a cache from the ``markets`` config section, or None when disabled"""
+        if not config.get('cache', False):
+            return None
+        return cls(config.get('directory', 'cache'), config.get('ttl', 86400.0),
+                   config.get('refresh_delay', 30.0))
+
+    def path(self, exchange) -> str:
+        """Cache file of one exchange; testnet markets are kept apart"""
+        sandbox = '-sandbox' if getattr(exchange, 'isSandboxModeEnabled', False) else ''
+        return os.path.join(self.directory, f"markets-{exchange.id}{sandbox}.jsonl")
+
+    def load(self, exchange, symbols: List[str]) -> bool:
+        """Install the cached metadata of ``symbols`` on ``exchange``; False when the cache cannot serve them all"""
+        path = self.path(exchange)
+        try:
+            with open(path, 'r') as f:
+                header = json.loads(f.readline())
+                age = time.time() - header['saved']
+                if age > self.ttl:
+                    logger.info(f"Market cache {path} is {age / 3600:.1f}h old, reloading markets")
+                    return False
+
+                wanted = set(symbols)
+                markets, currencies = {}, {}
+                for line in f:
+                    kind, key, document = line.split('\t', 2)
+                    if kind == 'm' and key in wanted:
+                        markets[key] = json.loads(document)
+                    elif kind == 'c':
+                        currencies[key] = document
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Could not read market cache {path}: {e}")
+            return False
+
+        missing = wanted.difference(markets)
+        if missing:
+            logger.info(f"Market cache has no {', '.join(sorted(missing))}, reloading markets")
+            return False
+
+        codes = {market.get(field) for market in markets.values() for field in ('base', 'quote', 'settle')}
+        exchange.set_markets(markets, {code: json.loads(currencies[code]) for code in codes if code in currencies})
+        logger.info(f"Loaded {len(markets)} market(s) from cache ({age / 60:.0f} min old)")
+        return True
+
+    def save(self, exchange) -> None:
+        """Write every loaded market and currency of ``exchange``, replacing the file atomically"""
+        path = self.path(exchange)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'w') as f:
+                f.write(json.dumps({'saved': time.time(), 'exchange': exchange.id}) + '\n')
+                for symbol, market in exchange.markets.items():
+                    f.write(f"m\t{symbol}\t{json.dumps(market, separators=(',', ':'), default=str)}\n")
+                for code, currency in (exchange.currencies or {}).items():
+                    f.write(f"c\t{code}\t{json.dumps(currency, separators=(',', ':'), default=str)}\n")
+            os.replace(temporary, path)
+            logger.info(f"Cached {len(exchange.markets)} markets in {path}")
+        except Exception as e:
+            logger.warning(f"Could not write market cache {path}: {e}")
+
+    def refresh(self, exchange, exchange_config: Dict[str, Any], symbols: List[str]) -> None:
+        """Reload the full market list in the background and rewrite the cache"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._refresh, args=(exchange, exchange_config, symbols), name='market-refresh', daemon=True
+        )
+        self._thread.start()
+
+    def _refresh(self, exchange, exchange_config: Dict[str, Any], symbols: List[str]) -> None:
+        time.sleep(self.refresh_delay)
+        try:
+            # A client of its own so the live one's markets never change under the quoting loop
+            client = type(exchange)(dict(exchange_config))
+            client.load_markets(reload=True)
+            self.save(client)
+        except Exception as e:
+            logger.warning(f"Background market refresh failed: {e}")
+            return
+
+        for symbol in symbols:
+            cached, fresh = exchange.markets.get(symbol), client.markets.get(symbol)
+            if fresh is None or any(json.dumps(cached.get(field), sort_keys=True, default=str)
+                                    != json.dumps(fresh.get(field), sort_keys=True, default=str)
+                                    for field in CHECKED_FIELDS):
+                logger.warning(f"Market metadata for {symbol} changed since it was cached; restart to quote with it")
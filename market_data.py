@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Streaming Market Data - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+WebSocket order book feed shared by the market making bots, plus a local
+replay server that stands in for an exchange feed during testing
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Any, Tuple
+
+from order_book import L2Book
+
+logger = logging.getLogger(__name__)
+
+
+class OrderBookStream:
+    """Keeps the latest order book from a WebSocket feed in memory
+
+    The feed runs on its own asyncio loop in a background thread. Sources are
+    ccxt.pro ``watch_order_book`` for real venues, or a plain JSON feed
+    (``{"bids": [[price, size], ...], "asks": [...]}`` per message) when a
+    ``ws_url`` is given, such as the local ``BookReplayServer``. JSON
+    messages with ``"type": "delta"`` list only the changed levels (size 0
+    removes one) and may carry a ``sequence``; a gap reconnects for a new
+    snapshot. Updates go into an ``L2Book``, which ``read`` queries in
+    place for the best prices and fair price.
+    """
+
+    def __init__(self, symbol: str, exchange_id: Optional[str] = None,
+                 exchange_config: Optional[Dict[str, Any]] = None,
+                 ws_url: Optional[str] = None, depth: int = 20,
+                 reconnect_delay: float = 1.0):
+        if not exchange_id and not ws_url:
+            raise ValueError("OrderBookStream needs an exchange_id or a ws_url")
+        self.symbol = symbol
+        self.exchange_id = exchange_id
+        self.exchange_config = dict(exchange_config or {})
+        self.ws_url = ws_url
+        self.depth = depth
+        self.reconnect_delay = reconnect_delay
+        self.book = L2Book()
+        self.best_bid: Optional[float] = None
+        self.best_ask: Optional[float] = None
+        self.timestamp = 0.0
+        self.version = 0
+        self.updates = 0
+        self.running = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start consuming the feed in a background thread"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._run_loop, name=f"book-stream-{self.symbol}", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Order book stream started for {self.symbol} ({self.ws_url or self.exchange_id})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the feed and wake any thread waiting for an update"""
+        self.running = False
+        if self._loop is not None and self._task is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._condition:
+            self._condition.notify_all()
+        logger.info(f"Order book stream stopped after {self.updates} updates")
+
+    def get_order_book(self, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return a copy of the top ``depth`` levels, or None if nothing fresh has been received"""
+        with self._condition:
+            if not self.book.ready:
+                return None
+            if max_age is not None and time.time() - self.timestamp > max_age:
+                return None
+            return dict(self.book.as_dict(self.depth), symbol=self.symbol,
+                        timestamp=int(self.timestamp * 1000), version=self.version)
+    
+    def read(self, fair_price: str = 'mid', levels: int = 5,
+             max_age: Optional[float] = None) -> Optional[Tuple[float, float, float, int]]:
+        """Best bid, best ask, fair price and version without copying the book, or None if stale"""
+        with self._condition:
+            if not self.book.ready:
+                return None
+            if max_age is not None and time.time() - self.timestamp > max_age:
+                return None
+            return self.book.top(fair_price, levels) + (self.version,)
+
+    def wait_for_update(self, timeout: float, version: Optional[int] = None) -> bool:
+        """Block until the top of book moves past ``version`` or the timeout expires"""
+        with self._condition:
+            seen = self.version if version is None else version
+            return self._condition.wait_for(
+                lambda: self.version != seen or not self.running, max(timeout, 0)
+            )
+
+    def _apply(self, bids: List[List[float]], asks: List[List[float]], sequence: Optional[int] = None) -> None:
+        """Replace the book with a snapshot"""
+        if not bids or not asks:
+            return
+        with self._condition:
+            self.book.apply_snapshot(bids[:self.depth], asks[:self.depth], sequence)
+            self._updated()
+    
+    def _apply_delta(self, bids: List[List[float]], asks: List[List[float]], sequence: Optional[int] = None) -> None:
+        """Apply changed levels; raises on a sequence gap so the feed reconnects for a new snapshot"""
+        with self._condition:
+            if not self.book.apply_delta(bids, asks, sequence):
+                raise RuntimeError(f"Book out of sync at sequence {sequence}")
+            self._updated()
+    
+    def _updated(self) -> None:
+        """Notify waiters if the top of book changed (caller holds the condition)"""
+        self.timestamp = time.time()
+        self.updates += 1
+        best_bid, best_ask = self.book.best_bid, self.book.best_ask
+        if best_bid != self.best_bid or best_ask != self.best_ask:
+            self.best_bid = best_bid
+            self.best_ask = best_ask
+            self.version += 1
+            self._condition.notify_all()
+
+    def _run_loop(self) -> None:
+        """Thread target that owns the asyncio loop"""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._task = self._loop.create_task(self._consume())
+            if not self.running:
+                self._task.cancel()
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _consume(self) -> None:
+        """Consume the feed, reconnecting after errors until stopped"""
+        while self.running:
+            try:
+                if self.ws_url:
+                    await self._consume_json_feed()
+                else:
+                    await self._consume_ccxt_pro()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Order book stream error: {e}, reconnecting in {self.reconnect_delay}s")
+            if self.running:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _consume_ccxt_pro(self) -> None:
+        """Consume an exchange feed through ccxt.pro"""
+        import ccxt.pro as ccxtpro
+
+        config = dict(self.exchange_config)
+        sandbox = config.pop('sandbox', False)
+        exchange = getattr(ccxtpro, self.exchange_id)(config)
+        if sandbox:
+            exchange.set_sandbox_mode(True)
+        try:
+            while self.running:
+                book = await exchange.watch_order_book(self.symbol)
+                self._apply(book['bids'], book['asks'])
+        finally:
+            await exchange.close()
+
+    async def _consume_json_feed(self) -> None:
+        """Consume a plain JSON book feed such as the local replay server"""
+        try:
+            import websockets
+        except ImportError:
+            raise RuntimeError("The 'websockets' package is required for ws_url feeds (pip install websockets)")
+
+        async with websockets.connect(self.ws_url) as websocket:
+            logger.info(f"Connected to book feed {self.ws_url}")
+            async for message in websocket:
+                if not self.running:
+                    break
+                data = json.loads(message)
+                if data.get('symbol', self.symbol) != self.symbol:
+                    continue
+                if data.get('type') == 'delta':
+                    self._apply_delta(data.get('bids', []), data.get('asks', []), data.get('sequence'))
+                else:
+                    self._apply(data.get('bids', []), data.get('asks', []), data.get('sequence'))
+
+
+class BookReplayServer:
+    """Local WebSocket stand-in that replays recorded order book updates
+
+    Every client gets its own replay of ``updates`` from the start, one
+    message every ``interval`` seconds, in the same JSON shape that
+    ``OrderBookStream`` consumes.
+    """
+
+    def __init__(self, updates: List[Dict[str, Any]], host: str = '127.0.0.1',
+                 port: int = 8765, interval: float = 0.1, repeat: bool = False):
+        self.updates = updates
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.repeat = repeat
+        self.messages_sent = 0
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'BookReplayServer':
+        """Load updates from a JSON-lines file, one book per line"""
+        with open(path, 'r') as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+        return cls(updates, **kwargs)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 5.0) -> None:
+        """Start serving in a background thread and wait until bound"""
+        self._thread = threading.Thread(target=self._run_loop, name="book-replay", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("Book replay server failed to start")
+        logger.info(f"Replaying {len(self.updates)} book updates on {self.url}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the server thread"""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until interrupted"""
+        asyncio.run(self._serve())
+
+    def _run_loop(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    async def _serve(self) -> None:
+        import websockets
+
+        self._stop = asyncio.Event()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self.port = list(server.sockets)[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    async def _handler(self, websocket, path: Optional[str] = None) -> None:
+        """Replay the recorded updates to one client"""
+        try:
+            while True:
+                for update in self.updates:
+                    await websocket.send(json.dumps(update))
+                    self.messages_sent += 1
+                    await asyncio.sleep(self.interval)
+                if not self.repeat:
+                    break
+            await websocket.wait_closed()
+        except Exception as e:
+            logger.debug(f"Replay client disconnected: {e}")
+
+
+def main():
+    """Run a local book replay server from a JSON-lines file"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Replay recorded order books over a local WebSocket')
+    parser.add_argument('file', help='JSON-lines file with one {"bids", "asks"} book per line')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to bind (default: 8765)')
+    parser.add_argument('--interval', type=float, default=0.1, help='Seconds between updates (default: 0.1)')
+    parser.add_argument('--repeat', action='store_true', help='Loop the recording forever')
+
+    args = parser.parse_args()
+
+    server = BookReplayServer.from_file(
+        args.file, host=args.host, port=args.port, interval=args.interval, repeat=args.repeat
+    )
+    logger.info(f"Replaying {len(server.updates)} book updates on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Replay server stopped")
+
+
+if __name__ == "__main__":
+    main()
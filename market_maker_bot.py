@@ -8,15 +8,33 @@ Website: https://roboquant.ai
 
 import ccxt
 import time
-import math
 import json
 import os
 import sys
 from datetime import datetime
 from collections import deque
-import statistics
 import logging
-from typing import Dict, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any
+
+from market_data import OrderBookStream
+from order_book import L2Book
+from volatility import VolatilityEstimator
+from quote_manager import QuoteManager, QuoteLadder
+from order_entry import OrderEntry
+from recorder import MarketDataRecorder
+from balance import BalanceService
+from fill_ledger import FillLedger
+from order_tracker import OrderTracker
+from metrics import Metrics, TICK_STAGES
+from quote_kernel import quote_prices, order_sizes
+from fast_logging import EventLog, start_queued_logging
+from rate_limit import RateLimiter
+from venues import venue_for
+from market_cache import MarketCache
+from checkpoint import StateCheckpoint, WarmState
+from strategy_config import StrategySnapshot, ConfigWatcher, restart_required
+from profiler import Profiler
+from global_risk import GlobalRisk
 
 # Configure logging
 logging.basicConfig(
@@ -32,32 +50,73 @@ logger = logging.getLogger(__name__)
 class UniversalMarketMaker:
     """Universal market maker supporting multiple exchanges"""
     
+    # ccxt class name per exchange name, looked up only for the configured exchange; a venue
+    # needing special handling also gets an adapter in venues.py
     SUPPORTED_EXCHANGES = {
-        'binance': ccxt.binance,
-        'bybit': ccxt.bybit,
-        'okx': ccxt.okx,
-        'kucoin': ccxt.kucoin,
-        'gate': ccxt.gate,
-        'mexc': ccxt.mexc,
-        'bitget': ccxt.bitget,
-        'hyperliquid': ccxt.hyperliquid,
-        'phemex': ccxt.phemex,
-        'huobi': ccxt.huobi,
-        'kraken': ccxt.kraken
+        'binance': 'binance',
+        'bybit': 'bybit',
+        'okx': 'okx',
+        'kucoin': 'kucoin',
+        'gate': 'gate',
+        'mexc': 'mexc',
+        'bitget': 'bitget',
+        'hyperliquid': 'hyperliquid',
+        'phemex': 'phemex',
+        'huobi': 'htx',  # Renamed in ccxt
+        'kraken': 'kraken'
     }
     
-    def __init__(self, config_path: str = 'config.json'):
-        """Initialize the market maker with configuration"""
-        self.config = self.load_config(config_path)
+    def __init__(self, config_path: str = 'config.json', config: Optional[Dict[str, Any]] = None):
+        """Initialize the market maker with configuration (a file path, or an already loaded dict)"""
+        self.started = time.perf_counter()
+        self.startup: Dict[str, float] = {}  # Seconds from startup to each milestone
+        self.config = config if config is not None else self.load_config(config_path)
+        self.config_path = config_path if config is None else None  # Watched for hot reloads
+        self.venue = venue_for(self.config['exchange']['name'])
         self.exchange = None
+        self.exchange_config = {}
+        self.market_cache = None
         self.symbol = None
         self.price_history = deque(maxlen=self.config['strategy']['sigma_lookback'])
         self.inventory = 0
         self.pnl = 0
         self.trades_count = 0
         self.current_orders = {'bid': None, 'ask': None}
+        self.quote_manager = None
+        self.order_entry = None
+        self.recorder = None
+        self.balance = None
+        self.fill_ledger = None
+        self.order_tracker = None
+        self.checkpoint = None
+        self.global_risk = None
+        self.halted = None  # Why the global risk limits stopped this symbol
+        self.metrics = None
+        self.events = None
+        self.rate_limiter = None
+        self.stage_latency = {}
+        self.strategy = None
+        self.constants = None
+        self.pending_config = None  # (config, snapshot) waiting to be swapped in before the next tick
+        self.config_watcher = None
+        self.profiler = None
         self.volatility = 0.01
+        self.volatility_estimator = VolatilityEstimator(
+            lookback=self.config['strategy']['sigma_lookback'],
+            mode=self.config['strategy'].get('volatility_mode', 'window'),
+            halflife=self.config['strategy'].get('volatility_halflife', 60.0),
+            initial=self.volatility
+        )
         self.running = False
+        self.show_status = True
+        self.status_interval = self.config.get('logging', {}).get('status_interval', 0.0)
+        self.last_status = 0.0
+        self.last_quote = None
+        self.clock = time.time  # Replaced by a simulated clock when backtesting
+        self.book_stream = None
+        self.book = L2Book()  # Filled from REST when there is no fresh stream
+        self.book_version = 0
+        self.using_rest_fallback = False
         
     def load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from JSON file"""
@@ -70,48 +129,44 @@ class UniversalMarketMaker:
             logger.error(f"Failed to load config: {e}")
             sys.exit(1)
     
-    def initialize_exchange(self) -> None:
-        """Initialize the exchange connection"""
+    def initialize_exchange(self, symbols: Optional[List[str]] = None) -> None:
+        """Initialize the exchange connection and the markets of ``symbols`` (default: the configured symbol)"""
         exchange_name = self.config['exchange']['name'].lower()
         
         if exchange_name not in self.SUPPORTED_EXCHANGES:
             raise ValueError(f"Exchange {exchange_name} not supported. Supported exchanges: {list(self.SUPPORTED_EXCHANGES.keys())}")
         
-        exchange_class = self.SUPPORTED_EXCHANGES[exchange_name]
-        
-        # Build exchange config
-        exchange_config = {
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'future'  # For perpetual contracts
-            }
-        }
-        
-        # Add API credentials if provided
-        if self.config['exchange'].get('api_key'):
-            exchange_config['apiKey'] = self.config['exchange']['api_key']
-            exchange_config['secret'] = self.config['exchange']['api_secret']
+        exchange_class = getattr(ccxt, self.SUPPORTED_EXCHANGES[exchange_name])
         
-        # Add special parameters for specific exchanges
-        if exchange_name == 'hyperliquid':
-            if self.config['exchange'].get('private_key'):
-                exchange_config['privateKey'] = self.config['exchange']['private_key']
-                exchange_config['walletAddress'] = self.config['exchange']['wallet_address']
-        
-        # Testnet/Sandbox mode
-        if self.config['exchange'].get('testnet', False):
-            exchange_config['sandbox'] = True
+        # Credentials, contract type and sandbox mode, plus any venue-specific options
+        exchange_config = self.venue.exchange_config(self.config['exchange'])
         
         # Initialize exchange
         self.exchange = exchange_class(exchange_config)
+        self.exchange_config = exchange_config
+        self.venue.resolve(self.exchange)
         
-        # Load markets
+        # Load markets: just the quoted ones from the cache when it is fresh, with the full
+        # list refreshed in the background, else everything from the exchange
+        symbols = symbols or [self.config['trading']['symbol']]
+        self.market_cache = MarketCache.from_config(self.config.get('markets', {}))
         try:
-            self.exchange.load_markets()
+            if self.market_cache is not None and self.market_cache.load(self.exchange, symbols):
+                self.market_cache.refresh(self.exchange, exchange_config, symbols)
+            else:
+                self.exchange.load_markets()
+                if self.market_cache is not None:
+                    self.market_cache.save(self.exchange)
             logger.info(f"Successfully connected to {exchange_name}")
         except Exception as e:
             logger.error(f"Failed to connect to exchange: {e}")
             raise
+        self.startup['markets'] = time.perf_counter() - self.started
+        
+        # Stream clients start from the quoted markets instead of downloading the full list again
+        self.exchange_config['markets'] = {
+            symbol: self.exchange.markets[symbol] for symbol in symbols if symbol in self.exchange.markets
+        }
     
     def validate_symbol(self) -> None:
         """Validate and set the trading symbol"""
@@ -138,149 +193,133 @@ class UniversalMarketMaker:
         except Exception as e:
             logger.warning(f"Could not set leverage: {e}")
     
-    def calculate_volatility(self) -> float:
-        """Calculate realized volatility from price history"""
-        if len(self.price_history) < 2:
-            return self.volatility
+    def start_market_data(self) -> None:
+        """Start the WebSocket order book stream if enabled in config"""
+        market_data = self.config.get('market_data', {})
+        if market_data.get('mode', 'rest') != 'websocket':
+            logger.info("Market data mode: REST polling")
+            return
         
-        returns = []
-        for i in range(1, len(self.price_history)):
-            ret = math.log(self.price_history[i] / self.price_history[i-1])
-            returns.append(ret)
+        exchange_name = self.config['exchange']['name'].lower()
+        self.book_stream = OrderBookStream(
+            self.symbol,
+            exchange_id=exchange_name,
+            exchange_config={
+                'options': {'defaultType': self.exchange.options.get('defaultType', 'future')},
+                'sandbox': self.config['exchange'].get('testnet', False),
+                'markets': self.exchange_config.get('markets')
+            },
+            ws_url=market_data.get('ws_url') or None,
+            depth=market_data.get('depth', 20)
+        )
+        self.book_stream.start()
+        logger.info("Market data mode: WebSocket stream with REST fallback")
+        
+        if not self.book_stream.wait_for_update(market_data.get('stream_max_age', 5.0)):
+            logger.warning("No order book from stream yet, using REST until it arrives")
+    
+    def read_order_book(self) -> Optional[Tuple[float, float, float]]:
+        """Best bid, best ask and fair price from the stream, or over REST if the stream is stale"""
+        strategy = self.strategy
+        if self.book_stream is not None:
+            top = self.book_stream.read(strategy.fair_price, strategy.fair_price_levels, strategy.stream_max_age)
+            if top is not None:
+                if self.using_rest_fallback:
+                    logger.info("Order book stream recovered")
+                    self.using_rest_fallback = False
+                self.book_version = top[3]
+                return top[:3]
+            if not self.using_rest_fallback:
+                logger.warning("Order book stream stale, falling back to REST")
+                self.using_rest_fallback = True
+        
+        orderbook = self.exchange.fetch_order_book(self.symbol)
+        if not orderbook['bids'] or not orderbook['asks']:
+            return None
+        self.book.apply_snapshot(orderbook['bids'], orderbook['asks'])
+        return self.book.top(strategy.fair_price, strategy.fair_price_levels)
+    
+    def book_levels(self) -> Dict[str, Any]:
+        """Top levels of the book the last tick read, for the recorder"""
+        if self.book_stream is not None and not self.using_rest_fallback:
+            return self.book_stream.get_order_book() or self.book.as_dict()
+        return self.book.as_dict()
+    
+    def wait_for_next_tick(self, start_time: float, update_frequency: float) -> None:
+        """Sleep until the next update, waking early when the streamed top of book moves"""
+        elapsed = time.time() - start_time
+        sleep_time = max(0, update_frequency - elapsed)
         
-        if len(returns) > 1:
-            self.volatility = statistics.stdev(returns) * math.sqrt(3600)
-            self.volatility = max(self.volatility, 0.001)
+        if self.book_stream is None or self.using_rest_fallback:
+            time.sleep(sleep_time)
+            return
         
+        # Never requote faster than min_update_interval, however busy the book is
+        time.sleep(min(max(0, self.strategy.min_update_interval - elapsed), sleep_time))
+        remaining = update_frequency - (time.time() - start_time)
+        self.book_stream.wait_for_update(remaining, self.book_version)
+    
+    def calculate_volatility(self) -> float:
+        """Return the current realized volatility (updated in O(1) per tick)"""
+        self.volatility = self.volatility_estimator.volatility
         return self.volatility
     
-    def calculate_reservation_price(self, mid_price: float) -> float:
-        """Calculate reservation price based on inventory"""
-        gamma = self.config['strategy']['gamma']
-        T = self.config['strategy']['time_horizon']
-        
-        sigma = self.calculate_volatility()
-        time_remaining = T - (time.time() % 3600) / 3600
-        time_remaining = max(time_remaining, 0.01)
-        
-        reservation_price = mid_price - (self.inventory * gamma * sigma**2 * time_remaining)
-        return reservation_price
+    def load_strategy(self) -> None:
+        """Build the strategy snapshot, kernel constants included, for the current config and market"""
+        self.strategy = StrategySnapshot.from_config(self.config, self.exchange.markets[self.symbol], self.venue)
+        self.constants = self.strategy.constants
     
-    def calculate_optimal_spread(self, mid_price: float) -> float:
-        """Calculate optimal bid-ask spread"""
-        gamma = self.config['strategy']['gamma']
-        k = self.config['strategy']['k']
-        T = self.config['strategy']['time_horizon']
-        
-        sigma = self.calculate_volatility()
-        time_remaining = T - (time.time() % 3600) / 3600
-        time_remaining = max(time_remaining, 0.01)
-        
-        spread = gamma * sigma**2 * time_remaining + (2/gamma) * math.log(1 + gamma/k)
-        
-        min_spread = self.config['strategy']['min_spread']
-        spread = max(spread, min_spread)
-        spread = spread * mid_price
-        
-        max_spread = mid_price * self.config['strategy']['max_spread_percent']
-        spread = min(spread, max_spread)
-        
-        return spread
+    def reload_config(self, config: Dict[str, Any]) -> None:
+        """Validate a changed config and queue its snapshot for the next tick (called from the watcher thread)"""
+        try:
+            strategy = StrategySnapshot.from_config(config, self.exchange.markets[self.symbol], self.venue,
+                                                    version=self.strategy.version + 1)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Config change for {self.symbol} rejected, keeping the current strategy: {e!r}")
+            return
+        restart = restart_required(self.config, config)
+        if restart:
+            logger.warning(f"Changes to {', '.join(restart)} take effect after a restart")
+        self.pending_config = (config, strategy)
+    
+    def apply_strategy(self, config: Dict[str, Any], strategy: StrategySnapshot) -> None:
+        """Swap in a new snapshot between ticks; resting orders, inventory and price history are kept"""
+        logger.info(f"Strategy v{strategy.version} for {self.symbol}: {self.strategy.changes(strategy)}")
+        self.config = config
+        self.strategy = strategy
+        self.constants = strategy.constants
+        manager = self.quote_manager
+        manager.tick_tolerance = strategy.tick_tolerance
+        manager.bps_tolerance = strategy.bps_tolerance
+        manager.size_tolerance = strategy.size_tolerance
+        if isinstance(manager, QuoteLadder):
+            manager.constants = strategy.constants
+            manager.spacing = strategy.level_spacing
+            manager.size_step = strategy.level_size_step
+    
+    def get_time_remaining(self) -> float:
+        """Hours left in the current hourly horizon cycle"""
+        return max(self.strategy.time_horizon - (self.clock() % 3600) / 3600, 0.01)
     
     def calculate_quote_prices(self, mid_price: float) -> Tuple[float, float]:
-        """Calculate optimal bid and ask prices"""
-        reservation_price = self.calculate_reservation_price(mid_price)
-        spread = self.calculate_optimal_spread(mid_price)
-        
-        bid_price = reservation_price - spread/2
-        ask_price = reservation_price + spread/2
-        
-        # Ensure quotes don't cross the market
-        max_bid_distance = self.config['strategy']['max_quote_distance_percent']
-        bid_price = min(bid_price, mid_price * (1 - max_bid_distance))
-        ask_price = max(ask_price, mid_price * (1 + max_bid_distance))
-        
-        # Round to exchange precision
-        market = self.exchange.markets[self.symbol]
-        price_precision = market['precision']['price'] or 0
-        
-        if isinstance(price_precision, int):
-            bid_price = round(bid_price, price_precision)
-            ask_price = round(ask_price, price_precision)
-        else:
-            # Handle tick size
-            tick_size = float(price_precision)
-            bid_price = round(bid_price / tick_size) * tick_size
-            ask_price = round(ask_price / tick_size) * tick_size
-        
-        return bid_price, ask_price
+        """Calculate optimal bid and ask prices around ``mid_price`` (the fair price)"""
+        return quote_prices(mid_price, self.inventory, self.calculate_volatility(),
+                            self.get_time_remaining(), self.constants)
     
     def calculate_position_size(self, price: float) -> float:
         """Calculate position size based on configuration"""
-        market = self.exchange.markets[self.symbol]
-        min_size = market['limits']['amount']['min'] or 0
-        
-        # Base size from config
-        if self.config['trading']['order_size_type'] == 'fixed':
-            base_size = self.config['trading']['order_size']
-        else:  # percentage of balance
-            balance = self.get_available_balance()
-            percentage = self.config['trading']['order_size_percent']
-            base_size = (balance * percentage) / price
-        
-        # Inventory adjustment
-        max_inventory = self.config['risk']['max_inventory_usd']
-        inventory_value = abs(self.inventory * price)
-        
-        if inventory_value > max_inventory * 0.7:
-            size_multiplier = 0.5
-        elif inventory_value > max_inventory * 0.5:
-            size_multiplier = 0.75
+        strategy = self.strategy
+        if strategy.percentage_sizing:
+            base_size = self.get_available_balance() * strategy.order_size_percent / price
         else:
-            size_multiplier = 1.0
+            base_size = strategy.order_size
         
-        size = base_size * size_multiplier
-        
-        # Ensure minimum viable order size
-        if size < 0.001:  # Minimum 0.001 SOL
-            size = 0.001
-        
-        # Round to exchange precision
-        amount_precision = market['precision']['amount'] or 0
-        if isinstance(amount_precision, int):
-            size = round(size, amount_precision)
-        else:
-            # Handle lot size
-            lot_size = float(amount_precision)
-            size = round(size / lot_size) * lot_size
-        
-        # Final size validation
-        final_size = max(size, min_size)
-        if final_size < 0.001:
-            final_size = 0.001  # Force minimum size
-        
-        # For Hyperliquid, ensure we have a reasonable minimum size
-        if self.config['exchange']['name'].lower() == 'hyperliquid':
-            # Hyperliquid requires minimum $10 order value - add larger buffer
-            min_usd_value = 11.0  # $1.00 buffer to ensure we're above $10
-            min_sol_size = min_usd_value / price
-            
-            if final_size < min_sol_size:
-                final_size = min_sol_size
-            
-            # Round to 4 decimal places to avoid precision issues
-            final_size = round(final_size, 4)
-            
-            # Ensure we still meet the $10 minimum after rounding
-            if final_size * price < 10.0:
-                final_size = round(11.0 / price, 4)
-            
-            logger.info(f"Hyperliquid order size: {final_size} SOL (${final_size * price:.2f})")
-        
-        return final_size
+        return order_sizes(price, self.inventory, base_size, self.constants)
     
     def get_available_balance(self) -> float:
-        """Get available balance in quote currency"""
+        """Get available balance in quote currency, from the balance service cache when running"""
+        if self.balance is not None:
+            return self.balance.get()
         try:
             balance = self.exchange.fetch_balance()
             quote_currency = self.symbol.split('/')[1].split(':')[0]
@@ -289,100 +328,83 @@ class UniversalMarketMaker:
             logger.error(f"Error fetching balance: {e}")
             return 0
     
+    def cancel_orders(self, order_ids: list) -> list:
+        """Cancel orders by ID, concurrently when the order entry pool is running"""
+        def cancel(order_id):
+            try:
+                return self.exchange.cancel_order(order_id, self.symbol)
+            except Exception as e:
+                return e
+        
+        if self.order_entry is not None:
+            return self.order_entry.map(cancel, order_ids)
+        return [cancel(order_id) for order_id in order_ids]
+    
     def cancel_all_orders(self) -> None:
         """Cancel all open orders"""
         try:
-            # Hyperliquid doesn't support cancelAllOrders, so we fetch and cancel individually
-            if self.config['exchange']['name'].lower() == 'hyperliquid':
-                open_orders = self.exchange.fetch_open_orders(self.symbol)
-                for order in open_orders:
-                    try:
-                        self.exchange.cancel_order(order['id'], self.symbol)
-                    except Exception as cancel_error:
-                        logger.warning(f"Could not cancel order {order['id']}: {cancel_error}")
-                logger.info(f"Cancelled {len(open_orders)} orders on Hyperliquid")
-            elif hasattr(self.exchange, 'cancel_all_orders'):
-                self.exchange.cancel_all_orders(self.symbol)
-                logger.info("All orders cancelled")
-            else:
-                open_orders = self.exchange.fetch_open_orders(self.symbol)
-                for order in open_orders:
-                    self.exchange.cancel_order(order['id'], self.symbol)
-                logger.info("All orders cancelled")
+            # Native cancel-all, else one batch cancel, else concurrent single cancels; the
+            # tracker already knows which orders rest, which saves fetching them first
+            resting = self.order_tracker.resting_ids() if self.order_tracker is not None else None
+            cancelled = self.venue.cancel_all(self.exchange, self.symbol, self.cancel_orders, resting)
+            logger.info("All orders cancelled" if cancelled is None else f"Cancelled {cancelled} orders")
+            
+            self.current_orders = {'bid': None, 'ask': None}
+            if self.order_tracker is not None:
+                self.order_tracker.on_cancel_all()
+            if self.events is not None:
+                self.events.record('cancel_all', symbol=self.symbol)
         except Exception as e:
             logger.error(f"Error cancelling orders: {e}")
     
     def place_orders(self, bid_price: float, ask_price: float, size: float) -> None:
-        """Place bid and ask orders"""
+        """Bring the resting bid and ask in line with the new quotes"""
         # Validate order size before proceeding
         if size <= 0:
             logger.error(f"Invalid order size: {size}. Skipping order placement.")
             return
         
-        self.cancel_all_orders()
-        
-        try:
-            # Place bid order
-            logger.info(f"Attempting to place bid: {size} SOL @ ${bid_price}")
-            
-            # For Hyperliquid, try to ensure proper order format
-            if self.config['exchange']['name'].lower() == 'hyperliquid':
-                # Add extra validation for Hyperliquid
-                order_value = size * bid_price
-                logger.info(f"Bid order value: ${order_value:.2f}")
-                
-                if order_value < 10.0:
-                    logger.warning(f"Bid order value ${order_value:.2f} is below $10 minimum")
-            
-            bid_order = self.exchange.create_limit_order(
-                self.symbol, 'buy', size, bid_price
-            )
-            self.current_orders['bid'] = bid_order
-            logger.info(f"Bid placed: {size} @ {bid_price}")
-        except Exception as e:
-            logger.error(f"Error placing bid: {e}")
+        # Warn about orders below the venue's minimum value (e.g. $10 on Hyperliquid)
+        if self.venue.min_notional:
+            self.venue.check_order_value('Bid', bid_price, size)
+            self.venue.check_order_value('Ask', ask_price, size)
         
-        try:
-            # Place ask order
-            logger.info(f"Attempting to place ask: {size} SOL @ ${ask_price}")
-            
-            # For Hyperliquid, try to ensure proper order format
-            if self.config['exchange']['name'].lower() == 'hyperliquid':
-                # Add extra validation for Hyperliquid
-                order_value = size * ask_price
-                logger.info(f"Ask order value: ${order_value:.2f}")
-                
-                if order_value < 10.0:
-                    logger.warning(f"Ask order value ${order_value:.2f} is below $10 minimum")
-            
-            ask_order = self.exchange.create_limit_order(
-                self.symbol, 'sell', size, ask_price
-            )
-            self.current_orders['ask'] = ask_order
-            logger.info(f"Ask placed: {size} @ {ask_price}")
-        except Exception as e:
-            logger.error(f"Error placing ask: {e}")
+        self.current_orders = self.quote_manager.update(self.current_orders, bid_price, ask_price, size)
     
     def update_inventory(self) -> None:
-        """Update inventory from recent trades"""
+        """Update inventory from new fills and reconcile it with the exchange position"""
         try:
-            since = int((time.time() - 300) * 1000)  # Last 5 minutes
-            trades = self.exchange.fetch_my_trades(self.symbol, since=since, limit=50)
+            for trade in self.fill_ledger.poll():
+                if trade['side'] == 'buy':
+                    self.inventory += trade['amount']
+                else:
+                    self.inventory -= trade['amount']
+                
+                self.trades_count += 1
+                
+                # Update PnL
+                fee = (trade.get('fee') or {}).get('cost') or 0
+                self.pnl -= fee
+                
+                logger.info(f"Trade: {trade['side']} {trade['amount']} @ {trade['price']}")
+                if self.events is not None:
+                    self.events.record('fill', symbol=self.symbol, id=trade.get('id'), order=trade.get('order'),
+                                       side=trade['side'], price=trade['price'], amount=trade['amount'],
+                                       fee=fee, inventory=self.inventory)
+                if self.recorder is not None:
+                    self.recorder.record_fill(trade)
+                if self.balance is not None:
+                    self.balance.on_fill(trade)
+                if self.order_tracker is not None:
+                    self.order_tracker.on_fill(trade)
+                if self.global_risk is not None:
+                    self.global_risk.on_fill(trade)
             
-            for trade in trades:
-                if trade['timestamp'] > since:
-                    if trade['side'] == 'buy':
-                        self.inventory += trade['amount']
-                    else:
-                        self.inventory -= trade['amount']
-                    
-                    self.trades_count += 1
-                    
-                    # Update PnL
-                    fee = trade.get('fee', {}).get('cost', 0)
-                    self.pnl -= fee
-                    
-                    logger.info(f"Trade: {trade['side']} {trade['amount']} @ {trade['price']}")
+            min_amount = self.exchange.markets[self.symbol]['limits']['amount']['min'] or 0
+            position = self.fill_ledger.check_inventory(self.inventory, max(min_amount / 2, 1e-9))
+            if position is not None:
+                logger.warning(f"Inventory {self.inventory:.4f} differs from exchange position {position:.4f} on two checks, using exchange position")
+                self.inventory = position
         except Exception as e:
             logger.error(f"Error updating inventory: {e}")
     
@@ -392,13 +414,247 @@ class UniversalMarketMaker:
         spread_bps = (spread / mid_price) * 10000
         balance = self.get_available_balance()
         
-        print(f"\n{'='*60}")
-        print(f"Exchange: {self.config['exchange']['name']} | Symbol: {self.symbol}")
-        print(f"Mid Price: ${mid_price:.4f} | Spread: {spread_bps:.1f}bps")
-        print(f"Volatility: {self.volatility:.3f} | Inventory: {self.inventory:.4f}")
-        print(f"Bid: ${bid_price:.4f} | Ask: ${ask_price:.4f} | Size: {size:.4f}")
-        print(f"Trades: {self.trades_count} | PnL: ${self.pnl:.2f}")
-        print(f"Balance: ${balance:.2f}")
+        lines = [
+            f"\n{'='*60}",
+            f"Exchange: {self.config['exchange']['name']} | Symbol: {self.symbol}",
+            f"Mid Price: ${mid_price:.4f} | Spread: {spread_bps:.1f}bps",
+            f"Volatility: {self.volatility:.3f} | Inventory: {self.inventory:.4f}",
+            f"Bid: ${bid_price:.4f} | Ask: ${ask_price:.4f} | Size: {size:.4f}",
+            f"Trades: {self.trades_count} | PnL: ${self.pnl:.2f}",
+            f"Balance: ${balance:.2f} ({self.balance.describe()})",
+            f"Orders: {self.quote_manager.summary()}",
+            f"Order states: {self.order_tracker.summary()}"
+        ]
+        if self.rate_limiter is not None:
+            lines.append(f"Rate limit: {self.rate_limiter.describe()}")
+        
+        # One write per refresh rather than one per line
+        print('\n'.join(lines))
+    
+    def prepare_symbol(self, order_entry: OrderEntry) -> None:
+        """Validate the symbol and start its market data and quote maintenance"""
+        if self.metrics is None:
+            self.metrics = Metrics.from_config(self.config.get('metrics', {}))
+        self.metrics.instrument(self.exchange)
+        if self.rate_limiter is None:
+            self.rate_limiter = RateLimiter.from_config(
+                self.config['exchange']['name'].lower(), self.exchange,
+                self.config.get('rate_limit', {}), metrics=self.metrics
+            )
+        if self.rate_limiter is not None:
+            self.rate_limiter.instrument(self.exchange)
+        self.validate_symbol()
+        self.load_strategy()
+        self.stage_latency = self.metrics.stages(self.symbol, TICK_STAGES)
+        self.set_leverage()
+        self.start_market_data()
+        self.order_entry = order_entry
+        if self.balance is None:
+            self.balance = self.create_balance_service()
+        self.fill_ledger = FillLedger.from_config(
+            self.exchange, self.symbol, self.config.get('fills', {}),
+            exchange_id=self.config['exchange']['name'].lower(), exchange_config=self.exchange_config
+        )
+        self.fill_ledger.start()
+        self.checkpoint = StateCheckpoint.from_config(
+            self.config.get('checkpoint', {}), self.config['exchange']['name'], self.symbol,
+            self.volatility_estimator.lookback, self.volatility_estimator.mode
+        )
+        if self.checkpoint is not None:
+            self.restore_state()
+        self.global_risk = GlobalRisk.from_config(
+            self.config.get('global_risk', {}), GlobalRisk.name_for(self.config['exchange']['name'], self.symbol),
+            contract_size=self.exchange.markets[self.symbol].get('contractSize') or 1.0
+        )
+        if self.events is None:
+            self.events = EventLog.from_config(self.config.get('logging', {}))
+        self.order_tracker = OrderTracker.from_config(
+            self.exchange, self.symbol, self.config.get('orders', {}), venue=self.venue,
+            exchange_id=self.config['exchange']['name'].lower(), exchange_config=self.exchange_config
+        )
+        self.order_tracker.start()
+        quoting = self.config.get('quoting', {})
+        order_params = self.venue.order_params(quoting.get('post_only', False))
+        if quoting.get('levels', 1) > 1:
+            self.quote_manager = QuoteLadder.from_config(
+                self.exchange, self.symbol, quoting, order_entry=self.order_entry,
+                events=self.events, constants=self.constants, order_params=order_params,
+                tracker=self.order_tracker
+            )
+        else:
+            self.quote_manager = QuoteManager.from_config(
+                self.exchange, self.symbol, quoting, order_entry=self.order_entry, events=self.events,
+                order_params=order_params, tracker=self.order_tracker
+            )
+        
+        recorder_config = self.config.get('recorder', {})
+        if recorder_config.get('enabled', False):
+            self.recorder = MarketDataRecorder.for_market(
+                recorder_config.get('directory', 'data'), self.symbol,
+                self.exchange.markets[self.symbol], levels=recorder_config.get('levels', 5)
+            )
+        # Quotes left on the book by an earlier run are not in current_orders; pull them before quoting
+        self.cancel_all_orders()
+        self.startup['setup'] = time.perf_counter() - self.started
+    
+    def restore_state(self) -> None:
+        """Resume inventory, PnL, prices and volatility from the last checkpoint if it is fresh"""
+        state = self.checkpoint.load()
+        if state is not None:
+            self.inventory = state.inventory
+            self.pnl = state.pnl
+            self.trades_count = state.trades_count
+            self.price_history.extend(state.prices)
+            if state.estimator is not None:
+                self.volatility_estimator.restore(*state.estimator)
+                self.volatility = self.volatility_estimator.volatility
+            # Fills up to the cursor are already in the inventory; those made while down are fetched
+            if state.fill_cursor:
+                self.fill_ledger.since = state.fill_cursor + 1
+            logger.info(f"Resumed {self.symbol} from a {time.time() - state.saved:.0f}s old checkpoint: "
+                        f"inventory {self.inventory:.4f}, volatility {self.volatility:.4f}"
+                        + ("" if state.estimator is not None else " (volatility settings changed, re-estimating)"))
+        self.checkpoint.open()
+    
+    def save_state(self, now: float) -> None:
+        """Checkpoint the strategy state"""
+        self.checkpoint.save(WarmState(
+            now, self.inventory, self.pnl, self.trades_count, None, self.fill_ledger.since,
+            self.volatility_estimator.volatility, self.volatility_estimator.state(), list(self.price_history)
+        ))
+    
+    def create_balance_service(self) -> BalanceService:
+        """Start the cached balance service for this symbol's quote currency"""
+        balance = BalanceService.from_config(
+            self.exchange, self.symbol.split('/')[1].split(':')[0], self.config.get('balance', {}),
+            background=self.order_entry is not None, exchange_id=self.config['exchange']['name'].lower(),
+            exchange_config=self.exchange_config
+        )
+        balance.start()
+        return balance
+    
+    def _lap(self, stage: str, start: float) -> float:
+        """Record the latency of a tick stage that began at ``start`` and return the time now"""
+        now = time.perf_counter()
+        self.stage_latency[stage].observe(now - start)
+        return now
+    
+    def tick(self, start_time: float) -> Optional[float]:
+        """Run one quoting update; returns a back-off delay in seconds if the update was skipped"""
+        tick_start = lap = time.perf_counter()
+        
+        # A reloaded config goes live here, between ticks
+        pending = self.pending_config
+        if pending is not None:
+            self.pending_config = None
+            self.apply_strategy(*pending)
+        
+        # Read the book
+        top = self.read_order_book()
+        lap = self._lap('order_book', lap)
+        if top is None:
+            logger.warning(f"Empty orderbook for {self.symbol}, retrying...")
+            return 1
+        
+        if self.recorder is not None:
+            self.recorder.record_book(start_time, self.book_levels())
+        
+        # Mid price for risk and volatility, fair price for the quotes
+        best_bid, best_ask, fair_price = top
+        mid_price = (best_bid + best_ask) / 2
+        
+        # Update price history
+        self.price_history.append(mid_price)
+        self.volatility_estimator.push(mid_price, start_time)
+        
+        # Update inventory
+        self.update_inventory()
+        lap = self._lap('inventory', lap)
+        
+        # Firm-wide limits, shared with every process on the same risk table
+        if self.global_risk is not None:
+            self.halted = self.global_risk.update(self.inventory, mid_price, start_time)
+            if self.halted is not None:
+                logger.error(f"Global risk limit reached, stopping {self.symbol}: {self.halted}")
+                self.cancel_all_orders()
+                self._lap('cancel', lap)
+                self.running = False
+                return 0
+        
+        # Check risk limits
+        inventory_value = abs(self.inventory * mid_price)
+        max_inventory = self.strategy.max_inventory_usd
+        
+        if inventory_value > max_inventory:
+            logger.warning(f"Inventory limit reached on {self.symbol}: ${inventory_value:.2f} > ${max_inventory}")
+            self.cancel_all_orders()
+            self._lap('cancel', lap)
+            if self.checkpoint is not None and self.checkpoint.due(start_time):
+                self.save_state(start_time)
+            return 10
+        
+        # Calculate quotes
+        bid_price, ask_price = self.calculate_quote_prices(fair_price)
+        lap = self._lap('quote', lap)
+        size = self.calculate_position_size(mid_price)
+        lap = self._lap('sizing', lap)
+        self.last_quote = (mid_price, bid_price, ask_price, size)
+        if self.recorder is not None:
+            self.recorder.record_quote(start_time, bid_price, ask_price, size)
+        
+        # Display status, at most once per status_interval
+        if self.show_status and start_time - self.last_status >= self.status_interval:
+            self.last_status = start_time
+            self.display_status(mid_price, bid_price, ask_price, size)
+            lap = self._lap('status', lap)
+        
+        # Place orders
+        sent = self.quote_manager.stats['sent']
+        self.place_orders(bid_price, ask_price, size)
+        lap = self._lap('orders', lap)
+        if self.quote_manager.stats['sent'] != sent:
+            self.stage_latency['quote_live'].observe(lap - tick_start)
+            if 'first_quote' not in self.startup:
+                self.report_startup(lap)
+        
+        elapsed = self._lap('tick', tick_start) - tick_start
+        if elapsed > self.strategy.update_frequency:
+            self.metrics.count('loop_overruns', symbol=self.symbol)
+        self.metrics.maybe_log_summary(start_time)
+        if self.checkpoint is not None and self.checkpoint.due(start_time):
+            self.save_state(start_time)
+        return None
+    
+    def report_startup(self, now: float) -> None:
+        """Record and log how long this symbol took from startup to its first quotes"""
+        self.startup['first_quote'] = now - self.started
+        for stage, seconds in self.startup.items():
+            self.metrics.histogram('startup', symbol=self.symbol, stage=stage).observe(seconds)
+        logger.info(f"Time to first quote for {self.symbol}: {self.startup['first_quote']:.2f}s ("
+                    + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.startup.items()
+                                if stage != 'first_quote') + ")")
+    
+    def shutdown(self) -> None:
+        """Stop market data and pull this symbol's quotes"""
+        # Orders still being sent must be known before the final cancel-all
+        if self.quote_manager is not None:
+            self.quote_manager.drain(self.current_orders)
+        if self.book_stream is not None:
+            self.book_stream.stop()
+        if self.balance is not None:
+            self.balance.stop()
+        if self.fill_ledger is not None:
+            self.fill_ledger.stop()
+        if self.order_tracker is not None:
+            self.order_tracker.stop()
+        self.cancel_all_orders()
+        if self.checkpoint is not None:
+            self.save_state(time.time())
+            self.checkpoint.close()
+        if self.global_risk is not None:
+            self.global_risk.close()
+        if self.recorder is not None:
+            self.recorder.close()
     
     def run(self) -> None:
         """Main bot loop"""
@@ -406,60 +662,30 @@ class UniversalMarketMaker:
         
         # Initialize exchange
         self.initialize_exchange()
-        self.validate_symbol()
-        self.set_leverage()
+        self.prepare_symbol(OrderEntry.from_config(self.config.get('order_entry', {})))
         
-        self.running = True
-        update_frequency = self.config['strategy']['update_frequency']
+        self.config_watcher = ConfigWatcher.from_config(self.config_path, self.config.get('reload', {}),
+                                                        self.reload_config)
+        if self.config_watcher is not None:
+            self.config_watcher.start()
+        self.profiler = Profiler.from_config(self.config.get('profiling', {}))
         
-        logger.info(f"Bot started - Update frequency: {update_frequency}s")
+        self.running = True
+        logger.info(f"Bot started - Update frequency: {self.strategy.update_frequency}s")
         
         while self.running:
             try:
                 start_time = time.time()
                 
-                # Fetch orderbook
-                orderbook = self.exchange.fetch_order_book(self.symbol)
-                if not orderbook['bids'] or not orderbook['asks']:
-                    logger.warning("Empty orderbook, retrying...")
-                    time.sleep(1)
+                delay = self.tick(start_time)
+                if self.profiler is not None:
+                    self.profiler.tick()
+                if delay is not None:
+                    time.sleep(delay)
                     continue
                 
-                # Calculate mid price
-                best_bid = orderbook['bids'][0][0]
-                best_ask = orderbook['asks'][0][0]
-                mid_price = (best_bid + best_ask) / 2
-                
-                # Update price history
-                self.price_history.append(mid_price)
-                
-                # Update inventory
-                self.update_inventory()
-                
-                # Check risk limits
-                inventory_value = abs(self.inventory * mid_price)
-                max_inventory = self.config['risk']['max_inventory_usd']
-                
-                if inventory_value > max_inventory:
-                    logger.warning(f"Inventory limit reached: ${inventory_value:.2f} > ${max_inventory}")
-                    self.cancel_all_orders()
-                    time.sleep(10)
-                    continue
-                
-                # Calculate quotes
-                bid_price, ask_price = self.calculate_quote_prices(mid_price)
-                size = self.calculate_position_size(mid_price)
-                
-                # Display status
-                self.display_status(mid_price, bid_price, ask_price, size)
-                
-                # Place orders
-                self.place_orders(bid_price, ask_price, size)
-                
                 # Sleep until next update
-                elapsed = time.time() - start_time
-                sleep_time = max(0, update_frequency - elapsed)
-                time.sleep(sleep_time)
+                self.wait_for_next_tick(start_time, self.strategy.update_frequency)
                 
             except KeyboardInterrupt:
                 logger.info("Shutting down...")
@@ -469,7 +695,15 @@ class UniversalMarketMaker:
                 time.sleep(5)
         
         # Cleanup
-        self.cancel_all_orders()
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        if self.profiler is not None:
+            self.profiler.close()
+        self.shutdown()
+        self.order_entry.shutdown()
+        self.metrics.stop()
+        if self.events is not None:
+            self.events.close()
         logger.info("Bot stopped")
     
     def stop(self) -> None:
@@ -488,6 +722,14 @@ def main():
         default='config.json',
         help='Path to configuration file (default: config.json)'
     )
+    parser.add_argument(
+        '--profile',
+        type=int,
+        nargs='?',
+        const=0,
+        metavar='TICKS',
+        help='Profile the first TICKS ticks (default: profiling.ticks) into profiling.directory'
+    )
     
     args = parser.parse_args()
     
@@ -499,7 +741,19 @@ def main():
     
     # Create and run bot
     bot = UniversalMarketMaker(args.config)
+    if args.profile is not None:
+        profiling = bot.config.setdefault('profiling', {})
+        profiling.update(enabled=True, on_start=True)
+        if args.profile:
+            profiling['ticks'] = args.profile
+    
+    # A 'symbols' list quotes several pairs from this one process
+    if bot.config.get('symbols'):
+        from multi_symbol import MultiSymbolEngine
+        bot = MultiSymbolEngine(bot.config, config_path=args.config)
     
+    # Queued mode moves log formatting and I/O off the quoting thread
+    listener = start_queued_logging() if bot.config.get('logging', {}).get('mode') == 'queued' else None
     try:
         bot.run()
     except KeyboardInterrupt:
@@ -507,6 +761,9 @@ def main():
     except Exception as e:
         logger.error(f"Fatal error: {e}")
         sys.exit(1)
+    finally:
+        if listener is not None:
+            listener.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,232 @@
+"""
+Latency Metrics - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Per-stage and per-exchange-call latency histograms with a local
+Prometheus-style HTTP endpoint
+"""
+
+import bisect
+import functools
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (100us to 10s)
+BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+           0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# Exchange methods timed by Metrics.instrument()
+EXCHANGE_CALLS = (
+    'fetch_order_book', 'fetch_balance', 'fetch_my_trades', 'fetch_positions', 'fetch_open_orders',
+    'create_order', 'create_limit_order', 'create_orders', 'edit_order', 'cancel_order', 'cancel_orders',
+    'cancel_all_orders',
+)
+
+# Stages of one quoting tick; 'quote_live' runs from tick start until new quotes are acknowledged
+TICK_STAGES = ('order_book', 'inventory', 'cancel', 'quote', 'sizing', 'status', 'orders', 'quote_live', 'tick')
+
+PREFIX = 'roboquant'
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; ``observe`` is a bisect and a few increments"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max', '_lock')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (capped at the observed max)"""
+        with self._lock:
+            counts, total, largest = list(self.counts), self.count, self.max
+        if not total:
+            return 0.0
+        target = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(BUCKETS[index], largest) if index < len(BUCKETS) else largest
+        return largest
+
+
+class Metrics:
+    """Latency histograms and counters for the quoting loop, shared across symbols
+
+    Histograms are keyed by family and label values: ``stage`` histograms
+    time each part of a tick (see ``TICK_STAGES``) and ``exchange_call``
+    histograms time every call the exchange client makes, from any thread.
+    """
+
+    def __init__(self, summary_interval: float = 60.0):
+        self.summary_interval = summary_interval
+        self.histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
+        self.last_summary = time.time()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'Metrics':
+        """Build metrics from the ``metrics`` config section and start the endpoint if a port is set"""
+        metrics = cls(summary_interval=config.get('summary_interval', 60.0))
+        if config.get('port'):
+            metrics.serve(config.get('host', '127.0.0.1'), config['port'])
+        return metrics
+
+    def histogram(self, family: str, **labels: str) -> LatencyHistogram:
+        """Get or create the histogram for a family and label set (cache the result on hot paths)"""
+        key = (family, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def stages(self, symbol: str, names: List[str]) -> Dict[str, LatencyHistogram]:
+        """Histograms for the named tick stages of one symbol"""
+        return {name: self.histogram('stage', symbol=symbol, stage=name) for name in names}
+
+    def count(self, name: str, amount: int = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def instrument(self, exchange, names: Tuple[str, ...] = EXCHANGE_CALLS) -> None:
+        """Time every call to the given exchange methods, in place on the client instance
+
+        Only the outermost timed call is observed, so ``create_limit_order``
+        delegating to ``create_order`` records one sample, not two.
+        """
+        if getattr(exchange, '_metrics_instrumented', False):
+            return
+        local = threading.local()
+        for name in names:
+            method = getattr(exchange, name, None)
+            if callable(method):
+                setattr(exchange, name, self._timed(method, self.histogram('exchange_call', call=name), local))
+        exchange._metrics_instrumented = True
+
+    @staticmethod
+    def _timed(method, histogram: LatencyHistogram, local: threading.local):
+        perf_counter = time.perf_counter
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            if getattr(local, 'active', False):
+                return method(*args, **kwargs)  # Nested in a call that is already being timed
+            local.active = True
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - start)
+                local.active = False
+        return timed
+
+    def maybe_log_summary(self, now: float) -> None:
+        """Log the summary line once every ``summary_interval`` seconds"""
+        if now - self.last_summary >= self.summary_interval:
+            self.last_summary = now
+            logger.info(self.summary())
+
+    def _snapshot(self) -> Tuple[List, List]:
+        """Sorted copies of the histogram and counter entries, safe while other threads add keys"""
+        with self._lock:
+            return sorted(self.histograms.items()), sorted(self.counters.items())
+
+    def summary(self) -> str:
+        """One line of p50/p99 latencies in ms per stage and exchange call, plus counters"""
+        parts = []
+        histograms, counters = self._snapshot()
+        for (family, labels), histogram in histograms:
+            if not histogram.count:
+                continue
+            label = '/'.join(label_value for _, label_value in labels)
+            parts.append(f"{label} {histogram.quantile(0.5) * 1000:.1f}/{histogram.quantile(0.99) * 1000:.1f}")
+        for (name, labels), value in counters:
+            label = '/'.join(label_value for _, label_value in labels)
+            parts.append(f"{name}{'[' + label + ']' if label else ''} {value}")
+        return "Latency p50/p99 ms: " + (' | '.join(parts) if parts else 'no samples yet')
+
+    def render(self) -> str:
+        """Prometheus text exposition of every histogram and counter"""
+        lines = []
+        families: Dict[str, List] = {}
+        histograms, counters = self._snapshot()
+        for (family, labels), histogram in histograms:
+            families.setdefault(family, []).append((labels, histogram))
+        for family, series in families.items():
+            metric = f"{PREFIX}_{family}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, histogram in series:
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+                with histogram._lock:
+                    counts, total, count_total = list(histogram.counts), histogram.sum, histogram.count
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{{{label_text},le="{le}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{label_text}}} {total}")
+                lines.append(f"{metric}_count{{{label_text}}} {count_total}")
+
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}_{name}_total"
+            label_text = ','.join(f'{key}="{label_value}"' for key, label_value in labels)
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, host: str = '127.0.0.1', port: int = 9108) -> None:
+        """Expose ``/metrics`` over HTTP from a daemon thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the bot log
+
+        try:
+            self.server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"Metrics endpoint at http://{host}:{port}/metrics")
+
+    def stop(self) -> None:
+        """Stop the HTTP endpoint"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Mock Exchange - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Local stand-in exchange with a synthetic market and matching engine, served over
+HTTP and WebSocket, plus the ccxt client the bots use to talk to it
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Any, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import ccxt
+from ccxt.base.decimal_to_precision import TICK_SIZE
+
+from backtest import SimulatedExchange
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Order fields that only the matching engine uses
+ENGINE_FIELDS = ('active_at', 'queue_ahead', 'level_size')
+
+
+class MockMarket:
+    """Synthetic book and taker flow for one symbol, matched against our orders
+
+    The mid follows a geometric random walk with ``volatility`` per square
+    root hour (the unit the bots estimate sigma in). The book has
+    ``levels`` price levels per side, ``spread_ticks`` apart at the touch,
+    whose sizes are redrawn with probability ``churn`` per step; every
+    step yields the changed levels as a delta. Public takers arrive at
+    ``trade_rate`` per second. Our orders rest in a ``SimulatedExchange``
+    and fill with its queue-position model against the top of book and
+    those trades. Call everything under the server's lock.
+    """
+
+    def __init__(self, symbol: str, price: float = 100.0, tick_size: float = 0.01, lot_size: float = 0.001,
+                 min_amount: float = 0.001, volatility: float = 0.02, levels: int = 20,
+                 level_size: float = 5.0, spread_ticks: int = 2, churn: float = 0.2,
+                 trade_rate: float = 5.0, trade_size: float = 1.0, fee_rate: float = 0.0,
+                 initial_balance: float = 10000.0, rng: Optional[random.Random] = None):
+        self.symbol = symbol
+        self.mid = price
+        self.tick_size = tick_size
+        self.lot_size = lot_size
+        self.min_amount = min_amount
+        self.sigma = volatility / math.sqrt(3600.0)  # Per square-root second
+        self.levels = levels
+        self.level_size = level_size
+        self.spread_ticks = max(int(spread_ticks), 1)
+        self.churn = churn
+        self.trade_rate = trade_rate
+        self.trade_size = trade_size
+        self.fee_rate = fee_rate
+        self.rng = rng or random.Random()
+        self.quote_currency = symbol.split('/')[1].split(':')[0]
+        self.engine = SimulatedExchange(symbol, tick_size=tick_size, lot_size=lot_size, min_amount=min_amount,
+                                        latency=0.0, fee_rate=fee_rate, initial_balance=initial_balance,
+                                        quote_currency=self.quote_currency)
+        self.bids: Dict[int, float] = {}  # Size by price in ticks
+        self.asks: Dict[int, float] = {}
+        self.sequence = 0
+        self.now = time.time()
+        self.book_changed = self.now  # When the top of book last moved
+        self.public_trades = 0
+        self.leverage = 1
+        self._rebuild()
+        self._match()
+
+    # -- simulation -------------------------------------------------------------------
+
+    def step(self, now: float) -> Optional[Dict[str, Any]]:
+        """Advance the market to ``now``; returns the book delta message, if anything changed"""
+        dt = max(now - self.now, 0.0)
+        self.now = now
+        self.mid *= math.exp(self.sigma * math.sqrt(dt) * self.rng.gauss(0.0, 1.0))
+        top = (self.best_bid, self.best_ask)
+        old_bids, old_asks = self.bids, self.asks
+        self._rebuild()
+        if (self.best_bid, self.best_ask) != top:
+            self.book_changed = now
+
+        # Public takers hitting the touch, Poisson arrivals
+        elapsed = self.rng.expovariate(self.trade_rate) if self.trade_rate > 0 else dt
+        while elapsed < dt:
+            side = 1 if self.rng.random() < 0.5 else -1
+            price = self.best_ask if side > 0 else self.best_bid
+            self.engine.on_trade(now, price, self.rng.expovariate(1.0 / self.trade_size), side)
+            self.public_trades += 1
+            elapsed += self.rng.expovariate(self.trade_rate)
+        self._match()
+
+        bids = self._changes(old_bids, self.bids)
+        asks = self._changes(old_asks, self.asks)
+        if not bids and not asks:
+            return None
+        self.sequence += 1
+        return {'type': 'delta', 'symbol': self.symbol, 'sequence': self.sequence, 'bids': bids, 'asks': asks}
+
+    def _rebuild(self) -> None:
+        """Place the levels around the current mid, keeping most sizes from the last step"""
+        best_bid = math.floor(self.mid / self.tick_size - self.spread_ticks / 2)
+        best_ask = best_bid + self.spread_ticks
+        self.bids = {tick: self._size(self.bids.get(tick)) for tick in range(best_bid, best_bid - self.levels, -1)}
+        self.asks = {tick: self._size(self.asks.get(tick)) for tick in range(best_ask, best_ask + self.levels)}
+
+    def _size(self, previous: Optional[float]) -> float:
+        if previous is not None and self.rng.random() >= self.churn:
+            return previous
+        return round(max(self.rng.expovariate(1.0 / self.level_size), self.lot_size), 6)
+
+    def _changes(self, old: Dict[int, float], new: Dict[int, float]) -> List[List[float]]:
+        changes = [[self.price(tick), size] for tick, size in new.items() if old.get(tick) != size]
+        changes.extend([self.price(tick), 0.0] for tick in old if tick not in new)
+        return changes
+
+    def _match(self) -> None:
+        bid, ask = max(self.bids), min(self.asks)
+        self.engine.on_book(self.now, self.price(bid), self.bids[bid], self.price(ask), self.asks[ask])
+
+    def price(self, tick: int) -> float:
+        return round(tick * self.tick_size, 10)
+
+    @property
+    def best_bid(self) -> float:
+        return self.price(max(self.bids))
+
+    @property
+    def best_ask(self) -> float:
+        return self.price(min(self.asks))
+
+    def snapshot(self, depth: Optional[int] = None) -> Dict[str, Any]:
+        """The whole book (or its top ``depth`` levels) in the feed and ccxt layouts"""
+        bids = [[self.price(tick), self.bids[tick]] for tick in sorted(self.bids, reverse=True)[:depth]]
+        asks = [[self.price(tick), self.asks[tick]] for tick in sorted(self.asks)[:depth]]
+        return {'type': 'snapshot', 'symbol': self.symbol, 'sequence': self.sequence, 'bids': bids, 'asks': asks,
+                'timestamp': int(self.now * 1000)}
+
+    # -- trading ----------------------------------------------------------------------
+
+    def market(self) -> Dict[str, Any]:
+        """ccxt market structure"""
+        base, rest = self.symbol.split('/')
+        quote, _, settle = rest.partition(':')
+        contract = bool(settle)
+        return {
+            'id': self.symbol.replace('/', '').replace(':', '-'), 'symbol': self.symbol,
+            'base': base, 'quote': quote, 'settle': settle or None,
+            'baseId': base, 'quoteId': quote, 'settleId': settle or None,
+            'type': 'swap' if contract else 'spot', 'spot': not contract, 'margin': False, 'swap': contract,
+            'future': False, 'option': False, 'contract': contract, 'linear': True if contract else None,
+            'inverse': False if contract else None, 'contractSize': 1.0 if contract else None, 'active': True,
+            'maker': self.fee_rate, 'taker': self.fee_rate,
+            'precision': {'price': self.tick_size, 'amount': self.lot_size},
+            'limits': {'amount': {'min': self.min_amount, 'max': None}, 'price': {'min': None, 'max': None},
+                       'cost': {'min': None, 'max': None}, 'leverage': {'min': 1, 'max': 100}},
+            'info': {},
+        }
+
+    def create(self, side: str, amount: float, price: float, client_id: Optional[str] = None,
+               post_only: bool = False) -> Dict[str, Any]:
+        """Accept a limit order, or raise the ccxt error a venue would return"""
+        if side not in ('buy', 'sell'):
+            raise ccxt.InvalidOrder(f"Unknown side {side}")
+        if amount < self.min_amount or price <= 0:
+            raise ccxt.InvalidOrder(f"Amount {amount} below minimum {self.min_amount} or bad price {price}")
+        if post_only and (price >= self.best_ask if side == 'buy' else price <= self.best_bid):
+            raise ccxt.OrderImmediatelyFillable(f"Post-only {side} at {price} would take liquidity")
+        if client_id is not None and any(order.get('clientOrderId') == client_id
+                                         for order in self.engine.orders.values()):
+            raise ccxt.DuplicateOrderId(f"Client order ID {client_id} is already in use")
+        order = self.engine.create_limit_order(self.symbol, side, amount, price)
+        self.engine.orders[order['id']]['clientOrderId'] = client_id
+        order['clientOrderId'] = client_id
+        return self.public(order)
+
+    def cancel(self, order_id: str) -> Dict[str, Any]:
+        """Cancel at once: the request latency is the server's, not the matching engine's"""
+        result = self.engine.cancel_order(order_id)
+        self.engine.pending_cancels.pop(order_id, None)
+        self.engine.orders.pop(order_id, None)
+        return result
+
+    def cancel_all(self) -> List[Dict[str, Any]]:
+        return [self.cancel(order_id) for order_id in list(self.engine.orders)]
+
+    def open_orders(self) -> List[Dict[str, Any]]:
+        return [self.public(order) for order in self.engine.orders.values()]
+
+    def trades(self, since: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.engine.fetch_my_trades(self.symbol, since=since, limit=limit)
+
+    def position(self) -> Dict[str, Any]:
+        position = self.engine.position
+        return {'symbol': self.symbol, 'contracts': abs(position), 'contractSize': 1.0,
+                'side': 'short' if position < 0 else 'long', 'leverage': self.leverage}
+
+    @staticmethod
+    def public(order: Dict[str, Any]) -> Dict[str, Any]:
+        order = {key: value for key, value in order.items() if key not in ENGINE_FIELDS}
+        order['remaining'] = order['amount'] - order['filled']
+        return order
+
+
+class MockExchangeServer:
+    """Serves ``MockMarket`` instances over local HTTP (JSON) and a WebSocket book feed
+
+    Every HTTP request waits ``latency`` plus up to ``jitter`` seconds
+    before it is handled, and fails with probability ``error_rate``
+    (503, ExchangeNotAvailable) or ``rate_limit_rate`` (429,
+    RateLimitExceeded). The market loads without injected errors so
+    clients can always start. The WebSocket feed sends each client a
+    snapshot per symbol and then the sequenced deltas of every step, in
+    the JSON format ``OrderBookStream`` reads (WebSocket support needs
+    the optional ``websockets`` package). Requests are counted per
+    endpoint, and ``book_to_order`` times every new order from the last
+    top-of-book move, a tick-to-trade latency seen from the exchange.
+    """
+
+    ROUTES = {
+        ('GET', '/markets'): '_markets',
+        ('GET', '/orderbook'): '_order_book',
+        ('GET', '/balance'): '_balance',
+        ('GET', '/orders/open'): '_open_orders',
+        ('GET', '/trades'): '_trades',
+        ('GET', '/positions'): '_positions',
+        ('POST', '/order'): '_create',
+        ('POST', '/order/cancel'): '_cancel',
+        ('POST', '/orders/cancel-all'): '_cancel_all',
+        ('POST', '/leverage'): '_leverage',
+    }
+
+    def __init__(self, markets: List[MockMarket], host: str = '127.0.0.1', port: int = 0, ws_port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, step_interval: float = 0.05, seed: Optional[int] = None):
+        self.markets = {market.symbol: market for market in markets}
+        self.host = host
+        self.port = port
+        self.ws_port = ws_port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.step_interval = step_interval
+        self.rng = random.Random(seed)
+        self.requests: Dict[str, int] = {}
+        self.injected_errors = 0
+        self.book_to_order = LatencyHistogram()
+        self.running = False
+        self._lock = threading.Lock()
+        self._listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._http: Optional[ThreadingHTTPServer] = None
+        self._threads: List[threading.Thread] = []
+        self._ws_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ws_stop: Optional[asyncio.Event] = None
+        self._ws_ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_url(self) -> Optional[str]:
+        return f"ws://{self.host}:{self.ws_port}" if self._ws_loop is not None else None
+
+    def start(self, timeout: float = 5.0) -> None:
+        """Start the HTTP server, the market clock and (when websockets is installed) the book feed"""
+        self.running = True
+        self._http = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._http.daemon_threads = True
+        self._http.mock = self
+        self.port = self._http.server_address[1]
+        self._spawn(self._http.serve_forever, 'mock-http')
+        self._spawn(self._run_market, 'mock-market')
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            logger.warning("websockets is not installed, the mock exchange serves REST only")
+        else:
+            self._spawn(self._run_ws, 'mock-ws')
+            self._ws_ready.wait(timeout)
+        logger.info(f"Mock exchange on {self.url}" + (f" and {self.ws_url}" if self.ws_url else "")
+                    + f" for {', '.join(self.markets)}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.running = False
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+        if self._ws_loop is not None and self._ws_stop is not None:
+            try:
+                self._ws_loop.call_soon_threadsafe(self._ws_stop.set)
+            except RuntimeError:
+                pass  # Loop already closed
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            while self.running:
+                time.sleep(1)
+        finally:
+            self.stop()
+
+    def _spawn(self, target, name: str) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    # -- requests ---------------------------------------------------------------------
+
+    def handle(self, method: str, path: str, params: Dict[str, Any]) -> Tuple[int, Any]:
+        """Answer one request: (HTTP status, JSON payload)"""
+        name = self.ROUTES.get((method, path))
+        if name is None:
+            return 404, {'error': 'BadRequest', 'message': f"No route {method} {path}"}
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if path != '/markets':
+            draw = self.rng.random()
+            if draw < self.error_rate + self.rate_limit_rate:
+                self.injected_errors += 1
+                if draw < self.error_rate:
+                    return 503, {'error': 'ExchangeNotAvailable', 'message': 'Injected outage'}
+                return 429, {'error': 'RateLimitExceeded', 'message': 'Injected rate limit'}
+
+        try:
+            with self._lock:
+                return 200, getattr(self, name)(params)
+        except ccxt.BaseError as e:
+            return 400, {'error': type(e).__name__, 'message': str(e)}
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {'error': 'BadRequest', 'message': repr(e)}
+
+    def _market(self, params: Dict[str, Any]) -> MockMarket:
+        symbol = params.get('symbol')
+        if symbol not in self.markets:
+            raise ccxt.BadSymbol(f"Unknown symbol {symbol}")
+        return self.markets[symbol]
+
+    def _markets(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [market.market() for market in self.markets.values()]
+
+    def _order_book(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        book = self._market(params).snapshot(int(params.get('limit') or 20))
+        del book['type']
+        book['nonce'] = book.pop('sequence')
+        return book
+
+    def _balance(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        # Margin account: each market adds its PnL, inventory marked to mid, to one balance per currency
+        totals: Dict[str, float] = {}
+        for market in self.markets.values():
+            engine = market.engine
+            mid = (market.best_bid + market.best_ask) / 2
+            totals[market.quote_currency] = totals.get(market.quote_currency, engine.initial_balance) \
+                + engine.equity(mid) - engine.initial_balance
+        balance = {code: {'free': total, 'used': 0.0, 'total': total} for code, total in totals.items()}
+        balance.update({'free': {code: total for code, total in totals.items()}, 'total': dict(totals)})
+        return balance
+
+    def _open_orders(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        markets = [self._market(params)] if params.get('symbol') else self.markets.values()
+        return [order for market in markets for order in market.open_orders()]
+
+    def _trades(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        since = int(params['since']) if params.get('since') else None
+        limit = int(params['limit']) if params.get('limit') else None
+        return self._market(params).trades(since, limit)
+
+    def _positions(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        markets = [self._market(params)] if params.get('symbol') else self.markets.values()
+        return [market.position() for market in markets]
+
+    def _create(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        market = self._market(params)
+        order = market.create(params['side'], float(params['amount']), float(params['price']),
+                              params.get('clientOrderId'), bool(params.get('postOnly')))
+        self.book_to_order.observe(time.time() - market.book_changed)
+        return order
+
+    def _cancel(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self._market(params).cancel(params['id'])
+
+    def _cancel_all(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._market(params).cancel_all()
+
+    def _leverage(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        market = self._market(params)
+        market.leverage = int(params['leverage'])
+        return {'symbol': market.symbol, 'leverage': market.leverage}
+
+    def describe(self) -> str:
+        """Request counts for logs"""
+        counts = ', '.join(f"{path} {count}" for path, count in sorted(self.requests.items()))
+        return f"{sum(self.requests.values())} requests ({counts}), {self.injected_errors} injected errors"
+
+    # -- market clock and book feed ---------------------------------------------------
+
+    def _run_market(self) -> None:
+        """Step every market each ``step_interval`` and publish the deltas"""
+        while self.running:
+            with self._lock:
+                now = time.time()
+                messages = [json.dumps(delta) for delta in
+                            (market.step(now) for market in self.markets.values()) if delta is not None]
+                listeners = list(self._listeners)
+            for loop, queue in listeners:
+                for message in messages:
+                    try:
+                        loop.call_soon_threadsafe(queue.put_nowait, message)
+                    except RuntimeError:
+                        pass  # Client loop closed
+            time.sleep(self.step_interval)
+
+    def _run_ws(self) -> None:
+        self._ws_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._ws_loop)
+        try:
+            self._ws_loop.run_until_complete(self._serve_ws())
+        finally:
+            self._ws_loop.close()
+
+    async def _serve_ws(self) -> None:
+        import websockets
+
+        self._ws_stop = asyncio.Event()
+        async with websockets.serve(self._ws_handler, self.host, self.ws_port) as server:
+            self.ws_port = list(server.sockets)[0].getsockname()[1]
+            self._ws_ready.set()
+            await self._ws_stop.wait()
+
+    async def _ws_handler(self, websocket, path: Optional[str] = None) -> None:
+        """Snapshot of every symbol, then every delta in sequence"""
+        queue: asyncio.Queue = asyncio.Queue()
+        listener = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            snapshots = [json.dumps(market.snapshot()) for market in self.markets.values()]
+            self._listeners.append(listener)
+        try:
+            for message in snapshots:
+                await websocket.send(message)
+            while True:
+                await websocket.send(await queue.get())
+        except Exception as e:
+            logger.debug(f"Mock feed client disconnected: {e}")
+        finally:
+            with self._lock:
+                self._listeners.remove(listener)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON over HTTP/1.1 keep-alive, so clients reuse their connections as with a real venue"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def do_GET(self) -> None:
+        self._respond('GET')
+
+    def do_POST(self) -> None:
+        self._respond('POST')
+
+    def _respond(self, method: str) -> None:
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            params.update(json.loads(self.rfile.read(length)))
+        status, payload = self.server.mock.handle(method, url.path, params)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # One line per request would swamp a load test
+
+
+class MockExchange(ccxt.Exchange):
+    """ccxt client for ``MockExchangeServer``: ``MockExchange({'urls': {'api': {'rest': server.url}}})``
+
+    Errors come back as ``{"error": "<ccxt exception name>"}`` and are
+    raised as that ccxt exception, so the bots' error handling runs as it
+    would against a real venue.
+    """
+
+    def describe(self):
+        return self.deep_extend(super(MockExchange, self).describe(), {
+            'id': 'mock',
+            'name': 'Roboquant Mock Exchange',
+            'rateLimit': 1,
+            'precisionMode': TICK_SIZE,
+            'has': {
+                'cancelAllOrders': True, 'cancelOrder': True, 'createOrder': True, 'createOrders': False,
+                'cancelOrders': False, 'editOrder': False, 'createPostOnlyOrder': True,
+                'fetchBalance': True, 'fetchCurrencies': False, 'fetchMarkets': True, 'fetchMyTrades': True,
+                'fetchOpenOrders': True, 'fetchOrderBook': True, 'fetchPositions': True, 'setLeverage': True,
+            },
+            'urls': {'api': {'rest': 'http://127.0.0.1:8780'}},
+        })
+
+    def sign(self, path, api='public', method='GET', params={}, headers=None, body=None):
+        url = self.urls['api']['rest'] + '/' + path
+        params = {key: value for key, value in params.items() if value is not None}
+        if method == 'GET':
+            if params:
+                url += '?' + self.urlencode(params)
+        else:
+            body = self.json(params)
+            headers = {'Content-Type': 'application/json'}
+        return {'url': url, 'method': method, 'body': body, 'headers': headers}
+
+    def handle_errors(self, code, reason, url, method, headers, body, response, request_headers, request_body):
+        if isinstance(response, dict) and 'error' in response:
+            error = getattr(ccxt, response['error'], None)
+            if not (isinstance(error, type) and issubclass(error, ccxt.BaseError)):
+                error = ccxt.ExchangeError
+            raise error(f"{self.id} {response.get('message', response['error'])}")
+        return None
+
+    def fetch_markets(self, params={}):
+        return self.request('markets', params=params)
+
+    def fetch_order_book(self, symbol, limit=None, params={}):
+        return self.request('orderbook', params=self.extend({'symbol': symbol, 'limit': limit}, params))
+
+    def fetch_balance(self, params={}):
+        return self.request('balance', params=params)
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params={}):
+        return self.request('orders/open', params=self.extend({'symbol': symbol}, params))
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params={}):
+        return self.request('trades', params=self.extend({'symbol': symbol, 'since': since, 'limit': limit}, params))
+
+    def fetch_positions(self, symbols=None, params={}):
+        symbol = symbols[0] if symbols and len(symbols) == 1 else None
+        return self.request('positions', params=self.extend({'symbol': symbol}, params))
+
+    def create_order(self, symbol, type, side, amount, price=None, params={}):
+        return self.request('order', method='POST', params=self.extend(
+            {'symbol': symbol, 'type': type, 'side': side, 'amount': amount, 'price': price}, params))
+
+    def cancel_order(self, id, symbol=None, params={}):
+        return self.request('order/cancel', method='POST', params=self.extend({'id': id, 'symbol': symbol}, params))
+
+    def cancel_all_orders(self, symbol=None, params={}):
+        return self.request('orders/cancel-all', method='POST', params=self.extend({'symbol': symbol}, params))
+
+    def set_leverage(self, leverage, symbol=None, params={}):
+        return self.request('leverage', method='POST',
+                            params=self.extend({'symbol': symbol, 'leverage': leverage}, params))
+
+
+def main():
+    """Run a mock exchange until interrupted"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Serve a local mock exchange over HTTP and WebSocket')
+    parser.add_argument('--symbol', action='append', help='Symbol to list (repeatable, default: ETH/USDT:USDT)')
+    parser.add_argument('--price', type=float, default=100.0, help='Starting mid price (default: 100)')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8780, help='HTTP port (default: 8780)')
+    parser.add_argument('--ws-port', type=int, default=8781, help='WebSocket port (default: 8781)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many more seconds, uniformly')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests failing with 429')
+    parser.add_argument('--volatility', type=float, default=0.02, help='Mid volatility per sqrt hour')
+    parser.add_argument('--seed', type=int, help='Random seed for a repeatable market')
+
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    markets = [MockMarket(symbol, price=args.price, volatility=args.volatility, rng=rng)
+               for symbol in args.symbol or ['ETH/USDT:USDT']]
+    server = MockExchangeServer(markets, host=args.host, port=args.port, ws_port=args.ws_port,
+                                latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"Mock exchange stopped: {server.describe()}")
+
+
+if __name__ == "__main__":
+    main()
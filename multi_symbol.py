@@ -0,0 +1,215 @@
+"""
+Multi-Symbol Engine - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Quotes many symbols from one process over a shared exchange client
+"""
+
+import copy
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional, Any
+
+from market_maker_bot import UniversalMarketMaker
+from order_entry import OrderEntry
+from metrics import Metrics
+from fast_logging import EventLog
+from rate_limit import RateLimiter
+from strategy_config import ConfigWatcher
+from profiler import Profiler
+
+logger = logging.getLogger(__name__)
+
+# Config sections a symbol entry may override
+OVERRIDE_SECTIONS = ('trading', 'strategy', 'risk', 'quoting', 'market_data')
+
+
+class MultiSymbolEngine:
+    """Schedules quote updates for several symbols over one exchange connection
+
+    Each symbol gets its own ``UniversalMarketMaker`` holding its price
+    history, inventory and current orders, but they all share one ccxt
+    client (one ``load_markets``, one connection pool, one rate limiter),
+    one order entry pool and one cached balance per quote currency. Latency
+    metrics (labelled by symbol) and the order/fill event log are shared
+    too. Updates are scheduled earliest-deadline-first with FIFO
+    tie-breaking, so when the process falls behind every symbol still gets
+    its turn in round-robin order.
+
+    With ``reload.enabled``, changes to the config file are split per symbol
+    and handed to each bot, which swaps in its new strategy between ticks.
+    """
+
+    def __init__(self, config: Dict[str, Any], config_path: Optional[str] = None):
+        self.config = config
+        self.config_path = config_path
+        self.bots: List[UniversalMarketMaker] = [
+            UniversalMarketMaker(config=symbol_config) for symbol_config in self.symbol_configs(config)
+        ]
+        self.exchange = None
+        self.order_entry = None
+        self.metrics = None
+        self.events = None
+        self.rate_limiter = None
+        self.config_watcher = None
+        self.profiler = None
+        self.running = False
+        self.ticks = 0
+        self.status_interval = config.get('engine', {}).get('status_interval', 10.0)
+
+    @staticmethod
+    def symbol_configs(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Expand the ``symbols`` list into one full config per symbol
+
+        Entries are either a symbol string or a dict with a ``symbol`` key and
+        optional ``trading``/``strategy``/``risk``/``quoting``/``market_data``
+        overrides that are merged over the top-level sections.
+        """
+        configs = []
+        for entry in config['symbols']:
+            if isinstance(entry, str):
+                entry = {'symbol': entry}
+            symbol_config = copy.deepcopy({k: v for k, v in config.items() if k != 'symbols'})
+            for section in OVERRIDE_SECTIONS:
+                if section in entry:
+                    symbol_config.setdefault(section, {}).update(entry[section])
+            symbol_config['trading']['symbol'] = entry['symbol']
+            configs.append(symbol_config)
+        return configs
+
+    def setup(self) -> None:
+        """Connect once and prepare every symbol on the shared client"""
+        primary = self.bots[0]
+        primary.initialize_exchange([bot.config['trading']['symbol'] for bot in self.bots])
+        self.exchange = primary.exchange
+        self.order_entry = OrderEntry.from_config(self.config.get('order_entry', {}))
+        self.metrics = Metrics.from_config(self.config.get('metrics', {}))
+        self.events = EventLog.from_config(self.config.get('logging', {}))
+        self.rate_limiter = RateLimiter.from_config(
+            self.config['exchange']['name'].lower(), self.exchange,
+            self.config.get('rate_limit', {}), metrics=self.metrics
+        )
+
+        # One cached balance per quote currency, shared by the symbols quoted in it
+        balances = {}
+        for bot in self.bots:
+            currency = bot.config['trading']['symbol'].split('/')[1].split(':')[0]
+            bot.exchange = self.exchange
+            bot.exchange_config = primary.exchange_config
+            bot.venue = primary.venue
+            bot.balance = balances.get(currency)
+            bot.metrics = self.metrics
+            bot.events = self.events
+            bot.rate_limiter = self.rate_limiter
+            bot.show_status = False
+            bot.prepare_symbol(self.order_entry)
+            balances[currency] = bot.balance
+
+        logger.info(f"Quoting {len(self.bots)} symbols: {', '.join(bot.symbol for bot in self.bots)}")
+        self.config_watcher = ConfigWatcher.from_config(self.config_path, self.config.get('reload', {}),
+                                                        self.reload_config)
+        if self.config_watcher is not None:
+            self.config_watcher.start()
+        self.profiler = Profiler.from_config(self.config.get('profiling', {}))
+
+    def reload_config(self, config: Dict[str, Any]) -> None:
+        """Hand each symbol its part of a changed config (called from the watcher thread)"""
+        try:
+            configs = {symbol_config['trading']['symbol']: symbol_config
+                       for symbol_config in self.symbol_configs(config)}
+        except (KeyError, TypeError) as e:
+            logger.error(f"Config change rejected, keeping the current strategies: {e!r}")
+            return
+        if set(configs) != {bot.symbol for bot in self.bots}:
+            logger.warning("Adding or removing symbols takes effect after a restart")
+        for bot in self.bots:
+            if bot.symbol in configs:
+                bot.reload_config(configs[bot.symbol])
+        self.config = config
+
+    def run(self) -> None:
+        """Main engine loop"""
+        logger.info("Starting Multi-Symbol Market Maker Engine")
+        self.setup()
+        self.running = True
+
+        sequence = itertools.count()
+        now = time.time()
+        schedule = [(now, next(sequence), index) for index in range(len(self.bots))]
+        heapq.heapify(schedule)
+        last_status = now
+
+        while self.running:
+            try:
+                due, _, index = schedule[0]
+                now = time.time()
+                if due > now:
+                    time.sleep(due - now)
+                    continue
+
+                heapq.heappop(schedule)
+                bot = self.bots[index]
+                try:
+                    delay = bot.tick(now)
+                except Exception as e:
+                    logger.error(f"Error quoting {bot.symbol}: {e}")
+                    delay = 5
+                if bot.halted is not None:
+                    break  # Global risk limit: every symbol stops and cancels below
+                self.ticks += 1
+                if self.profiler is not None:
+                    self.profiler.tick()
+
+                if delay is None:
+                    # Keep the symbol's cadence, but never schedule into the past
+                    next_due = max(due + bot.strategy.update_frequency, time.time())
+                else:
+                    next_due = time.time() + delay
+                heapq.heappush(schedule, (next_due, next(sequence), index))
+
+                if now - last_status >= self.status_interval:
+                    self.display_status(now - last_status)
+                    last_status = now
+
+            except KeyboardInterrupt:
+                logger.info("Shutting down...")
+                break
+
+        # Cleanup
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        if self.profiler is not None:
+            self.profiler.close()
+        for bot in self.bots:
+            bot.shutdown()
+        self.order_entry.shutdown()
+        self.metrics.stop()
+        if self.events is not None:
+            self.events.close()
+        logger.info("Engine stopped")
+
+    def display_status(self, interval: float) -> None:
+        """Print one line per symbol, in a single write"""
+        lines = [
+            f"\n{'='*100}",
+            f"Exchange: {self.config['exchange']['name']} | Symbols: {len(self.bots)} | "
+            f"Updates: {self.ticks / interval:.1f}/s"
+        ]
+        self.ticks = 0
+        if self.rate_limiter is not None:
+            lines.append(f"Rate limit: {self.rate_limiter.describe()}")
+        for bot in self.bots:
+            if bot.last_quote is None:
+                lines.append(f"{bot.symbol:<20} waiting for first quote")
+                continue
+            mid_price, bid_price, ask_price, size = bot.last_quote
+            spread_bps = (ask_price - bid_price) / mid_price * 10000
+            lines.append(f"{bot.symbol:<20} Mid: {mid_price:<12.4f} Spread: {spread_bps:5.1f}bps | "
+                         f"Inv: {bot.inventory:<10.4f} Trades: {bot.trades_count:<5} PnL: ${bot.pnl:.2f} | "
+                         f"Orders: {bot.quote_manager.summary()}")
+        print('\n'.join(lines))
+
+    def stop(self) -> None:
+        """Stop the engine"""
+        self.running = False
@@ -0,0 +1,182 @@
+"""
+Order Book - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Incrementally maintained L2 book with depth-aware fair price queries
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+# Fair prices the quotes can be centred on
+FAIR_PRICES = ('mid', 'microprice', 'weighted_mid')
+
+
+def microprice(bid: float, bid_size: float, ask: float, ask_size: float) -> float:
+    """Best bid and ask weighted by the size on the opposite side: leans towards the side about to give way"""
+    return (bid * ask_size + ask * bid_size) / (bid_size + ask_size)
+
+
+class BookSide:
+    """Price levels of one side, best level last so top-of-book changes move few list entries
+
+    ``keys`` holds prices for bids and negated prices for asks, so both
+    sides are sorted ascending with the best price at the end. Sizes are
+    looked up by price, so a size change at an existing level never
+    touches the list.
+    """
+
+    __slots__ = ('sign', 'keys', 'sizes')
+
+    def __init__(self, sign: int):
+        self.sign = sign
+        self.keys: List[float] = []
+        self.sizes: Dict[float, float] = {}
+
+    def load(self, levels: List[List[float]]) -> None:
+        """Replace every level"""
+        sign = self.sign
+        self.sizes = {level[0]: level[1] for level in levels if level[1] > 0}
+        self.keys = sorted(sign * price for price in self.sizes)
+
+    def set(self, price: float, size: float) -> None:
+        """Set the size at one price; zero removes the level"""
+        if size > 0:
+            if price not in self.sizes:
+                insort(self.keys, self.sign * price)
+            self.sizes[price] = size
+        elif self.sizes.pop(price, None) is not None:
+            del self.keys[bisect_left(self.keys, self.sign * price)]
+
+    @property
+    def best(self) -> Optional[float]:
+        return self.sign * self.keys[-1] if self.keys else None
+
+    def top(self, levels: int) -> List[List[float]]:
+        """Up to ``levels`` [price, size] pairs, best first"""
+        sign, sizes = self.sign, self.sizes
+        return [[sign * key, sizes[sign * key]] for key in reversed(self.keys[-levels:])]
+
+    def depth(self, levels: int) -> Tuple[float, float]:
+        """Total size and size-weighted price sum of the best ``levels`` levels"""
+        sign, sizes = self.sign, self.sizes
+        volume = notional = 0.0
+        for key in self.keys[-levels:]:
+            price = sign * key
+            size = sizes[price]
+            volume += size
+            notional += price * size
+        return volume, notional
+
+    def size_to(self, price: float) -> float:
+        """Cumulative size resting at ``price`` or better"""
+        sizes, sign = self.sizes, self.sign
+        return sum(sizes[sign * key] for key in self.keys[bisect_left(self.keys, sign * price):])
+
+
+class L2Book:
+    """Local copy of an exchange's price-level book, kept current from snapshots and deltas
+
+    ``apply_snapshot`` replaces the book; ``apply_delta`` changes only the
+    levels it lists (size 0 removes a level) in O(log n) per level. With
+    sequence numbers, a gap marks the book out of sync and further deltas
+    are refused until the next snapshot. Queries read only the levels they
+    need: ``microprice`` weighs the best bid and ask by the size on the
+    opposite side, ``weighted_mid`` averages the size-weighted prices of
+    the top levels of each side, ``imbalance`` is the bid share of the
+    top-level size in [-1, 1] and ``cumulative_size`` the size resting at
+    a price or better.
+    """
+
+    def __init__(self):
+        self.bids = BookSide(1)
+        self.asks = BookSide(-1)
+        self.sequence: Optional[int] = None
+        self.synced = False
+        self.updates = 0
+
+    def apply_snapshot(self, bids: List[List[float]], asks: List[List[float]],
+                       sequence: Optional[int] = None) -> None:
+        """Replace the whole book"""
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.sequence = sequence
+        self.synced = True
+        self.updates += 1
+
+    def apply_delta(self, bids: List[List[float]], asks: List[List[float]],
+                    sequence: Optional[int] = None) -> bool:
+        """Apply changed levels; False if the book is out of sync and needs a snapshot"""
+        if not self.synced:
+            return False
+        if sequence is not None and self.sequence is not None:
+            if sequence <= self.sequence:
+                return True  # Already included in the snapshot
+            if sequence != self.sequence + 1:
+                self.synced = False
+                return False
+        for level in bids:
+            self.bids.set(level[0], level[1])
+        for level in asks:
+            self.asks.set(level[0], level[1])
+        if sequence is not None:
+            self.sequence = sequence
+        self.updates += 1
+        return True
+
+    # -- queries ------------------------------------------------------------------------
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bids.best
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.asks.best
+
+    @property
+    def ready(self) -> bool:
+        """Both sides have at least one level"""
+        return bool(self.bids.keys) and bool(self.asks.keys)
+
+    def mid(self) -> float:
+        return (self.bids.best + self.asks.best) / 2
+
+    def microprice(self) -> float:
+        """Best bid and ask weighted by the size on the opposite side"""
+        bid, ask = self.bids.best, self.asks.best
+        return microprice(bid, self.bids.sizes[bid], ask, self.asks.sizes[ask])
+
+    def weighted_mid(self, levels: int = 5) -> float:
+        """Average of the size-weighted prices of the top ``levels`` levels of each side"""
+        bid_volume, bid_notional = self.bids.depth(levels)
+        ask_volume, ask_notional = self.asks.depth(levels)
+        return (bid_notional / bid_volume + ask_notional / ask_volume) / 2
+
+    def imbalance(self, levels: int = 5) -> float:
+        """(bid size - ask size) / total size over the top ``levels`` levels"""
+        bid_volume, _ = self.bids.depth(levels)
+        ask_volume, _ = self.asks.depth(levels)
+        return (bid_volume - ask_volume) / (bid_volume + ask_volume)
+
+    def cumulative_size(self, side: str, price: float) -> float:
+        """Size resting on ``side`` ('bids' or 'asks') at ``price`` or better"""
+        return (self.bids if side == 'bids' else self.asks).size_to(price)
+
+    def fair_price(self, method: str = 'mid', levels: int = 5) -> float:
+        """Fair price by one of ``FAIR_PRICES``, kept within the best bid and ask"""
+        if method == 'microprice':
+            fair = self.microprice()
+        elif method == 'weighted_mid':
+            fair = self.weighted_mid(levels)
+        else:
+            return self.mid()
+        # Depth on one side can pull a weighted price outside the spread; quotes must not cross
+        return min(max(fair, self.bids.best), self.asks.best)
+
+    def top(self, method: str = 'mid', levels: int = 5) -> Tuple[float, float, float]:
+        """Best bid, best ask and fair price in one call"""
+        return self.bids.best, self.asks.best, self.fair_price(method, levels)
+
+    def as_dict(self, levels: int = 20) -> Dict[str, List[List[float]]]:
+        """The top levels in ccxt's order book layout"""
+        return {'bids': self.bids.top(levels), 'asks': self.asks.top(levels)}
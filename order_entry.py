@@ -0,0 +1,73 @@
+"""
+Order Entry - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Bounded worker pool that sends order requests concurrently
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Callable, Dict, Iterable, List, Any
+
+logger = logging.getLogger(__name__)
+
+
+class OrderEntry:
+    """Sends exchange requests on a bounded worker pool with a per-tick deadline
+
+    ccxt's synchronous clients release the GIL while waiting on the network,
+    so a few worker threads are enough to have the bid, the ask and any
+    cancels in flight at the same time. Requests that miss the deadline keep
+    running; their futures are handed back so the caller can pick up the
+    result on a later tick instead of sending the request twice.
+    """
+
+    def __init__(self, max_workers: int = 4, deadline: float = 2.0):
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='order-entry')
+        self.last_latency = 0.0
+        self.batches = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'OrderEntry':
+        """Build the pool from the ``order_entry`` config section"""
+        return cls(
+            max_workers=config.get('max_workers', 4),
+            deadline=config.get('deadline', 2.0)
+        )
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue one request on the pool"""
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def run_batch(self, futures: Dict[str, Future]) -> Dict[str, Future]:
+        """Wait for a batch of futures until the deadline and return the ones still pending"""
+        start = time.perf_counter()
+        done, pending = wait(list(futures.values()), timeout=self.deadline)
+        self.batches += 1
+        if pending:
+            self.timeouts += 1
+            logger.warning(f"{len(pending)} order request(s) still in flight after {self.deadline}s deadline")
+        else:
+            self.last_latency = time.perf_counter() - start
+        return {key: future for key, future in futures.items() if future in pending}
+
+    def map(self, fn: Callable, items: Iterable) -> List[Any]:
+        """Run ``fn`` over ``items`` concurrently, returning results or the raised exceptions"""
+        futures = [self.submit(fn, item) for item in items]
+        wait(futures, timeout=self.deadline)
+        results = []
+        for future in futures:
+            if not future.done():
+                results.append(TimeoutError(f"Request missed the {self.deadline}s deadline"))
+            elif future.exception() is not None:
+                results.append(future.exception())
+            else:
+                results.append(future.result())
+        return results
+
+    def shutdown(self) -> None:
+        """Wait for in-flight requests and stop the workers"""
+        self.executor.shutdown(wait=True)
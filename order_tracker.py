@@ -0,0 +1,352 @@
+"""
+Order Tracker - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Local state machine of our own orders, keyed by exchange and client order ID
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Order states
+PENDING_NEW = 'pending_new'  # Sent, not yet acknowledged
+OPEN = 'open'
+PARTIALLY_FILLED = 'partially_filled'
+PENDING_CANCEL = 'pending_cancel'  # Cancel sent, not yet confirmed
+DONE = 'done'  # Filled, cancelled or rejected
+
+RESTING = (OPEN, PARTIALLY_FILLED, PENDING_CANCEL)
+
+# ccxt order status -> our state (open orders are open or partially filled depending on fills)
+CCXT_STATUS = {'closed': DONE, 'canceled': DONE, 'cancelled': DONE, 'expired': DONE, 'rejected': DONE}
+
+
+class TrackedOrder:
+    """One of our orders and what we know about it"""
+
+    __slots__ = ('client_id', 'id', 'side', 'price', 'amount', 'trade_filled', 'reported_filled',
+                 'state', 'previous_state', 'updated')
+
+    def __init__(self, client_id: Optional[str], side: str, price: float, amount: float):
+        self.client_id = client_id
+        self.id: Optional[str] = None
+        self.side = side
+        self.price = price
+        self.amount = amount
+        self.trade_filled = 0.0  # Sum of our fills seen for this order
+        self.reported_filled = 0.0  # Cumulative fill the exchange last reported
+        self.state = PENDING_NEW
+        self.previous_state = PENDING_NEW
+        self.updated = time.time()
+
+    @property
+    def filled(self) -> float:
+        # Fills and order updates report the same executions, so take the larger rather than the sum
+        return max(self.trade_filled, self.reported_filled)
+
+    @property
+    def remaining(self) -> float:
+        return max(self.amount - self.filled, 0.0)
+
+
+class OrderTracker:
+    """Knows exactly which of our orders rest on the book without asking the exchange
+
+    Orders enter as pending-new when sent (with a client order ID so
+    stream updates can be matched before the acknowledgement arrives),
+    become open on acknowledgement, partially filled and then done as
+    fills come in, and pending-cancel and then done when cancelled. With
+    ``stream`` enabled, ccxt.pro ``watch_orders`` applies fills, cancels
+    and expiries made by the exchange itself; without it those are picked
+    up from fills and the quote manager's periodic reconcile.
+    """
+
+    def __init__(self, exchange, symbol: str, venue=None, stream: bool = False,
+                 exchange_id: Optional[str] = None, exchange_config: Optional[Dict[str, Any]] = None,
+                 remember: int = 1000, reconnect_delay: float = 5.0):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.venue = venue
+        self.stream = stream and exchange_id is not None
+        self.exchange_id = exchange_id
+        self.exchange_config = dict(exchange_config or {})
+        self.reconnect_delay = reconnect_delay
+        self.orders: Dict[str, TrackedOrder] = {}  # By client ID, or by exchange ID when there is none
+        self.by_id: Dict[str, TrackedOrder] = {}
+        self._pending_new: List[TrackedOrder] = []  # Sent and maybe not yet acknowledged, with or without IDs
+        self.stream_connected = False
+        self.stream_updates = 0
+        self.loaded = False  # Orders left by an earlier run are known
+        self.running = False
+        self._done: deque = deque(maxlen=remember)  # Finished orders kept for late fills
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, exchange, symbol: str, config: Dict[str, Any], venue=None,
+                    exchange_id: Optional[str] = None,
+                    exchange_config: Optional[Dict[str, Any]] = None) -> 'OrderTracker':
+        """Build a tracker from the ``orders`` config section"""
+        return cls(
+            exchange, symbol, venue=venue,
+            stream=config.get('stream', False),
+            exchange_id=exchange_id,
+            exchange_config=exchange_config
+        )
+
+    def start(self) -> None:
+        """Adopt orders left resting by an earlier run and start the order stream if enabled
+
+        Adopted orders are reported by ``resting_ids``, so the cancel-all the
+        bot runs before its first tick removes them without fetching them again.
+        """
+        try:
+            for order in self.exchange.fetch_open_orders(self.symbol):
+                self.adopt(order)
+            self.loaded = True
+        except Exception as e:
+            logger.warning(f"Could not load open orders for {self.symbol}: {e}")
+        if self.stream and not self.running:
+            self.running = True
+            self._thread = threading.Thread(
+                target=self._run_loop, name=f"order-stream-{self.symbol}", daemon=True
+            )
+            self._thread.start()
+            logger.info(f"Order stream started for {self.symbol} ({self.exchange_id})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the order stream"""
+        self.running = False
+        if self._loop is not None and self._task is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # -- order entry --------------------------------------------------------------------
+
+    def new_client_id(self) -> Optional[str]:
+        """A fresh client order ID in the venue's format, or None without a venue adapter"""
+        return self.venue.client_order_id() if self.venue is not None else None
+
+    def on_submit(self, client_id: Optional[str], side: str, price: float, amount: float) -> TrackedOrder:
+        """An order is being sent"""
+        order = TrackedOrder(client_id, side, price, amount)
+        with self._lock:
+            if client_id is not None:
+                self.orders[client_id] = order
+            self._pending_new = [pending for pending in self._pending_new if pending.state == PENDING_NEW]
+            self._pending_new.append(order)
+        return order
+
+    def on_ack(self, order: TrackedOrder, response: Dict[str, Any]) -> None:
+        """The exchange accepted the order"""
+        with self._lock:
+            self._set_id(order, response['id'])
+            self.on_update(response, order)
+
+    def on_reject(self, order: TrackedOrder) -> None:
+        """The order was never accepted"""
+        with self._lock:
+            self._finish(order)
+
+    def on_amend(self, order_id: str, response: Dict[str, Any], price: float, amount: float) -> None:
+        """An amend went through; some venues give the amended order a new ID"""
+        with self._lock:
+            order = self.by_id.get(order_id)
+            if order is None:
+                return
+            order.price = price
+            order.amount = amount
+            if response.get('id') and response['id'] != order_id:
+                del self.by_id[order_id]
+                self._set_id(order, response['id'])
+            order.updated = time.time()
+
+    def on_cancel_submit(self, order_id: str) -> None:
+        """A cancel is being sent"""
+        with self._lock:
+            order = self.by_id.get(order_id)
+            if order is not None and order.state != DONE:
+                order.previous_state = order.state
+                order.state = PENDING_CANCEL
+
+    def on_cancel_result(self, order_id: str, error: Optional[Exception] = None, gone: bool = True) -> None:
+        """A cancel completed (``gone``: the order no longer exists, even if the cancel failed)"""
+        with self._lock:
+            order = self.by_id.get(order_id)
+            if order is None:
+                return
+            if error is None or gone:
+                self._finish(order)
+            elif order.state == PENDING_CANCEL:
+                order.state = order.previous_state
+
+    def on_gone(self, order_id: str) -> None:
+        """The exchange no longer lists the order as open"""
+        with self._lock:
+            order = self.by_id.get(order_id)
+            if order is not None:
+                self._finish(order)
+
+    def on_cancel_all(self) -> None:
+        """Every order for the symbol was cancelled"""
+        with self._lock:
+            for order in list(self.by_id.values()) + list(self.orders.values()):
+                if order.state != PENDING_NEW:
+                    self._finish(order)
+
+    # -- fills and order updates ----------------------------------------------------------
+
+    def on_fill(self, trade: Dict[str, Any]) -> None:
+        """Apply one of our fills (already de-duplicated) to its order"""
+        with self._lock:
+            order = self.by_id.get(trade.get('order'))
+            if order is None:
+                return
+            order.trade_filled += trade['amount']
+            self._apply_fill_state(order)
+
+    def on_update(self, update: Dict[str, Any], order: Optional[TrackedOrder] = None) -> None:
+        """Apply an order structure from an order-entry response or the order stream"""
+        with self._lock:
+            if order is None:
+                order = self.by_id.get(update.get('id')) or self.orders.get(update.get('clientOrderId'))
+                if order is None:
+                    return  # Not one of ours (or already forgotten)
+                if order.id is None and update.get('id'):
+                    self._set_id(order, update['id'])
+            order.reported_filled = max(order.reported_filled, update.get('filled') or 0)
+            if update.get('amount'):
+                order.amount = update['amount']
+            if CCXT_STATUS.get(update.get('status')) == DONE:
+                self._finish(order)
+            else:
+                self._apply_fill_state(order)
+
+    def adopt(self, update: Dict[str, Any]) -> TrackedOrder:
+        """Track an open order placed before this tracker existed"""
+        order = TrackedOrder(update.get('clientOrderId'), update['side'], update['price'], update['amount'])
+        with self._lock:
+            if order.client_id is not None:
+                self.orders[order.client_id] = order
+            self.on_ack(order, update)
+        return order
+
+    # -- queries --------------------------------------------------------------------------
+
+    def get(self, order_id: str) -> Optional[TrackedOrder]:
+        return self.by_id.get(order_id)
+
+    def is_resting(self, order_id: str) -> bool:
+        order = self.by_id.get(order_id)
+        return order is not None and order.state in RESTING
+
+    def remaining(self, order: Dict[str, Any]) -> float:
+        """Unfilled size of an order response, from the tracked state where known"""
+        tracked = self.by_id.get(order['id'])
+        return tracked.remaining if tracked is not None else order['amount']
+
+    def resting_ids(self) -> Optional[List[str]]:
+        """IDs of every order that may still be on the book
+
+        None when that is not known: the orders of an earlier run could not
+        be loaded, or an order is still pending-new and may be live on the
+        exchange under an ID we have not seen yet.
+        """
+        if not self.loaded:
+            return None
+        with self._lock:
+            if any(order.state == PENDING_NEW for order in self._pending_new):
+                return None
+            return [order_id for order_id, order in self.by_id.items() if order.state in RESTING]
+
+    def summary(self) -> str:
+        """Counts per state for status output"""
+        with self._lock:
+            orders = {id(order): order for order in list(self.orders.values()) + list(self.by_id.values())}
+        counts: Dict[str, int] = {}
+        for order in orders.values():
+            counts[order.state] = counts.get(order.state, 0) + 1
+        parts = [f"{state.replace('_', '-')} {counts[state]}"
+                 for state in (PENDING_NEW, OPEN, PARTIALLY_FILLED, PENDING_CANCEL) if counts.get(state)]
+        return ' | '.join(parts) or 'none resting'
+
+    # -- internals ------------------------------------------------------------------------
+
+    def _set_id(self, order: TrackedOrder, order_id: str) -> None:
+        order.id = order_id
+        self.by_id[order_id] = order
+
+    def _apply_fill_state(self, order: TrackedOrder) -> None:
+        if order.state in (DONE, PENDING_CANCEL):
+            return
+        if order.remaining <= order.amount * 1e-9:
+            self._finish(order)
+        else:
+            order.state = PARTIALLY_FILLED if order.filled > 0 else OPEN
+            order.updated = time.time()
+
+    def _finish(self, order: TrackedOrder) -> None:
+        """Move an order to done and forget the oldest finished ones"""
+        if order.state == DONE:
+            return
+        order.state = DONE
+        order.updated = time.time()
+        if len(self._done) == self._done.maxlen:
+            old = self._done[0]
+            if old.id is not None:
+                self.by_id.pop(old.id, None)
+            if old.client_id is not None:
+                self.orders.pop(old.client_id, None)
+        self._done.append(order)
+
+    def _run_loop(self) -> None:
+        """Thread target that owns the asyncio loop"""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._task = self._loop.create_task(self._consume())
+            if not self.running:
+                self._task.cancel()
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _consume(self) -> None:
+        """Consume the private order stream, reconnecting after errors until stopped"""
+        import ccxt.pro as ccxtpro
+
+        while self.running:
+            config = dict(self.exchange_config)
+            sandbox = config.pop('sandbox', False)
+            exchange = getattr(ccxtpro, self.exchange_id)(config)
+            if sandbox:
+                exchange.set_sandbox_mode(True)
+            try:
+                while self.running:
+                    updates = await exchange.watch_orders(self.symbol)
+                    self.stream_connected = True
+                    self.stream_updates += len(updates)
+                    for update in updates:
+                        self.on_update(update)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Order stream error: {e}, reconnecting in {self.reconnect_delay}s")
+            finally:
+                self.stream_connected = False
+                await exchange.close()
+            if self.running:
+                await asyncio.sleep(self.reconnect_delay)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Parameter Sweep - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Vectorised, multi-process search over Avellaneda-Stoikov settings on
+recorded market data
+"""
+
+import copy
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+from quote_kernel import QuoteConstants, quote_prices, order_sizes
+from venues import venue_for
+
+logger = logging.getLogger(__name__)
+
+# Swept parameters and the strategy config keys they map to
+PARAMETERS = ('gamma', 'k', 'time_horizon', 'sigma_lookback', 'min_spread', 'max_spread_percent')
+
+RESULT_COLUMNS = ('pnl', 'sharpe', 'fills', 'max_inventory', 'final_inventory')
+
+MAX_CHUNK = 4096  # Parameter sets simulated together in one worker call
+
+_market = None  # Per-worker market data, set by _init_worker
+
+
+def load_market_data(path: str, trades_path: Optional[str] = None):
+    """Load books from a recorder day directory, an .npz or JSON-lines file"""
+    from backtest import MarketData
+
+    if os.path.isdir(path):
+        from recorder import load_day, to_market_data
+        return to_market_data(load_day(path))
+    if path.endswith('.npz'):
+        return MarketData.from_npz(path)
+    return MarketData.from_jsonl(path, trades_path)
+
+
+def parse_values(spec: str, integer: bool = False) -> List[float]:
+    """Parse a comma list ('0.01,0.05') or a 'start:stop[:count]' linear range"""
+    if ':' in spec:
+        start, stop, *count = spec.split(':')
+        values = np.linspace(float(start), float(stop), int(count[0]) if count else 2).tolist()
+    else:
+        values = [float(value) for value in spec.split(',')]
+    return [int(round(value)) for value in values] if integer else values
+
+
+def grid(values: Dict[str, List[float]]) -> Dict[str, np.ndarray]:
+    """Cartesian product of the given values, one column per parameter"""
+    names = list(values)
+    rows = list(itertools.product(*(values[name] for name in names)))
+    return {name: np.array([row[i] for row in rows]) for i, name in enumerate(names)}
+
+
+def random_sample(ranges: Dict[str, List[float]], samples: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Uniform random draws between the min and max of each parameter's values"""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, values in ranges.items():
+        low, high = min(values), max(values)
+        if name == 'sigma_lookback':
+            columns[name] = rng.integers(int(low), int(high) + 1, samples)
+        else:
+            columns[name] = rng.uniform(low, high, samples)
+    return columns
+
+
+class SweepData:
+    """Market data resampled onto the quote clock, shared by every parameter set
+
+    For quote update ``j`` this holds the mid at the quote time and, for the
+    interval until the next update, the best opposite prices and the most
+    aggressive public trade prints on each side.
+    """
+
+    def __init__(self, data, update_frequency: float):
+        timestamps = data.timestamps
+        quote_times = np.arange(timestamps[0], timestamps[-1], update_frequency)
+        index = np.searchsorted(timestamps, quote_times, side='right') - 1
+        index = np.unique(np.clip(index, 0, len(timestamps) - 1))
+
+        self.times = timestamps[index]
+        self.mid = (data.bid_prices[index] + data.ask_prices[index]) / 2
+        self.update_frequency = update_frequency
+
+        # Book extremes between one quote update and the next
+        start = np.minimum(index + 1, len(timestamps) - 1)
+        self.min_ask = np.minimum.reduceat(data.ask_prices, start)
+        self.max_bid = np.maximum.reduceat(data.bid_prices, start)
+
+        # Most aggressive trade prints per interval (sells hit bids, buys lift asks)
+        steps = len(index)
+        self.min_sell = np.full(steps, np.inf)
+        self.max_buy = np.full(steps, -np.inf)
+        if len(data.trade_timestamps):
+            interval = np.searchsorted(self.times, data.trade_timestamps, side='right') - 1
+            valid = interval >= 0
+            sells = valid & (data.trade_sides < 0)
+            buys = valid & (data.trade_sides > 0)
+            np.minimum.at(self.min_sell, interval[sells], data.trade_prices[sells])
+            np.maximum.at(self.max_buy, interval[buys], data.trade_prices[buys])
+
+        self._sigma: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def sigma(self, lookback: int, horizon_seconds: float = 3600.0) -> np.ndarray:
+        """Rolling volatility per quote update, matching ``VolatilityEstimator`` window mode"""
+        if lookback not in self._sigma:
+            x = np.diff(np.log(self.mid)) / math.sqrt(self.update_frequency)
+            sums = np.concatenate([[0.0], np.cumsum(x)])
+            squares = np.concatenate([[0.0], np.cumsum(x * x)])
+            end = np.arange(1, len(x) + 1)
+            begin = np.maximum(end - lookback, 0)
+            count = end - begin
+            mean = (sums[end] - sums[begin]) / count
+            variance = np.where(count > 1, (squares[end] - squares[begin] - count * mean * mean)
+                                / np.maximum(count - 1, 1), 0.0)
+            sigma = np.sqrt(np.maximum(variance, 0.0)) * math.sqrt(horizon_seconds)
+            sigma = np.where(count > 1, np.maximum(sigma, 0.001), 0.01)
+            self._sigma[lookback] = np.concatenate([[0.01], sigma])
+        return self._sigma[lookback]
+
+
+def simulate(sweep: SweepData, params: Dict[str, np.ndarray], strategy: Dict[str, Any],
+             trading: Dict[str, Any], risk: Dict[str, Any], tick_size: float,
+             lot_size: float, fee_rate: float = 0.0, balance: float = 10000.0,
+             min_notional: float = 0.0, notional_target: float = 0.0) -> Dict[str, np.ndarray]:
+    """Simulate every parameter set at once, one NumPy vector op per step
+
+    Quotes and sizes come from the same kernel as the live bots, with one
+    constant per parameter set (percentage sizing uses ``balance``). Fills
+    are conservative: a quote fills in full when the opposite best price
+    reaches it or a trade prints through it before the next update, with no
+    credit for queue position.
+    """
+    count = len(next(iter(params.values())))
+    column = lambda name: np.asarray(params.get(name, np.full(count, strategy[name])), dtype=np.float64)
+    horizon = column('time_horizon')
+    lookback = np.asarray(params.get('sigma_lookback', np.full(count, strategy['sigma_lookback'])), dtype=np.int64)
+    percentage = trading.get('order_size_type') == 'percentage'
+    # Percentage sizing is in quote currency and divided by the mid each step
+    base_size = balance * trading['order_size_percent'] if percentage else trading.get('order_size', 0.001)
+    max_inventory = risk['max_inventory_usd']
+    constants = QuoteConstants(
+        gamma=column('gamma'), k=column('k'), min_spread=column('min_spread'),
+        max_spread=column('max_spread_percent'), min_distance=strategy['max_quote_distance_percent'],
+        inverse_tick=1 / tick_size, inverse_lot=1 / lot_size, max_inventory=max_inventory,
+        min_amount=lot_size, min_order=0.001,
+        min_notional=min_notional, notional_target=notional_target
+    )
+
+    lookbacks, lookback_index = np.unique(lookback, return_inverse=True)
+    sigmas = np.stack([sweep.sigma(int(value)) for value in lookbacks])
+
+    inventory = np.zeros(count)
+    cash = np.zeros(count)
+    fills = np.zeros(count, dtype=np.int64)
+    max_inv = np.zeros(count)
+    equity_sum = np.zeros(count)
+    equity_squares = np.zeros(count)
+    previous_equity = np.zeros(count)
+
+    for j in range(len(sweep) - 1):
+        mid = sweep.mid[j]
+        sigma = sigmas[lookback_index, j]
+        time_remaining = np.maximum(horizon - (sweep.times[j] % 3600) / 3600, 0.01)
+        bid, ask = quote_prices(mid, inventory, sigma, time_remaining, constants)
+        size = order_sizes(mid, inventory, base_size / mid if percentage else base_size, constants)
+        quoting = np.abs(inventory * mid) <= max_inventory
+
+        bought = quoting & ((sweep.min_ask[j] <= bid) | (sweep.min_sell[j] < bid))
+        sold = quoting & ((sweep.max_bid[j] >= ask) | (sweep.max_buy[j] > ask))
+        bought_size = np.where(bought, size, 0.0)
+        sold_size = np.where(sold, size, 0.0)
+        inventory += bought_size - sold_size
+        cash += sold_size * ask - bought_size * bid - (bought_size * bid + sold_size * ask) * fee_rate
+        fills += bought + sold
+        np.maximum(max_inv, np.abs(inventory), out=max_inv)
+
+        equity = cash + inventory * sweep.mid[j + 1]
+        change = equity - previous_equity
+        equity_sum += change
+        equity_squares += change * change
+        previous_equity = equity
+
+    steps = max(len(sweep) - 1, 1)
+    mean = equity_sum / steps
+    std = np.sqrt(np.maximum(equity_squares / steps - mean * mean, 0.0))
+    duration = sweep.times[-1] - sweep.times[0] if len(sweep) > 1 else 0.0
+    scale = math.sqrt(steps * 86400 / duration) if duration > 0 else 0.0
+    sharpe = np.where(std > 0, mean / np.where(std > 0, std, 1.0) * scale, 0.0)
+
+    return {
+        'pnl': previous_equity,
+        'sharpe': sharpe,
+        'fills': fills,
+        'max_inventory': max_inv,
+        'final_inventory': inventory,
+    }
+
+
+def _init_worker(data_path: str, trades_path: Optional[str], update_frequency: float) -> None:
+    """Load and resample the market data once per worker process"""
+    global _market
+    _market = SweepData(load_market_data(data_path, trades_path), update_frequency)
+
+
+def _run_chunk(args) -> Dict[str, np.ndarray]:
+    return simulate(_market, *args)
+
+
+def sweep(config: Dict[str, Any], params: Dict[str, np.ndarray], data_path: str,
+          trades_path: Optional[str] = None, tick_size: float = 0.01, lot_size: float = 0.001,
+          fee_rate: float = 0.0, balance: float = 10000.0, workers: Optional[int] = None,
+          chunk_size: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Evaluate every parameter set over the data across a process pool"""
+    venue = venue_for(config['exchange']['name'])
+    count = len(next(iter(params.values())))
+    workers = workers or os.cpu_count() or 1
+    # Per-step overhead dominates small chunks, so give each worker one large chunk
+    chunk_size = chunk_size or min(-(-count // workers), MAX_CHUNK)
+    chunks = [
+        ({name: values[start:start + chunk_size] for name, values in params.items()},
+         config['strategy'], config['trading'], config['risk'], tick_size, lot_size, fee_rate,
+         balance, venue.min_notional, venue.notional_target)
+        for start in range(0, count, chunk_size)
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data_path, trades_path, config['strategy']['update_frequency'])) as pool:
+        results = list(pool.map(_run_chunk, chunks))
+
+    merged = {name: np.asarray(values) for name, values in params.items()}
+    for name in RESULT_COLUMNS:
+        merged[name] = np.concatenate([result[name] for result in results])
+    return merged
+
+
+def rank(results: Dict[str, np.ndarray], by: str = 'sharpe') -> np.ndarray:
+    """Indices of the parameter sets, best first"""
+    return np.argsort(-results[by], kind='stable')
+
+
+def write_table(path: str, results: Dict[str, np.ndarray], order: np.ndarray) -> None:
+    """Write the ranked results as CSV"""
+    names = [name for name in PARAMETERS if name in results] + list(RESULT_COLUMNS)
+    with open(path, 'w') as f:
+        f.write('rank,' + ','.join(names) + '\n')
+        for position, i in enumerate(order, 1):
+            f.write(f"{position}," + ','.join(f"{results[name][i]:.6g}" for name in names) + '\n')
+
+
+def best_config(config: Dict[str, Any], results: Dict[str, np.ndarray], index: int) -> Dict[str, Any]:
+    """Copy of the config with one parameter set written into the strategy section"""
+    best = copy.deepcopy(config)
+    for name in PARAMETERS:
+        if name in results:
+            value = results[name][index]
+            best['strategy'][name] = int(value) if name == 'sigma_lookback' else float(value)
+    return best
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Sweep Avellaneda-Stoikov parameters over recorded market data')
+    parser.add_argument('--config', type=str, default='config.json', help='Base configuration (default: config.json)')
+    parser.add_argument('--books', type=str, required=True, help='Recorder day directory, .npz or JSON-lines books')
+    parser.add_argument('--trades', type=str, help='Public trades as JSON-lines (with JSON-lines books)')
+    for name in PARAMETERS:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=str,
+                            help=f"Values for {name}: 'a,b,c' or 'start:stop[:count]'")
+    parser.add_argument('--samples', type=int, help='Draw this many random sets within the given ranges instead of a grid')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for --samples')
+    parser.add_argument('--tick-size', type=float, help='Price tick (default: the recorded tick, else 0.01)')
+    parser.add_argument('--lot-size', type=float, default=0.001, help='Amount step (default: 0.001)')
+    parser.add_argument('--fee-bps', type=float, default=0.0, help='Maker fee in basis points, negative for rebates')
+    parser.add_argument('--balance', type=float, default=10000.0, help='Balance for percentage order sizing (default: 10000)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--rank-by', choices=RESULT_COLUMNS, default='sharpe', help='Ranking column (default: sharpe)')
+    parser.add_argument('--top', type=int, default=20, help='Rows to print (default: 20)')
+    parser.add_argument('--output', type=str, default='sweep_results.csv', help='Ranked CSV (default: sweep_results.csv)')
+    parser.add_argument('--write-config', type=str, help='Write the best parameter set into this config file')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+
+    values = {}
+    for name in PARAMETERS:
+        spec = getattr(args, name)
+        if spec:
+            values[name] = parse_values(spec, integer=(name == 'sigma_lookback'))
+    if not values:
+        parser.error('Give at least one parameter to sweep, e.g. --gamma 0.01:0.5:20')
+
+    params = random_sample(values, args.samples, args.seed) if args.samples else grid(values)
+    count = len(next(iter(params.values())))
+    logger.info(f"Evaluating {count} parameter sets on {args.workers or os.cpu_count()} workers")
+
+    tick_size = args.tick_size
+    if not tick_size and os.path.isdir(args.books):
+        from recorder import recorded_tick_size
+        tick_size = recorded_tick_size(args.books)
+
+    start = time.time()
+    results = sweep(config, params, args.books, args.trades, tick_size=tick_size or 0.01,
+                    lot_size=args.lot_size, fee_rate=args.fee_bps / 10000, balance=args.balance,
+                    workers=args.workers)
+    logger.info(f"Sweep finished in {time.time() - start:.1f}s")
+
+    order = rank(results, args.rank_by)
+    write_table(args.output, results, order)
+
+    names = [name for name in PARAMETERS if name in results] + list(RESULT_COLUMNS)
+    print(f"\n{'='*100}")
+    print('Rank  ' + ''.join(f"{name:>20}" for name in names))
+    for position, i in enumerate(order[:args.top], 1):
+        print(f"{position:<6}" + ''.join(f"{results[name][i]:>20.6g}" for name in names))
+    print(f"\nRanked results written to {args.output}")
+
+    if args.write_config:
+        with open(args.write_config, 'w') as f:
+            json.dump(best_config(config, results, int(order[0])), f, indent=2)
+        print(f"Best parameters written to {args.write_config}")
+
+
+if __name__ == "__main__":
+    main()
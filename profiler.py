@@ -0,0 +1,222 @@
+"""
+Profiler - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Sampling profiler and allocation tracker for the quoting loop, started and stopped at runtime
+"""
+
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler:
+    """Profiles the quoting loop for a number of ticks without stopping it
+
+    ``request`` (safe from a signal handler or another thread) asks for a
+    session; the loop calls ``tick`` after every tick, so the session
+    starts and ends on tick boundaries, on the loop's own thread. While it
+    runs, a background thread samples the loop thread's stack every
+    ``interval`` seconds (one ``sys._current_frames`` lookup and a walk
+    of the frame chain, a few microseconds per sample) and tracemalloc
+    traces allocations. When the session ends the sampler stops and the
+    report is written by another background thread; both tracemalloc
+    snapshots are taken off the loop thread, since one can take a while
+    when there are many traces:
+
+    - ``<name>.collapsed``: one ``outer;...;inner count`` line per stack,
+      the input of flamegraph.pl, speedscope and similar tools
+    - ``<name>.txt``: the functions on the most sampled stacks and the source
+      lines whose allocations grew the most during the session
+
+    tracemalloc records the whole process, so allocations made by stream
+    and worker threads during the session are listed too.
+    """
+
+    def __init__(self, directory: str = 'profiles', ticks: int = 200, interval: float = 0.005,
+                 frames: int = 1, top: int = 25):
+        self.directory = directory
+        self.ticks = ticks
+        self.interval = interval
+        self.frames = frames
+        self.top = top
+        self.active = False
+        self.sessions = 0
+        self._requested = 0
+        self._remaining = 0
+        self._started = 0.0
+        self._name = ''
+        self._thread_id = 0
+        self._samples: Dict[Tuple[str, ...], int] = {}
+        self._sample_count = 0
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._tracing = False  # tracemalloc started by this session
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._writer: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['Profiler']:
+        """Build a profiler from the ``profiling`` config section, or None unless enabled
+
+        With ``signal`` (the default) SIGUSR1 starts a session, and with
+        ``on_start`` one starts at the first tick.
+        """
+        if not config.get('enabled', False):
+            return None
+        profiler = cls(
+            directory=config.get('directory', 'profiles'),
+            ticks=config.get('ticks', 200),
+            interval=config.get('interval', 0.005),
+            frames=config.get('tracemalloc_frames', 1),
+            top=config.get('top', 25)
+        )
+        if config.get('signal', True):
+            profiler.install_signal()
+        if config.get('on_start', False):
+            profiler.request()
+        return profiler
+
+    def install_signal(self) -> None:
+        """Start a session on SIGUSR1 (``kill -USR1 <pid>``), where the platform and thread allow it"""
+        if not hasattr(signal, 'SIGUSR1'):
+            return
+        try:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.request())
+        except ValueError:
+            return  # Not the main thread: only request() starts sessions
+        logger.info(f"Send SIGUSR1 (kill -USR1 {os.getpid()}) to profile the next {self.ticks} ticks")
+
+    def request(self, ticks: Optional[int] = None) -> None:
+        """Ask for a session of ``ticks`` ticks (default ``self.ticks``) from the next tick on"""
+        self._requested = ticks or self.ticks
+
+    def tick(self) -> None:
+        """Called by the quoting loop after every tick"""
+        if self.active:
+            self._remaining -= 1
+            if self._remaining <= 0:
+                self.stop()
+        elif self._requested:
+            self.start(self._requested)
+
+    # -- session ----------------------------------------------------------------------
+
+    def start(self, ticks: int) -> None:
+        """Start sampling the calling thread and tracing allocations"""
+        self._requested = 0
+        if self._writer is not None and self._writer.is_alive():
+            logger.warning("Previous profile is still being written, not starting another")
+            return
+        self.active = True
+        self._remaining = ticks
+        self._started = time.time()
+        self._name = time.strftime('profile-%Y%m%d-%H%M%S', time.localtime(self._started))
+        self._thread_id = threading.get_ident()
+        self._samples = {}
+        self._sample_count = 0
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start(self.frames)
+        self._snapshot = None
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._sampler.start()
+        logger.info(f"Profiling the next {ticks} ticks")
+
+    def stop(self) -> None:
+        """End the session and write its report in the background"""
+        if not self.active:
+            return
+        self.active = False
+        self._stop.set()
+        self._sampler.join()
+        self.sessions += 1
+        self._writer = threading.Thread(
+            target=self._write, args=(self._name, self._samples, self._sample_count, self._snapshot,
+                                      time.time() - self._started, self._tracing),
+            name="profiler-writer", daemon=True
+        )
+        self._writer.start()
+        self._snapshot = None
+
+    def close(self, timeout: float = 10.0) -> None:
+        """End any session and wait for its report"""
+        self.stop()
+        if self._writer is not None:
+            self._writer.join(timeout)
+
+    def _sample(self) -> None:
+        """Record the loop thread's stack every ``interval`` seconds"""
+        current_frames = sys._current_frames
+        samples = self._samples
+        thread_id = self._thread_id
+        labels: Dict[Any, str] = {}
+        self._snapshot = tracemalloc.take_snapshot()  # Baseline for the allocation report
+        while not self._stop.wait(self.interval):
+            frame = current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                key = tuple(stack)
+                samples[key] = samples.get(key, 0) + 1
+                self._sample_count += 1
+
+    # -- report -----------------------------------------------------------------------
+
+    def _write(self, name: str, samples: Dict[Tuple[str, ...], int], count: int,
+               before: tracemalloc.Snapshot, seconds: float, tracing: bool) -> None:
+        try:
+            try:
+                after = tracemalloc.take_snapshot()
+            finally:
+                if tracing:
+                    tracemalloc.stop()
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, name)
+            with open(base + '.collapsed', 'w') as f:
+                f.writelines(f"{';'.join(stack)} {n}\n" for stack, n in
+                             sorted(samples.items(), key=lambda item: -item[1]))
+            with open(base + '.txt', 'w') as f:
+                f.write('\n'.join(self.summary(samples, count, before, after, seconds)) + '\n')
+            logger.info(f"Profile of {seconds:.1f}s ({count} samples) written to {base}.collapsed and {base}.txt")
+        except Exception as e:
+            logger.error(f"Could not write profile {name}: {e}")
+
+    def summary(self, samples: Dict[Tuple[str, ...], int], count: int, before: tracemalloc.Snapshot,
+                after: tracemalloc.Snapshot, seconds: float) -> List[str]:
+        """Top functions by samples including callees (and their own share) and top allocating lines"""
+        own: Dict[str, int] = {}
+        total: Dict[str, int] = {}
+        for stack, n in samples.items():
+            own[stack[-1]] = own.get(stack[-1], 0) + n
+            for label in set(stack):
+                total[label] = total.get(label, 0) + n
+
+        lines = [f"Profile of {seconds:.1f}s, {count} samples every {self.interval * 1000:.1f}ms", "",
+                 f"{'own %':>7} {'total %':>8}  function"]
+        for label, n in sorted(total.items(), key=lambda item: (-item[1], -own.get(item[0], 0)))[:self.top]:
+            lines.append(f"{own.get(label, 0) / max(count, 1) * 100:6.1f}% {n / max(count, 1) * 100:7.1f}%  {label}")
+
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        stats = sorted((stat for stat in stats if stat.size_diff > 0), key=lambda stat: -stat.size_diff)
+        lines.extend(["", "Top allocating lines during the session (net growth, all threads)",
+                      f"{'new KiB':>9} {'blocks':>8}  line"])
+        for stat in stats[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:9.1f} {stat.count_diff:8d}  {frame.filename}:{frame.lineno}")
+        return lines
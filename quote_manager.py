@@ -0,0 +1,681 @@
+"""
+Quote Manager - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Diff-based maintenance of the resting bid and ask, or of a multi-level ladder
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Callable, Dict, List, Optional, Any
+
+import ccxt
+
+from quote_kernel import QuoteConstants, ladder_quotes
+from venues import batch_cancel_errors
+
+logger = logging.getLogger(__name__)
+
+SIDES = {'bid': 'buy', 'ask': 'sell'}
+
+# API calls the old cancel-all-and-replace path made per update (cancel all + bid + ask)
+BASELINE_CALLS_PER_UPDATE = 3
+
+
+class QuoteAction:
+    """Requests sent for one side of one update"""
+
+    __slots__ = ('key', 'kind', 'order', 'price', 'size', 'futures', 'tracked', 'batch')
+
+    def __init__(self, key: str, kind: str, order: Optional[Dict], price: float, size: float):
+        self.key = key
+        self.kind = kind  # 'place', 'amend', 'replace', or 'cancel' ahead of a place
+        self.order = order
+        self.price = price
+        self.size = size
+        self.futures: Dict[str, Future] = {}
+        self.tracked = None  # OrderTracker entry of the order being created
+        self.batch: Optional[List[str]] = None  # IDs sharing one cancel request with this order
+
+    @property
+    def done(self) -> bool:
+        return all(future.done() for future in self.futures.values())
+
+
+class QuoteManager:
+    """Keeps one bid and one ask in line with the desired quotes using as few API calls as possible
+
+    Per side, an order still within tolerance of the desired price and size
+    is left alone so it keeps queue priority. Otherwise it is amended through
+    ``edit_order`` where the exchange supports it natively, or cancelled and
+    replaced. When both sides are replaced, their cancels go out as one
+    ``cancel_orders`` (or ``cancel_all_orders``) request. Resting orders are reconciled against ``fetch_open_orders``
+    every ``reconcile_interval`` seconds so that filled or externally
+    cancelled orders are noticed.
+
+    With an ``OrderEntry`` pool, both sides (and the cancel and create of a
+    replace) are sent concurrently, so quotes go live after about one round
+    trip. A side still in flight at the deadline is skipped until its
+    requests complete on a later update; the cancel and place that follow a
+    failed amend are sent the same way, and retried cancels are never
+    waited for.
+
+    With an ``EventLog``, every placement, amend, failure and disappearance
+    is also recorded as a structured event.
+
+    With an ``OrderTracker``, orders are sent with client order IDs and every
+    request outcome is applied to the tracker. Fully filled orders are then
+    dropped on the next update without asking the exchange, partly filled
+    ones are compared by their remaining size, and the ``fetch_open_orders``
+    reconcile is skipped while the tracker's order stream is connected.
+    """
+
+    def __init__(self, exchange, symbol: str, tick_tolerance: int = 0,
+                 bps_tolerance: float = 0.0, size_tolerance: float = 0.0,
+                 use_amend: bool = True, reconcile_interval: float = 5.0,
+                 order_entry=None, events=None, order_params: Optional[Dict[str, Any]] = None,
+                 tracker=None):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.tick_tolerance = tick_tolerance
+        self.bps_tolerance = bps_tolerance
+        self.size_tolerance = size_tolerance
+        self.use_amend = use_amend and exchange.has.get('editOrder') is True
+        self.reconcile_interval = reconcile_interval
+        self.order_entry = order_entry
+        self.events = events
+        self.order_params = dict(order_params or {})  # e.g. postOnly from the venue adapter
+        self.tracker = tracker
+        self.last_reconcile = 0.0
+        self.last_latency = 0.0
+        self.tick_size = self._tick_size()
+        self.in_flight: Dict[str, QuoteAction] = {}
+        self.orphans: List[Dict] = []
+        self.orphan_cancels: Dict[str, Future] = {}  # Retries of orphan cancels still in flight
+        self._lock = threading.Lock()
+        self.stats = {
+            'updates': 0, 'sent': 0, 'kept': 0, 'amended': 0, 'replaced': 0,
+            'placed': 0, 'failed': 0, 'api_calls': 0
+        }
+
+    @classmethod
+    def from_config(cls, exchange, symbol: str, config: Dict[str, Any],
+                    order_entry=None, events=None,
+                    order_params: Optional[Dict[str, Any]] = None, tracker=None) -> 'QuoteManager':
+        """Build a manager from the ``quoting`` config section"""
+        return cls(
+            exchange, symbol,
+            tick_tolerance=config.get('tick_tolerance', 0),
+            bps_tolerance=config.get('bps_tolerance', 0.0),
+            size_tolerance=config.get('size_tolerance', 0.0),
+            use_amend=config.get('use_amend', True),
+            reconcile_interval=config.get('reconcile_interval', 5.0),
+            order_entry=order_entry,
+            events=events,
+            order_params=order_params,
+            tracker=tracker
+        )
+
+    def _tick_size(self) -> float:
+        """Price tick from market precision (decimal places or tick size)"""
+        precision = self.exchange.markets[self.symbol]['precision']['price'] or 0
+        if isinstance(precision, int):
+            return 10 ** -precision
+        return float(precision)
+
+    def tolerance(self, price: float) -> float:
+        """Largest price move that still counts as unchanged"""
+        tolerance = max(self.tick_tolerance * self.tick_size, price * self.bps_tolerance / 10000)
+        return tolerance + self.tick_size * 1e-6  # Absorb float error in tick-rounded prices
+
+    def update(self, current_orders: Dict[str, Optional[Dict]], bid_price: float,
+               ask_price: float, size: float) -> Dict[str, Optional[Dict]]:
+        """Bring the resting orders in line with the desired quotes and return them"""
+        start = time.perf_counter()
+        self._count('updates')
+        self._collect_in_flight(current_orders)
+        self._cancel_orphans()
+        self.reconcile(current_orders)
+
+        actions = {}
+        for key, price in (('bid', bid_price), ('ask', ask_price)):
+            if key in self.in_flight:
+                continue
+            action = self._plan(key, current_orders.get(key), price, size)
+            if action is not None:
+                actions[key] = action
+
+        if not actions:
+            return current_orders
+
+        self._send(actions)
+        self._count('sent')
+        if self.order_entry is not None:
+            pending = self.order_entry.run_batch({
+                f"{key}:{name}": future
+                for key, action in actions.items()
+                for name, future in action.futures.items()
+            })
+            for key, action in actions.items():
+                if any(name.startswith(key + ':') for name in pending):
+                    self.in_flight[key] = action
+
+        for key, action in actions.items():
+            if key not in self.in_flight:
+                current_orders[key] = self._resolve(action)
+
+        self.last_latency = time.perf_counter() - start
+        return current_orders
+
+    def reconcile(self, current_orders: Dict[str, Optional[Dict]], force: bool = False) -> None:
+        """Drop orders that are no longer resting on the exchange"""
+        is_open = self._open_check(any(current_orders.values()), force)
+        if is_open is None:
+            return
+        for key, order in current_orders.items():
+            if order is not None and key not in self.in_flight and not is_open(order['id']):
+                self._gone(key, order)
+                current_orders[key] = None
+
+    def _open_check(self, resting: bool, force: bool = False) -> Optional[Callable[[str], bool]]:
+        """Test for whether an order ID is still open, or None when there is nothing to check
+
+        The tracker answers on every update; the exchange's open orders are
+        fetched every ``reconcile_interval`` unless the order stream keeps
+        the tracker current.
+        """
+        if self.tracker is not None and self.tracker.stream_connected and not force:
+            return self.tracker.is_resting
+        open_ids = self._open_ids(resting, force)
+        if open_ids is not None:
+            return open_ids.__contains__
+        return self.tracker.is_resting if self.tracker is not None else None
+
+    def _gone(self, key: str, order: Dict) -> None:
+        """Log and record an order that was filled or cancelled outside our requests"""
+        logger.info(f"{key.capitalize()} {order['id']} no longer open (filled or cancelled)")
+        self._event('gone', key, order['id'], order['price'], order['amount'])
+        if self.tracker is not None:
+            self.tracker.on_gone(order['id'])
+
+    def _open_ids(self, resting: bool, force: bool = False) -> Optional[set]:
+        """IDs of our open orders when a reconcile is due and anything is resting, else None"""
+        now = time.time()
+        if not force and now - self.last_reconcile < self.reconcile_interval:
+            return None
+        if not resting:
+            self.last_reconcile = now
+            return None
+
+        try:
+            self._count('api_calls')
+            open_ids = {order['id'] for order in self.exchange.fetch_open_orders(self.symbol)}
+        except Exception as e:
+            logger.warning(f"Could not reconcile open orders: {e}")
+            return None
+
+        self.last_reconcile = now
+        return open_ids
+
+    def _plan(self, key: str, order: Optional[Dict], price: float, size: float) -> Optional[QuoteAction]:
+        """Decide whether to keep, place, amend or replace one side"""
+        if order is None:
+            return QuoteAction(key, 'place', None, price, size)
+
+        remaining = self._remaining(order)
+        if (abs(order['price'] - price) <= self.tolerance(price)
+                and abs(remaining - size) <= size * self.size_tolerance):
+            self._count('kept')
+            return None
+
+        # Venues disagree on whether an amended size is the total or what remains, so a
+        # partly filled order is replaced rather than amended
+        amend = self.use_amend and remaining >= order['amount']
+        return QuoteAction(key, 'amend' if amend else 'replace', order, price, size)
+
+    def _send(self, actions: Dict[str, QuoteAction]) -> None:
+        """Issue the requests for every planned action"""
+        replaces = [action for action in actions.values() if action.kind == 'replace']
+        if len(replaces) > 1:
+            batch = [action.order['id'] for action in replaces]
+            future = self._cancel_batch(batch)
+            if future is not None:
+                for action in replaces:
+                    action.futures['cancel'] = future
+                    action.batch = batch
+
+        for action in actions.values():
+            side = SIDES[action.key]
+            if action.kind == 'amend':
+                action.futures['edit'] = self._call(
+                    self.exchange.edit_order, action.order['id'], self.symbol,
+                    'limit', side, action.size, action.price, self.order_params
+                )
+                continue
+            if action.kind == 'replace' and 'cancel' not in action.futures:
+                action.futures['cancel'] = self._cancel(action.order['id'])
+            self._create(action)
+
+    def _resolve(self, action: QuoteAction) -> Optional[Dict]:
+        """Turn the completed requests of one action into the new resting order"""
+        label = action.key.capitalize()
+
+        if action.kind == 'amend':
+            error = action.futures['edit'].exception()
+            if error is None:
+                self._count('amended')
+                logger.info(f"{label} amended: {action.order['price']} -> {action.price} ({action.size})")
+                order = self._normalise(action.futures['edit'].result(), action.price, action.size)
+                if self.tracker is not None:
+                    self.tracker.on_amend(action.order['id'], order, action.price, action.size)
+                self._event('amended', action.key, order.get('id'), action.price, action.size)
+                return order
+            if isinstance(error, ccxt.OrderNotFound):
+                logger.info(f"{label} {action.order['id']} gone before amend, placing a new one")
+                if self.tracker is not None:
+                    self.tracker.on_gone(action.order['id'])
+                return self._follow_up(action, 'place', None)
+            logger.warning(f"Amend failed for {action.key} {action.order['id']}: {error}, replacing instead")
+            return self._follow_up(action, 'cancel', action.order)
+
+        if action.kind == 'cancel':
+            # A failed amend is only replaced once the order is known to be gone
+            if not self._cancel_result(action.order, action.futures['cancel'].exception()):
+                return action.order
+            return self._follow_up(action, 'place', None)
+
+        if action.kind == 'replace':
+            error = self._cancel_error(action)
+            self._cancelled(action.order['id'], error)
+            if error is not None and not isinstance(error, ccxt.OrderNotFound):
+                logger.error(f"Error cancelling {action.key} {action.order['id']}: {error}")
+                self.orphans.append(action.order)
+
+        error = action.futures['create'].exception()
+        if error is not None:
+            self._count('failed')
+            logger.error(f"Error placing {action.key}: {error}")
+            self._created(action.tracked, None)
+            self._event('failed', action.key, None, action.price, action.size, error=str(error))
+            return None
+
+        self._count('replaced' if action.kind == 'replace' else 'placed')
+        logger.info(f"{label} placed: {action.size} @ {action.price}")
+        order = self._normalise(action.futures['create'].result(), action.price, action.size)
+        self._created(action.tracked, order)
+        self._event('replaced' if action.kind == 'replace' else 'placed', action.key,
+                    order.get('id'), action.price, action.size)
+        return order
+
+    def _collect_in_flight(self, current_orders: Dict[str, Optional[Dict]]) -> None:
+        """Apply the results of requests that missed an earlier deadline"""
+        for key, action in list(self.in_flight.items()):
+            if action.done:
+                del self.in_flight[key]
+                current_orders[key] = self._resolve(action)
+
+    def drain(self, current_orders: Dict[str, Any]) -> None:
+        """Wait for every request still in flight and apply its result, e.g. before a final cancel-all"""
+        while self.in_flight:
+            wait([future for action in self.in_flight.values() for future in action.futures.values()])
+            self._collect_in_flight(current_orders)
+
+    def _follow_up(self, action: QuoteAction, kind: str, resting: Optional[Dict]) -> Optional[Dict]:
+        """Send the next step of an action; its outcome, or ``resting`` while it is still in flight"""
+        action.kind = kind
+        action.futures = {}
+        if kind == 'cancel':
+            action.futures['cancel'] = self._cancel(action.order['id'])
+        else:
+            self._create(action)
+        if self.order_entry is not None and self.order_entry.run_batch(action.futures):
+            self.in_flight[action.key] = action
+            return resting
+        return self._resolve(action)
+
+    def _cancel_orphans(self) -> None:
+        """Retry cancels that failed during a replace
+
+        Each retry is sent without waiting; its outcome is picked up on this
+        update when it completes within it, else on a later one.
+        """
+        for order in self.orphans:
+            if order['id'] not in self.orphan_cancels:
+                self.orphan_cancels[order['id']] = self._cancel(order['id'])
+
+        remaining = []
+        for order in self.orphans:
+            future = self.orphan_cancels[order['id']]
+            if future.done():
+                del self.orphan_cancels[order['id']]
+                if self._cancel_result(order, future.exception()):
+                    continue
+            remaining.append(order)
+        self.orphans = remaining
+
+    def _cancel_result(self, order: Dict, error: Optional[Exception]) -> bool:
+        """Apply the outcome of a cancel; True once the order is gone"""
+        self._cancelled(order['id'], error)
+        if error is None or isinstance(error, ccxt.OrderNotFound):
+            return True
+        self._count('failed')
+        logger.error(f"Error cancelling order {order['id']}: {error}")
+        return False
+
+    def _create(self, action: QuoteAction) -> None:
+        """Send the new order of an action"""
+        action.tracked, params = self._submit(action.key, action.price, action.size)
+        action.futures['create'] = self._call(
+            self.exchange.create_limit_order, self.symbol, SIDES[action.key], action.size, action.price, params
+        )
+
+    def _submit(self, key: str, price: float, size: float) -> tuple:
+        """Register an order about to be sent; returns its tracker entry and order params"""
+        if self.tracker is None:
+            return None, self.order_params
+        client_id = self.tracker.new_client_id()
+        tracked = self.tracker.on_submit(client_id, SIDES[key], price, size)
+        return tracked, dict(self.order_params, clientOrderId=client_id) if client_id else self.order_params
+
+    def _created(self, tracked, order: Optional[Dict]) -> None:
+        """Apply the outcome of a create to the tracker"""
+        if tracked is None:
+            return
+        if order and order.get('id'):
+            self.tracker.on_ack(tracked, order)
+        else:
+            self.tracker.on_reject(tracked)
+
+    def _cancel(self, order_id: str) -> Future:
+        """Send a cancel for one order"""
+        if self.tracker is not None:
+            self.tracker.on_cancel_submit(order_id)
+        return self._call(self.exchange.cancel_order, order_id, self.symbol)
+
+    def _cancel_batch(self, order_ids: List[str]) -> Optional[Future]:
+        """Send one request cancelling several orders, or None when the exchange has no such endpoint"""
+        if self.exchange.has.get('cancelOrders') is True:
+            fn, args = self.exchange.cancel_orders, (order_ids, self.symbol)
+        elif self.exchange.has.get('cancelAllOrders') is True:
+            fn, args = self.exchange.cancel_all_orders, (self.symbol,)
+        else:
+            return None
+        if self.tracker is not None:
+            for order_id in order_ids:
+                self.tracker.on_cancel_submit(order_id)
+        return self._call(fn, *args)
+
+    def _cancel_error(self, action: QuoteAction) -> Optional[Exception]:
+        """Outcome of the cancel of a replaced order, picking it out of a shared batch"""
+        future = action.futures['cancel']
+        error = future.exception()
+        if error is None and action.batch is not None and self.exchange.has.get('cancelOrders') is True:
+            return batch_cancel_errors(action.batch, future.result())[action.batch.index(action.order['id'])]
+        return error
+
+    def _cancelled(self, order_id: str, error: Optional[Exception]) -> None:
+        """Apply the outcome of a cancel to the tracker"""
+        if self.tracker is not None:
+            self.tracker.on_cancel_result(order_id, error, gone=isinstance(error, ccxt.OrderNotFound))
+
+    def _remaining(self, order: Dict) -> float:
+        """Unfilled size of a resting order"""
+        return self.tracker.remaining(order) if self.tracker is not None else order['amount']
+
+    def _call(self, fn: Callable, *args) -> Future:
+        """Send one request, on the order entry pool when there is one"""
+        self._count('api_calls')
+        if self.order_entry is not None:
+            return self.order_entry.submit(fn, *args)
+
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _event(self, event: str, key: str, order_id: Optional[str], price: float,
+               size: float, **fields) -> None:
+        if self.events is not None:
+            self.events.record(event, symbol=self.symbol, side=SIDES[key], id=order_id,
+                               price=price, amount=size, **fields)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _normalise(order: Dict, price: float, size: float) -> Dict:
+        """Fill in price and amount that some exchanges leave out of order responses"""
+        order = dict(order)
+        order['price'] = order.get('price') or price
+        order['amount'] = order.get('amount') or size
+        return order
+
+    def calls_saved(self) -> int:
+        """API calls saved compared with cancel-all-and-replace on every update"""
+        return BASELINE_CALLS_PER_UPDATE * self.stats['updates'] - self.stats['api_calls']
+
+    def summary(self) -> str:
+        """One-line counter summary for status output"""
+        return (f"kept {self.stats['kept']} | amended {self.stats['amended']} | "
+                f"replaced {self.stats['replaced']} | API calls {self.stats['api_calls']} "
+                f"(saved {self.calls_saved()}) | last update {self.last_latency * 1000:.0f}ms")
+
+
+class LadderRefresh:
+    """Batch requests sent for one ladder update"""
+
+    __slots__ = ('cancels', 'creates', 'futures', 'tracked')
+
+    def __init__(self, cancels: List[Dict], creates: List[tuple]):
+        self.cancels = cancels
+        self.creates = creates  # (key, price, size)
+        self.futures: Dict[str, Future] = {}
+        self.tracked: List[Any] = []  # OrderTracker entries of the creates
+
+    @property
+    def done(self) -> bool:
+        return all(future.done() for future in self.futures.values())
+
+
+class QuoteLadder(QuoteManager):
+    """Keeps ``levels`` orders per side in line with a ladder around the A-S quotes
+
+    Levels come from ``quote_kernel.ladder_quotes``. As with single quotes,
+    a resting order still within tolerance of a desired level is kept; the
+    rest are cancelled with one ``cancel_orders`` request and the missing
+    levels placed with one ``create_orders`` request per ``batch_size``
+    orders, where the exchange supports those endpoints. A full refresh of
+    10 levels a side then costs two or three requests instead of twenty-one.
+    Ladders are never amended, since without a batch amend moving N orders
+    would take N requests.
+
+    The resting orders of each side are kept as a list, innermost first,
+    under the usual ``'bid'`` and ``'ask'`` keys.
+    """
+
+    def __init__(self, exchange, symbol: str, constants: QuoteConstants, levels: int = 3,
+                 spacing: float = 1.0, size_step: float = 1.0, batch_size: int = 10, **kwargs):
+        super().__init__(exchange, symbol, **kwargs)
+        self.constants = constants
+        self.levels = levels
+        self.spacing = spacing
+        self.size_step = size_step
+        self.batch_size = batch_size
+        self.batch_create = exchange.has.get('createOrders') is True
+        self.batch_cancel = exchange.has.get('cancelOrders') is True
+
+    @classmethod
+    def from_config(cls, exchange, symbol: str, config: Dict[str, Any], order_entry=None,
+                    events=None, constants: Optional[QuoteConstants] = None,
+                    order_params: Optional[Dict[str, Any]] = None, tracker=None) -> 'QuoteLadder':
+        """Build a ladder from the ``quoting`` config section"""
+        return cls(
+            exchange, symbol, constants,
+            levels=config.get('levels', 3),
+            spacing=config.get('level_spacing', 1.0),
+            size_step=config.get('level_size_step', 1.0),
+            batch_size=config.get('batch_size', 10),
+            tick_tolerance=config.get('tick_tolerance', 0),
+            bps_tolerance=config.get('bps_tolerance', 0.0),
+            size_tolerance=config.get('size_tolerance', 0.0),
+            reconcile_interval=config.get('reconcile_interval', 5.0),
+            order_entry=order_entry,
+            events=events,
+            order_params=order_params,
+            tracker=tracker
+        )
+
+    def update(self, current_orders: Dict[str, Any], bid_price: float,
+               ask_price: float, size: float) -> Dict[str, Any]:
+        """Bring the resting ladder in line with the one around the new quotes and return it"""
+        start = time.perf_counter()
+        self._count('updates')
+        self._collect_in_flight(current_orders)
+        self._cancel_orphans()
+        self.reconcile(current_orders)
+        if self.in_flight:
+            return current_orders  # The previous refresh is still being sent
+
+        cancels, creates = [], []
+        ladder = ladder_quotes(bid_price, ask_price, size, self.levels, self.spacing,
+                               self.size_step, self.constants)
+        for key, levels in zip(SIDES, ladder):
+            resting = list(current_orders.get(key) or [])
+            kept = []
+            for price, level_size in levels:
+                match = next((order for order in resting
+                              if abs(order['price'] - price) <= self.tolerance(price)
+                              and abs(self._remaining(order) - level_size) <= level_size * self.size_tolerance),
+                             None)
+                if match is None:
+                    creates.append((key, price, level_size))
+                else:
+                    resting.remove(match)
+                    kept.append(match)
+                    self._count('kept')
+            cancels.extend(resting)
+            current_orders[key] = kept
+
+        if not cancels and not creates:
+            return current_orders
+
+        refresh = LadderRefresh(cancels, creates)
+        self._send_refresh(refresh)
+        if refresh.creates:
+            self._count('sent')
+        if self.order_entry is not None and self.order_entry.run_batch(refresh.futures):
+            self.in_flight['ladder'] = refresh
+        else:
+            self._resolve_refresh(refresh, current_orders)
+
+        self.last_latency = time.perf_counter() - start
+        return current_orders
+
+    def reconcile(self, current_orders: Dict[str, Any], force: bool = False) -> None:
+        """Drop ladder orders that are no longer resting on the exchange"""
+        is_open = self._open_check(any(current_orders.get(key) for key in SIDES), force)
+        if is_open is None:
+            return
+        for key in SIDES:
+            resting = []
+            for order in current_orders.get(key) or []:
+                if is_open(order['id']):
+                    resting.append(order)
+                else:
+                    self._gone(key, order)
+            current_orders[key] = resting
+
+    def _send_refresh(self, refresh: LadderRefresh) -> None:
+        """Issue the batch cancel and creates for one refresh"""
+        if refresh.cancels:
+            if self.batch_cancel:
+                if self.tracker is not None:
+                    for order in refresh.cancels:
+                        self.tracker.on_cancel_submit(order['id'])
+                refresh.futures['cancel'] = self._call(
+                    self.exchange.cancel_orders, [order['id'] for order in refresh.cancels], self.symbol
+                )
+            else:
+                for order in refresh.cancels:
+                    refresh.futures[f"cancel:{order['id']}"] = self._cancel(order['id'])
+
+        params = []
+        for key, price, size in refresh.creates:
+            tracked, order_params = self._submit(key, price, size)
+            refresh.tracked.append(tracked)
+            params.append(order_params)
+
+        chunk = self.batch_size if self.batch_create else 1
+        for index in range(0, len(refresh.creates), chunk):
+            batch = refresh.creates[index:index + chunk]
+            if self.batch_create:
+                refresh.futures[f"create:{index}"] = self._call(self.exchange.create_orders, [
+                    {'symbol': self.symbol, 'type': 'limit', 'side': SIDES[key], 'amount': size,
+                     'price': price, 'params': order_params}
+                    for (key, price, size), order_params in zip(batch, params[index:index + chunk])
+                ])
+            else:
+                key, price, size = batch[0]
+                refresh.futures[f"create:{index}"] = self._call(
+                    self.exchange.create_limit_order, self.symbol, SIDES[key], size, price, params[index]
+                )
+
+    def _resolve_refresh(self, refresh: LadderRefresh, current_orders: Dict[str, Any]) -> None:
+        """Apply the results of a completed refresh to the resting ladder"""
+        batch = refresh.futures.get('cancel')
+        if batch is not None and batch.exception() is None:
+            batch_errors = dict(zip((order['id'] for order in refresh.cancels),
+                                    batch_cancel_errors([order['id'] for order in refresh.cancels], batch.result())))
+        else:
+            batch_errors = {}
+        for order in refresh.cancels:
+            future = batch or refresh.futures[f"cancel:{order['id']}"]
+            error = batch_errors.get(order['id']) or future.exception()
+            self._cancelled(order['id'], error)
+            if error is not None and not isinstance(error, ccxt.OrderNotFound):
+                logger.error(f"Error cancelling order {order['id']}: {error}")
+                self.orphans.append(order)
+
+        chunk = self.batch_size if self.batch_create else 1
+        for index in range(0, len(refresh.creates), chunk):
+            batch = refresh.creates[index:index + chunk]
+            future = refresh.futures[f"create:{index}"]
+            error = future.exception()
+            if error is not None:
+                logger.error(f"Error placing {len(batch)} ladder order(s): {error}")
+                results = [None] * len(batch)
+            else:
+                results = future.result() if self.batch_create else [future.result()]
+
+            for (key, price, size), order, tracked in zip(batch, results, refresh.tracked[index:index + chunk]):
+                if not order or not order.get('id'):
+                    self._count('failed')
+                    self._created(tracked, None)
+                    self._event('failed', key, None, price, size, error=str(error or 'rejected'))
+                    continue
+                self._count('placed')
+                order = self._normalise(order, price, size)
+                self._created(tracked, order)
+                self._event('placed', key, order['id'], price, size)
+                current_orders[key] = list(current_orders.get(key) or []) + [order]
+
+        for key, descending in (('bid', True), ('ask', False)):
+            current_orders[key] = sorted(current_orders.get(key) or [], key=lambda order: order['price'],
+                                         reverse=descending)
+        logger.info(f"Ladder refreshed: {len(refresh.cancels)} cancelled, {len(refresh.creates)} new "
+                    f"in {len(refresh.futures)} request(s)")
+
+    def _collect_in_flight(self, current_orders: Dict[str, Any]) -> None:
+        """Apply a refresh that missed an earlier deadline"""
+        refresh = self.in_flight.get('ladder')
+        if refresh is not None and refresh.done:
+            del self.in_flight['ladder']
+            self._resolve_refresh(refresh, current_orders)
+
+    def calls_saved(self) -> int:
+        """API calls saved compared with cancelling everything and placing each level on every update"""
+        return (1 + 2 * self.levels) * self.stats['updates'] - self.stats['api_calls']
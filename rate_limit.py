@@ -0,0 +1,266 @@
+"""
+Rate Limiter - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Priority-aware token buckets following each exchange's documented request weights
+"""
+
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Any
+
+import ccxt
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first, and the share of every bucket each must leave
+# untouched so that more urgent requests always find budget
+PRIORITIES = ('cancel', 'quote', 'fills', 'status')
+RESERVE = {'cancel': 0.0, 'quote': 0.1, 'fills': 0.3, 'status': 0.5}
+
+# Priority class of each exchange method the limiter schedules
+CALL_PRIORITY = {
+    'cancel_order': 'cancel', 'cancel_orders': 'cancel', 'cancel_all_orders': 'cancel',
+    'create_order': 'quote', 'create_limit_order': 'quote', 'create_orders': 'quote',
+    'edit_order': 'quote', 'fetch_order_book': 'quote',
+    'fetch_my_trades': 'fills', 'fetch_positions': 'fills', 'fetch_open_orders': 'fills',
+    'fetch_balance': 'status', 'fetch_ticker': 'status', 'set_leverage': 'status',
+}
+
+# Documented REST limits: bucket -> (capacity, refill per second), method -> ((bucket, weight), ...)
+EXCHANGE_LIMITS: Dict[str, Dict[str, Any]] = {
+    # Bybit V5: 10/s per order endpoint, 50/s per account read endpoint, 600 requests per 5s per IP
+    'bybit': {
+        'buckets': {
+            'ip': (600, 120), 'create': (10, 10), 'amend': (10, 10), 'cancel': (10, 10),
+            'cancel_all': (10, 10), 'create_batch': (10, 10), 'cancel_batch': (10, 10),
+            'open_orders': (50, 50), 'executions': (50, 50),
+            'positions': (50, 50), 'balance': (50, 50),
+        },
+        'calls': {
+            'create_order': (('ip', 1), ('create', 1)),
+            'create_limit_order': (('ip', 1), ('create', 1)),
+            'create_orders': (('ip', 1), ('create_batch', 1)),
+            'edit_order': (('ip', 1), ('amend', 1)),
+            'cancel_order': (('ip', 1), ('cancel', 1)),
+            'cancel_orders': (('ip', 1), ('cancel_batch', 1)),
+            'cancel_all_orders': (('ip', 1), ('cancel_all', 1)),
+            'fetch_open_orders': (('ip', 1), ('open_orders', 1)),
+            'fetch_my_trades': (('ip', 1), ('executions', 1)),
+            'fetch_positions': (('ip', 1), ('positions', 1)),
+            'fetch_balance': (('ip', 1), ('balance', 1)),
+            'fetch_order_book': (('ip', 1),),
+        },
+    },
+    # Binance USD-M futures: 2400 IP weight per minute, 300 orders per 10s and 1200 per minute
+    'binance': {
+        'buckets': {'ip': (2400, 40), 'orders_10s': (300, 30), 'orders_1m': (1200, 20)},
+        'calls': {
+            'create_order': (('orders_10s', 1), ('orders_1m', 1)),
+            'create_limit_order': (('orders_10s', 1), ('orders_1m', 1)),
+            'create_orders': (('ip', 5), ('orders_10s', 5), ('orders_1m', 1)),
+            'edit_order': (('ip', 1), ('orders_10s', 1), ('orders_1m', 1)),
+            'cancel_order': (('ip', 1),),
+            'cancel_orders': (('ip', 1),),
+            'cancel_all_orders': (('ip', 1),),
+            'fetch_open_orders': (('ip', 1),),
+            'fetch_my_trades': (('ip', 5),),
+            'fetch_positions': (('ip', 5),),
+            'fetch_balance': (('ip', 5),),
+            'fetch_order_book': (('ip', 5),),
+        },
+    },
+    # Hyperliquid: 1200 weight per minute per IP; actions weigh 1, light info requests 2, the rest 20
+    'hyperliquid': {
+        'buckets': {'ip': (1200, 20)},
+        'calls': {
+            'create_order': (('ip', 1),),
+            'create_limit_order': (('ip', 1),),
+            'create_orders': (('ip', 1),),
+            'edit_order': (('ip', 1),),
+            'cancel_order': (('ip', 1),),
+            'cancel_orders': (('ip', 1),),
+            'fetch_order_book': (('ip', 2),),
+            'fetch_balance': (('ip', 2),),
+            'fetch_positions': (('ip', 2),),
+            'fetch_open_orders': (('ip', 20),),
+            'fetch_my_trades': (('ip', 20),),
+        },
+    },
+}
+
+
+class TokenBucket:
+    """Budget that refills continuously up to ``capacity``"""
+
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, weight: float, reserve: float) -> float:
+        """Seconds until ``weight`` can be taken while leaving ``reserve`` of capacity (0 if now)"""
+        needed = min(weight + reserve * self.capacity, self.capacity) - self.tokens
+        return max(needed, 0.0) / self.rate
+
+
+class RateLimiter:
+    """Schedules exchange requests against per-endpoint token buckets by priority
+
+    Every scheduled call takes its documented weight from each bucket it
+    counts against (per endpoint and per IP), waiting until all of them have
+    budget. Waiting calls are served most urgent first (``PRIORITIES``), and
+    lower classes must leave a ``RESERVE`` share of every bucket untouched,
+    so a status balance fetch can never use up the budget a cancel needs.
+    A rate-limit error from the exchange empties the buckets of that call.
+
+    ``instrument`` takes over throttling from ccxt's ``enableRateLimit``,
+    whose single evenly spaced queue has no notion of priority. Only the
+    outermost limited call is charged, so ``create_limit_order`` delegating
+    to ``create_order`` costs one order, not two.
+    """
+
+    def __init__(self, buckets: Dict[str, Tuple[float, float]],
+                 calls: Dict[str, Tuple[Tuple[str, float], ...]],
+                 headroom: float = 0.9, metrics=None):
+        self.buckets = {
+            name: TokenBucket(capacity * headroom, rate * headroom)
+            for name, (capacity, rate) in buckets.items()
+        }
+        self.calls = calls
+        self.wait_latency = {
+            priority: metrics.histogram('rate_limit_wait', priority=priority) for priority in PRIORITIES
+        } if metrics is not None else {}
+        self.waits = dict.fromkeys(PRIORITIES, 0)
+        self.rejections = 0
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int, Tuple[Tuple[str, float], ...]]] = []
+        self._sequence = itertools.count()
+        self._local = threading.local()
+
+    @classmethod
+    def for_exchange(cls, exchange_id: str, exchange, headroom: float = 0.9,
+                     metrics=None) -> 'RateLimiter':
+        """Limiter with the documented limits of ``exchange_id``, or one bucket from ccxt's ``rateLimit``"""
+        limits = EXCHANGE_LIMITS.get(exchange_id)
+        if limits is None:
+            per_second = 1000.0 / (getattr(exchange, 'rateLimit', None) or 100)
+            limits = {
+                'buckets': {'rest': (max(per_second, 1.0), per_second)},
+                'calls': {name: (('rest', 1),) for name in CALL_PRIORITY},
+            }
+        return cls(limits['buckets'], limits['calls'], headroom=headroom, metrics=metrics)
+
+    @classmethod
+    def from_config(cls, exchange_id: str, exchange, config: Dict[str, Any],
+                    metrics=None) -> Optional['RateLimiter']:
+        """Build a limiter from the ``rate_limit`` config section, or None when disabled"""
+        if not config.get('enabled', False):
+            return None
+        return cls.for_exchange(exchange_id, exchange, headroom=config.get('headroom', 0.9), metrics=metrics)
+
+    def acquire(self, call: str) -> float:
+        """Block until the budget for ``call`` is taken; returns the seconds waited"""
+        costs = self.calls.get(call)
+        if not costs:
+            return 0.0
+        priority = CALL_PRIORITY.get(call, 'status')
+        reserve = RESERVE[priority]
+        start = time.monotonic()
+        with self._cond:
+            ticket = (PRIORITIES.index(priority), next(self._sequence), costs)
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._delay(ticket, reserve, now)
+                    if delay == 0.0:
+                        for name, weight in costs:
+                            self.buckets[name].tokens -= weight
+                        break
+                    self._cond.wait(delay)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            self.waits[priority] += 1
+        if self.wait_latency:
+            self.wait_latency[priority].observe(waited)
+        return waited
+
+    def _delay(self, ticket, reserve: float, now: float) -> Optional[float]:
+        """0 when ``ticket`` may go now, else how long to wait (None: until another call finishes)"""
+        names = {name for name, _ in ticket[2]}
+        for other in self._waiting:
+            if other < ticket and names.intersection(name for name, _ in other[2]):
+                return None  # A more urgent (or earlier) call is queued on the same bucket
+        delay = 0.0
+        for name, weight in ticket[2]:
+            bucket = self.buckets[name]
+            bucket.refill(now)
+            delay = max(delay, bucket.wait_time(weight, reserve))
+        return delay
+
+    def penalise(self, call: str) -> None:
+        """The exchange rejected ``call`` for rate: empty its buckets so they refill from zero"""
+        self.rejections += 1
+        with self._cond:
+            for name, _ in self.calls.get(call, ()):
+                self.buckets[name].tokens = min(self.buckets[name].tokens, 0.0)
+        logger.warning(f"Rate limited on {call}, backing off")
+
+    def instrument(self, exchange) -> None:
+        """Schedule every call to the limited exchange methods, in place on the client instance"""
+        if getattr(exchange, '_rate_limited', False):
+            return
+        for name in self.calls:
+            method = getattr(exchange, name, None)
+            if callable(method):
+                setattr(exchange, name, self._limited(name, method))
+        exchange.enableRateLimit = False
+        exchange._rate_limited = True
+
+    def _limited(self, name: str, method):
+        @functools.wraps(method)
+        def limited(*args, **kwargs):
+            local = self._local
+            if getattr(local, 'active', False):
+                return method(*args, **kwargs)  # Nested in a limited call that already paid
+            self.acquire(name)
+            local.active = True
+            try:
+                return method(*args, **kwargs)
+            except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+                self.penalise(name)
+                raise
+            finally:
+                local.active = False
+        return limited
+
+    def budget(self) -> Dict[str, float]:
+        """Remaining share of every bucket (0 to 1)"""
+        now = time.monotonic()
+        with self._cond:
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+            return {name: max(bucket.tokens, 0.0) / bucket.capacity for name, bucket in self.buckets.items()}
+
+    def describe(self, count: int = 3) -> str:
+        """The most used buckets and how often each priority class had to wait, for status output"""
+        lowest = sorted(self.budget().items(), key=lambda item: item[1])[:count]
+        waits = ' '.join(f"{priority} {self.waits[priority]}" for priority in PRIORITIES if self.waits[priority])
+        return (' | '.join(f"{name} {share * 100:.0f}%" for name, share in lowest)
+                + f" | waits: {waits or 'none'}")
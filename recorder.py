@@ -0,0 +1,292 @@
+"""
+Market Data Recorder - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Append-only, memory-mapped columnar storage of books, quotes and fills
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COUNT_FILE = '_count'
+META_FILE = 'meta.json'
+
+
+# Largest day-open price, in ticks, recorded as int32 offsets; above it prices stay int64
+INT32_BASE_LIMIT = 2 ** 30
+
+
+def price_dtype(base_tick: int) -> str:
+    """Offsets from ``base_tick`` fit int32 for any move within -100%..+100% of it below the limit"""
+    return 'int32' if abs(base_tick) < INT32_BASE_LIMIT else 'int64'
+
+
+def book_columns(levels: int, price: str = 'int32') -> List[Tuple[str, str, int]]:
+    """Columns of the book table for ``levels`` price levels per side"""
+    return [
+        ('timestamp', 'int64', 1),
+        ('bid_price', price, levels),
+        ('bid_size', 'float32', levels),
+        ('ask_price', price, levels),
+        ('ask_size', 'float32', levels),
+    ]
+
+
+def quote_columns(price: str = 'int32') -> List[Tuple[str, str, int]]:
+    """Columns of the quote table"""
+    return [
+        ('timestamp', 'int64', 1),
+        ('bid_price', price, 1),
+        ('ask_price', price, 1),
+        ('size', 'float32', 1),
+    ]
+
+
+def fill_columns(price: str = 'int32') -> List[Tuple[str, str, int]]:
+    """Columns of the fill table"""
+    return [
+        ('timestamp', 'int64', 1),
+        ('side', 'int8', 1),
+        ('price', price, 1),
+        ('amount', 'float32', 1),
+        ('fee', 'float32', 1),
+    ]
+
+
+class ColumnTable:
+    """Append-only fixed-width columns, one memory-mapped file per column
+
+    Files grow in chunks of ``chunk_rows`` rows and the committed row count
+    lives in its own 8-byte file, updated after every row, so a reader (or a
+    restarted writer) never sees a half-written row. Prices are stored as
+    exact tick offsets from the day's ``base_tick`` in meta.json, int32 as
+    long as they fit, and sizes as float32 to keep a day of data small.
+    """
+
+    def __init__(self, directory: str, columns: List[Tuple[str, str, int]],
+                 meta: Optional[Dict[str, Any]] = None, chunk_rows: int = 65536):
+        self.directory = directory
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        os.makedirs(directory, exist_ok=True)
+
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            # Keep appending in the layout (and from the base tick) the table was created with
+            with open(meta_path, 'r') as f:
+                self.meta = json.load(f)
+            self.columns = [tuple(column) for column in self.meta['columns']]
+        else:
+            self.meta = dict(meta or {}, columns=columns)
+            with open(meta_path, 'w') as f:
+                json.dump(self.meta, f)
+        self.base_tick = self.meta.get('base_tick', 0)  # Tables from before base ticks store absolute ticks
+
+        count_path = os.path.join(directory, COUNT_FILE)
+        if not os.path.exists(count_path):
+            np.zeros(1, dtype=np.int64).tofile(count_path)
+        self._count = np.memmap(count_path, dtype=np.int64, mode='r+', shape=(1,))
+        self.rows = int(self._count[0])
+        self.capacity = 0
+        self.maps: List[np.memmap] = []
+        self.arrays: List[np.ndarray] = []
+        self._map(max(self.rows, 1))
+
+    def _map(self, min_rows: int) -> None:
+        """(Re)map every column file with room for at least ``min_rows`` rows"""
+        capacity = -(-min_rows // self.chunk_rows) * self.chunk_rows
+        maps = []
+        for name, dtype, width in self.columns:
+            path = os.path.join(self.directory, f"{name}.col")
+            nbytes = capacity * width * np.dtype(dtype).itemsize
+            with open(path, 'ab') as f:
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)
+            shape = (capacity,) if width == 1 else (capacity, width)
+            maps.append(np.memmap(path, dtype=dtype, mode='r+', shape=shape))
+        self.maps = maps
+        # Plain ndarray views over the same pages: row assignment is ~3x cheaper than on np.memmap
+        self.arrays = [np.asarray(m) for m in maps]
+        self.capacity = capacity
+
+    def append(self, *values) -> None:
+        """Write one row; values are in column order"""
+        row = self.rows
+        if row >= self.capacity:
+            self._map(row + 1)
+        for array, value in zip(self.arrays, values):
+            array[row] = value
+        self.rows = row + 1
+        self._count[0] = self.rows
+
+    def close(self) -> None:
+        """Flush and trim the column files to the committed rows"""
+        for m in self.maps:
+            m.flush()
+        self._count.flush()
+        self.maps = []
+        self.arrays = []
+        self.capacity = 0
+        for name, dtype, width in self.columns:
+            path = os.path.join(self.directory, f"{name}.col")
+            with open(path, 'r+b') as f:
+                f.truncate(self.rows * width * np.dtype(dtype).itemsize)
+
+
+def open_table(directory: str) -> Dict[str, Any]:
+    """Map a recorded table read-only, zero-copy, up to its committed row count"""
+    with open(os.path.join(directory, META_FILE), 'r') as f:
+        meta = json.load(f)
+    rows = int(np.fromfile(os.path.join(directory, COUNT_FILE), dtype=np.int64, count=1)[0])
+
+    table = {'meta': meta, 'rows': rows}
+    for name, dtype, width in meta['columns']:
+        path = os.path.join(directory, f"{name}.col")
+        if rows == 0:
+            table[name] = np.empty((0,) if width == 1 else (0, width), dtype=dtype)
+            continue
+        shape = (rows,) if width == 1 else (rows, width)
+        table[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape)
+    return table
+
+
+def load_day(directory: str) -> Dict[str, Dict[str, Any]]:
+    """Map every table recorded for one symbol and day"""
+    return {name: open_table(os.path.join(directory, name))
+            for name in ('books', 'quotes', 'fills')
+            if os.path.exists(os.path.join(directory, name, META_FILE))}
+
+
+def recorded_tick_size(directory: str) -> Optional[float]:
+    """Price tick a day directory was recorded with, or None if it has no books"""
+    meta_path = os.path.join(directory, 'books', META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r') as f:
+        return json.load(f).get('tick_size')
+
+
+def prices(table: Dict[str, Any], name: str) -> np.ndarray:
+    """Price column of an opened table in quote currency (0 for empty book levels)"""
+    meta = table['meta']
+    return (table[name].astype(np.int64) + meta.get('base_tick', 0)) * meta['tick_size']
+
+
+def to_market_data(day: Dict[str, Dict[str, Any]]):
+    """Convert a recorded day into backtest ``MarketData`` (top of book, own fills excluded)"""
+    from backtest import MarketData
+
+    books = day['books']
+    return MarketData(
+        books['timestamp'] / 1000,
+        prices(books, 'bid_price')[:, 0], books['bid_size'][:, 0],
+        prices(books, 'ask_price')[:, 0], books['ask_size'][:, 0],
+    )
+
+
+class MarketDataRecorder:
+    """Records the book the bot sees, its quotes and its fills, one directory per UTC day
+
+    Layout: ``{root}/{symbol}/{YYYYMMDD}/{books,quotes,fills}/{column}.col``.
+    A day's tables are created on its first record, whose price (in ticks)
+    becomes the day's ``base_tick``.
+    """
+
+    def __init__(self, root: str, symbol: str, tick_size: float, levels: int = 5):
+        self.root = root
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.inverse_tick = 1.0 / tick_size
+        self.levels = levels
+        self.day = None
+        self.day_end = 0.0
+        self.books: Optional[ColumnTable] = None
+        self.quotes: Optional[ColumnTable] = None
+        self.fills: Optional[ColumnTable] = None
+        self._empty = [0] * levels
+        self._empty_prices = [0] * levels  # Offset that reads back as price 0
+
+    @classmethod
+    def for_market(cls, root: str, symbol: str, market: Dict[str, Any], levels: int = 5) -> 'MarketDataRecorder':
+        """Build a recorder using the tick size from ccxt market precision"""
+        precision = market['precision']['price'] or 0
+        tick_size = 10 ** -precision if isinstance(precision, int) else float(precision)
+        return cls(root, symbol, tick_size, levels)
+
+    def directory(self, day: str) -> str:
+        safe_symbol = self.symbol.replace('/', '-').replace(':', '_')
+        return os.path.join(self.root, safe_symbol, day)
+
+    def _rotate(self, timestamp: float, price: float) -> None:
+        """Open the tables for the UTC day of ``timestamp``, based at ``price`` if they are new"""
+        day = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y%m%d')
+        self.close()
+        directory = self.directory(day)
+        base_tick = int(price * self.inverse_tick + 0.5)
+        meta = {'symbol': self.symbol, 'tick_size': self.tick_size, 'levels': self.levels, 'day': day,
+                'base_tick': base_tick}
+        price_type = price_dtype(base_tick)
+        self.books = ColumnTable(os.path.join(directory, 'books'), book_columns(self.levels, price_type), meta)
+        self.quotes = ColumnTable(os.path.join(directory, 'quotes'), quote_columns(price_type), meta)
+        self.fills = ColumnTable(os.path.join(directory, 'fills'), fill_columns(price_type), meta)
+        self._empty_prices = [-self.books.base_tick] * self.levels
+        self.day = day
+        self.day_end = (timestamp // 86400 + 1) * 86400
+        logger.info(f"Recording market data to {directory}")
+
+    def _ticks(self, levels: List[List[float]]) -> Tuple[List[int], List[float]]:
+        """Top-N prices as tick offsets from the day's base, and sizes, padded to read back as 0"""
+        inverse_tick = self.inverse_tick
+        base_tick = self.books.base_tick
+        levels = levels[:self.levels]
+        prices = [int(level[0] * inverse_tick + 0.5) - base_tick for level in levels]
+        sizes = [level[1] for level in levels]
+        if len(levels) < self.levels:
+            missing = self.levels - len(levels)
+            prices += self._empty_prices[:missing]
+            sizes += self._empty[:missing]
+        return prices, sizes
+
+    def record_book(self, timestamp: float, orderbook: Dict[str, Any]) -> None:
+        """Record the top-N levels of a book (timestamp in seconds)"""
+        if timestamp >= self.day_end:
+            top = orderbook['bids'] or orderbook['asks']
+            if not top:
+                return  # Nothing to base the day on yet
+            self._rotate(timestamp, top[0][0])
+        bid_prices, bid_sizes = self._ticks(orderbook['bids'])
+        ask_prices, ask_sizes = self._ticks(orderbook['asks'])
+        self.books.append(int(timestamp * 1000), bid_prices, bid_sizes, ask_prices, ask_sizes)
+
+    def record_quote(self, timestamp: float, bid_price: float, ask_price: float, size: float) -> None:
+        """Record the quotes the bot computed"""
+        if timestamp >= self.day_end:
+            self._rotate(timestamp, bid_price)
+        base_tick = self.quotes.base_tick
+        self.quotes.append(int(timestamp * 1000), round(bid_price / self.tick_size) - base_tick,
+                           round(ask_price / self.tick_size) - base_tick, size)
+
+    def record_fill(self, trade: Dict[str, Any]) -> None:
+        """Record one of our fills (a ccxt trade dict)"""
+        timestamp = (trade.get('timestamp') or time.time() * 1000) / 1000
+        if timestamp >= self.day_end:
+            self._rotate(timestamp, trade['price'])
+        fee = (trade.get('fee') or {}).get('cost') or 0
+        self.fills.append(int(timestamp * 1000), 1 if trade['side'] == 'buy' else -1,
+                          round(trade['price'] / self.tick_size) - self.fills.base_tick, trade['amount'], fee)
+
+    def close(self) -> None:
+        """Close the current day's tables"""
+        for table in (self.books, self.quotes, self.fills):
+            if table is not None:
+                table.close()
+        self.books = self.quotes = self.fills = None
+        self.day = None
+        self.day_end = 0.0
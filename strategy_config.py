@@ -0,0 +1,180 @@
+"""
+Strategy Config - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Immutable per-symbol strategy snapshots and a config file watcher for hot reloads
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Any
+
+from quote_kernel import QuoteConstants
+from order_book import FAIR_PRICES
+
+logger = logging.getLogger(__name__)
+
+# Settings a running bot picks up from a changed config; anything else needs a restart
+RELOADABLE = {
+    'strategy': ('gamma', 'k', 'min_spread', 'max_spread_percent', 'max_quote_distance_percent',
+                 'time_horizon', 'update_frequency'),
+    'trading': ('order_size_type', 'order_size', 'order_size_percent'),
+    'risk': ('max_inventory_usd',),
+    'quoting': ('tick_tolerance', 'bps_tolerance', 'size_tolerance', 'level_spacing', 'level_size_step'),
+    'market_data': ('stream_max_age', 'min_update_interval', 'fair_price', 'fair_price_levels'),
+}
+
+
+class StrategySnapshot:
+    """Validated strategy settings for one symbol, read by the quoting loop without dict lookups
+
+    Built once per config version with the kernel constants (including the
+    ``(2 / gamma) * ln(1 + gamma / k)`` term) precomputed, and never
+    modified afterwards: a reload builds a new snapshot and the bot swaps
+    the reference between ticks.
+    """
+
+    __slots__ = ('version', 'gamma', 'k', 'min_spread', 'max_spread', 'min_distance', 'time_horizon',
+                 'update_frequency', 'max_inventory_usd', 'percentage_sizing', 'order_size',
+                 'order_size_percent', 'tick_tolerance', 'bps_tolerance', 'size_tolerance',
+                 'level_spacing', 'level_size_step', 'stream_max_age', 'min_update_interval', 'fair_price',
+                 'fair_price_levels', 'constants')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"StrategySnapshot is immutable; build a new one to change {name}")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], market: Dict[str, Any], venue,
+                    version: int = 1) -> 'StrategySnapshot':
+        """Validate ``config`` and build the snapshot for one ccxt market; raises ValueError listing every problem"""
+        strategy = config['strategy']
+        trading = config['trading']
+        quoting = config.get('quoting', {})
+        market_data = config.get('market_data', {})
+        fields = {
+            'version': version,
+            'gamma': float(strategy['gamma']),
+            'k': float(strategy['k']),
+            'min_spread': float(strategy['min_spread']),
+            'max_spread': float(strategy['max_spread_percent']),
+            'min_distance': float(strategy['max_quote_distance_percent']),
+            'time_horizon': float(strategy['time_horizon']),
+            'update_frequency': float(strategy['update_frequency']),
+            'max_inventory_usd': float(config['risk']['max_inventory_usd']),
+            'percentage_sizing': trading['order_size_type'] != 'fixed',
+            'order_size': float(trading['order_size']),
+            'order_size_percent': float(trading['order_size_percent']),
+            'tick_tolerance': int(quoting.get('tick_tolerance', 0)),
+            'bps_tolerance': float(quoting.get('bps_tolerance', 0.0)),
+            'size_tolerance': float(quoting.get('size_tolerance', 0.0)),
+            'level_spacing': float(quoting.get('level_spacing', 1.0)),
+            'level_size_step': float(quoting.get('level_size_step', 1.0)),
+            'stream_max_age': float(market_data.get('stream_max_age', 5.0)),
+            'min_update_interval': float(market_data.get('min_update_interval', 0.2)),
+            'fair_price': market_data.get('fair_price', 'mid'),
+            'fair_price_levels': int(market_data.get('fair_price_levels', 5)),
+        }
+
+        problems = [f"{name} must be positive" for name in
+                    ('gamma', 'k', 'time_horizon', 'update_frequency', 'max_inventory_usd', 'level_spacing')
+                    if fields[name] <= 0]
+        if not 0 <= fields['min_spread'] <= fields['max_spread']:
+            problems.append("min_spread must be between 0 and max_spread_percent")
+        if fields['min_distance'] < 0:
+            problems.append("max_quote_distance_percent must not be negative")
+        if fields['fair_price'] not in FAIR_PRICES:
+            problems.append(f"fair_price must be one of {', '.join(FAIR_PRICES)}")
+        if fields['fair_price_levels'] < 1:
+            problems.append("fair_price_levels must be at least 1")
+        if trading['order_size_type'] not in ('fixed', 'percentage'):
+            problems.append("order_size_type must be 'fixed' or 'percentage'")
+        if (fields['order_size_percent'] if fields['percentage_sizing'] else fields['order_size']) <= 0:
+            problems.append("order size must be positive")
+        if problems:
+            raise ValueError('; '.join(problems))
+
+        fields['constants'] = QuoteConstants.from_config(config, market, venue)
+        return cls(**fields)
+
+    def changes(self, other: 'StrategySnapshot') -> str:
+        """The settings ``other`` changes, for logs"""
+        changed = [f"{name} {getattr(self, name)} -> {getattr(other, name)}" for name in self.__slots__
+                   if name not in ('version', 'constants') and getattr(self, name) != getattr(other, name)]
+        return ', '.join(changed) or 'no strategy changes'
+
+
+def restart_required(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Settings that differ between two configs but only take effect after a restart"""
+    changed = []
+    for section in sorted(set(old) | set(new)):
+        before, after = old.get(section), new.get(section)
+        if not isinstance(before, dict) or not isinstance(after, dict):
+            if before != after:
+                changed.append(section)
+            continue
+        for key in sorted(set(before) | set(after)):
+            if key != 'comment' and key not in RELOADABLE.get(section, ()) and before.get(key) != after.get(key):
+                changed.append(f"{section}.{key}")
+    return changed
+
+
+class ConfigWatcher:
+    """Polls a config file and hands every valid new version to ``on_change`` from a background thread"""
+
+    def __init__(self, path: str, on_change: Callable[[Dict[str, Any]], None], interval: float = 1.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.reloads = 0
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, path: Optional[str], config: Dict[str, Any],
+                    on_change: Callable[[Dict[str, Any]], None]) -> Optional['ConfigWatcher']:
+        """Watcher from the ``reload`` config section, or None when disabled or not loaded from a file"""
+        if not path or not config.get('enabled', False):
+            return None
+        return cls(path, on_change, config.get('interval', 1.0))
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.path} for strategy changes")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                continue
+            self._signature = signature
+            try:
+                with open(self.path, 'r') as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                # Editors may write in several steps; the next complete write changes the signature again
+                logger.warning(f"Could not read changed config {self.path}: {e}")
+                continue
+            self.reloads += 1
+            try:
+                self.on_change(config)
+            except Exception as e:
+                logger.error(f"Error applying config change: {e}")
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Supervisor - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Runs one bot process per exchange/symbol, restarts crashed workers and enforces firm-wide risk limits
+"""
+
+import argparse
+import copy
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import time
+from typing import Dict, List, Optional, Any
+
+from global_risk import RiskTable, GlobalRisk, DEFAULT_PATH
+from multi_symbol import MultiSymbolEngine, OVERRIDE_SECTIONS
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.2  # Seconds between checks of the workers and the risk totals
+STABLE_AFTER = 60.0  # A worker that ran at least this long restarts after the initial delay again
+
+
+def label_log(name: str) -> None:
+    """Put the process name in every log line, since all processes share the log file"""
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(logging.Formatter(f'%(asctime)s - {name} - %(levelname)s - %(message)s'))
+
+
+def run_worker(name: str, config: Dict[str, Any], cpu: Optional[int]) -> None:
+    """Worker process: pinned to ``cpu``, runs the bot (or multi-symbol engine) of ``config`` until stopped"""
+    from market_maker_bot import UniversalMarketMaker
+    from fast_logging import start_queued_logging
+
+    # Ctrl-C goes to the supervisor, which stops workers with SIGTERM; the first one unwinds the
+    # quoting loop like Ctrl-C would, later ones are ignored so they cannot cut the cleanup short
+    def interrupt(signum, frame):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, interrupt)
+
+    label_log(name)
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not pin {name} to CPU {cpu}: {e}")
+
+    bot = MultiSymbolEngine(config) if config.get('symbols') else UniversalMarketMaker(config=config)
+    listener = start_queued_logging() if config.get('logging', {}).get('mode') == 'queued' else None
+    try:
+        bot.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if listener is not None:
+            listener.stop()
+
+
+class Worker:
+    """One supervised bot process and its restart state"""
+
+    def __init__(self, name: str, config: Dict[str, Any], cpu: Optional[int]):
+        self.name = name
+        self.config = config
+        self.cpu = cpu
+        self.process: Optional[multiprocessing.Process] = None
+        self.started = 0.0
+        self.restarts = 0
+        self.delay = 0.0  # Current restart back-off
+        self.restart_at = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    @property
+    def risk_names(self) -> List[str]:
+        """Risk table rows of this worker's symbols"""
+        configs = MultiSymbolEngine.symbol_configs(self.config) if self.config.get('symbols') else [self.config]
+        return [GlobalRisk.name_for(config['exchange']['name'], config['trading']['symbol']) for config in configs]
+
+
+class Supervisor:
+    """Runs one bot process per exchange/symbol and keeps them running under one set of risk limits
+
+    Each worker is a separate interpreter (spawned, so a crash or a stuck
+    GIL in one never stalls another), pinned to its own core where the
+    platform allows. A worker that exits is restarted with exponential
+    back-off, and picks its risk row back up, so PnL and exposure carry
+    over. The supervisor creates the ``global_risk`` table before starting
+    the workers; they publish to it and check the firm-wide totals
+    themselves every tick, so a crossed limit stops all of them within one
+    of their own ticks without going through this process. The supervisor
+    checks the totals too (for workers that are down), stops restarting
+    once the table is halted and exits when every worker has stopped. A
+    halted table refuses a new supervisor until started with ``--reset``.
+    """
+
+    def __init__(self, config: Dict[str, Any], reset: bool = False):
+        settings = config.get('supervisor', {})
+        risk = config.get('global_risk', {})
+        self.config = config
+        self.path = risk.get('path') or DEFAULT_PATH
+        self.slots = risk.get('slots', 64)
+        self.max_inventory_usd = risk.get('max_inventory_usd', 0.0)
+        self.max_loss_usd = risk.get('max_loss_usd', 0.0)
+        self.restart_delay = settings.get('restart_delay', 1.0)
+        self.max_restart_delay = settings.get('max_restart_delay', 60.0)
+        self.stop_timeout = settings.get('stop_timeout', 30.0)
+        self.status_interval = settings.get('status_interval', 10.0)
+        self.reset = reset
+        self.workers = self.create_workers(config, settings.get('pin_cpus', True))
+        self.table: Optional[RiskTable] = None
+        self.running = False
+        self.halted: Optional[str] = None
+        self.halted_at = 0.0
+        self._context = multiprocessing.get_context('spawn')
+
+    @staticmethod
+    def worker_configs(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Expand ``supervisor.workers`` into one complete config per worker process
+
+        Entries are either a symbol string or a dict with an optional
+        ``config`` file to start from instead of this one, ``exchange``
+        overrides (another venue and its keys), a ``symbol`` or a ``symbols``
+        list (quoted by one multi-symbol engine), ``trading``/``strategy``/
+        ``risk``/``quoting``/``market_data`` overrides, and optionally a
+        ``name`` and a ``cpu`` to pin the worker to. Every worker joins this
+        config's ``global_risk`` table and gets its own metrics port.
+        """
+        risk = config.get('global_risk', {})
+        configs = []
+        for index, entry in enumerate(config['supervisor']['workers']):
+            if isinstance(entry, str):
+                entry = {'symbol': entry}
+            base = config
+            if 'config' in entry:
+                with open(entry['config'], 'r') as f:
+                    base = json.load(f)
+            worker_config = copy.deepcopy({k: v for k, v in base.items() if k != 'supervisor'})
+            for section in ('exchange',) + OVERRIDE_SECTIONS:
+                if section in entry:
+                    worker_config.setdefault(section, {}).update(entry[section])
+            if 'symbol' in entry:
+                worker_config['trading']['symbol'] = entry['symbol']
+                worker_config['symbols'] = []
+            if 'symbols' in entry:
+                worker_config['symbols'] = entry['symbols']
+            worker_config['global_risk'] = dict(risk, enabled=True, path=risk.get('path') or DEFAULT_PATH)
+            if worker_config.get('metrics', {}).get('port'):
+                worker_config['metrics']['port'] += index
+            worker_config['worker'] = {key: entry[key] for key in ('name', 'cpu') if key in entry}
+            configs.append(worker_config)
+        return configs
+
+    def create_workers(self, config: Dict[str, Any], pin_cpus: bool) -> List[Worker]:
+        """Name the workers and spread them over the cores this process may use"""
+        cpus = sorted(os.sched_getaffinity(0)) if pin_cpus and hasattr(os, 'sched_getaffinity') else []
+        workers = []
+        for index, worker_config in enumerate(self.worker_configs(config)):
+            options = worker_config.pop('worker')
+            exchange = worker_config['exchange']['name']
+            label = f"{len(worker_config['symbols'])}-symbols" if worker_config.get('symbols') \
+                else worker_config['trading']['symbol']
+            name = options.get('name') or re.sub(r'[^a-z0-9]+', '-', f"{exchange}-{label}".lower()).strip('-')
+            cpu = options.get('cpu', cpus[index % len(cpus)] if cpus else None)
+            workers.append(Worker(name, worker_config, cpu))
+
+        names = [name for worker in workers for name in worker.risk_names]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Quoted by more than one worker: {', '.join(duplicates)}")
+        return workers
+
+    # -- workers ----------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Create the risk table, register every worker's symbols and start the workers"""
+        if not self.reset and os.path.exists(self.path):
+            previous = RiskTable.open(self.path)
+            halted = previous.halted
+            previous.close()
+            if halted is not None:
+                raise RuntimeError(f"The risk table {self.path} was halted ({halted}); "
+                                   f"check the positions, then start with --reset")
+        self.table = RiskTable.create(self.path, self.slots, self.max_inventory_usd, self.max_loss_usd)
+        for worker in self.workers:
+            for name in worker.risk_names:
+                self.table.register(name)
+        logger.info(f"Risk table {self.path}: gross inventory limit ${self.max_inventory_usd:.0f}, "
+                    f"loss limit ${self.max_loss_usd:.0f} (0 = no limit)")
+        for worker in self.workers:
+            self.launch(worker)
+
+    def launch(self, worker: Worker) -> None:
+        """Start a worker's process"""
+        worker.process = self._context.Process(target=run_worker, args=(worker.name, worker.config, worker.cpu),
+                                               name=worker.name)
+        worker.process.start()
+        worker.started = time.time()
+        logger.info(f"Started {worker.name} (pid {worker.process.pid}"
+                    + (f", CPU {worker.cpu})" if worker.cpu is not None else ")"))
+
+    def supervise(self, worker: Worker, now: float) -> None:
+        """Schedule a restart for a worker that exited, and start it when it is due"""
+        if worker.alive:
+            return
+        if worker.process is not None:
+            ran = now - worker.started
+            logger.warning(f"{worker.name} (pid {worker.process.pid}) exited with code "
+                           f"{worker.process.exitcode} after {ran:.0f}s")
+            worker.process = None
+            if self.halted is not None:
+                return
+            if ran >= STABLE_AFTER or not worker.delay:
+                worker.delay = self.restart_delay
+            else:
+                worker.delay = min(worker.delay * 2, self.max_restart_delay)
+            worker.restart_at = now + worker.delay
+            logger.info(f"Restarting {worker.name} in {worker.delay:.0f}s")
+        elif self.halted is None and now >= worker.restart_at:
+            worker.restarts += 1
+            self.launch(worker)
+
+    def stop_workers(self) -> None:
+        """Ask every worker to cancel its quotes and exit, and kill those that do not in time"""
+        processes = [worker.process for worker in self.workers if worker.alive]
+        for process in processes:
+            process.terminate()
+        deadline = time.time() + self.stop_timeout
+        for process in processes:
+            process.join(max(deadline - time.time(), 0))
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop within {self.stop_timeout:.0f}s, killing it")
+                process.kill()
+                process.join()
+
+    # -- main loop --------------------------------------------------------------------
+
+    def run(self) -> None:
+        """Start the workers and supervise them until stopped or halted"""
+        logger.info(f"Starting supervisor for {len(self.workers)} workers")
+        self.start()
+        self.running = True
+        if hasattr(signal, 'SIGTERM'):
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        last_status = time.time()
+
+        while self.running:
+            try:
+                now = time.time()
+                if self.halted is None:
+                    self.halted = self.table.check(now)
+                    if self.halted is not None:
+                        self.halted_at = now
+                        logger.error(f"Global risk limit reached, stopping every worker: {self.halted}")
+                for worker in self.workers:
+                    self.supervise(worker, now)
+                if self.halted is not None and (not any(worker.alive for worker in self.workers)
+                                                or now - self.halted_at > self.stop_timeout):
+                    break
+
+                if now - last_status >= self.status_interval:
+                    self.display_status(now)
+                    last_status = now
+                time.sleep(POLL_INTERVAL)
+
+            except KeyboardInterrupt:
+                logger.info("Shutting down...")
+                break
+
+        # Cleanup
+        self.stop_workers()
+        self.display_status(time.time())
+        self.table.close()
+        logger.info("Supervisor stopped")
+
+    def display_status(self, now: float) -> None:
+        """Print the workers and the risk table, in a single write"""
+        gross, pnl = self.table.totals()
+        max_inventory, max_loss = self.table.limits
+        lines = [
+            f"\n{'='*100}",
+            f"Workers: {sum(worker.alive for worker in self.workers)}/{len(self.workers)} running | "
+            f"Gross inventory: ${gross:.2f} / ${max_inventory:.0f} | PnL: ${pnl:.2f} / -${max_loss:.0f}"
+            + (f" | HALTED: {self.halted}" if self.halted is not None else "")
+        ]
+        for worker in self.workers:
+            state = f"pid {worker.process.pid}" if worker.alive else "stopped"
+            lines.append(f"{worker.name:<32} {state:<12} Restarts: {worker.restarts}")
+        for row in self.table.rows():
+            updated = f"{now - row.updated:.1f}s ago" if row.updated else "never"
+            lines.append(f"  {row.name:<30} Inv: {row.inventory:<12.4f} Notional: ${row.notional:<12.2f} "
+                         f"PnL: ${row.pnl:<10.2f} Updated: {updated}")
+        print('\n'.join(lines))
+
+    def stop(self) -> None:
+        """Stop the supervisor and its workers"""
+        self.running = False
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Run one market maker process per exchange/symbol '
+                                                 'under firm-wide risk limits')
+    parser.add_argument('--config', default='config.json',
+                        help='Configuration with supervisor.workers and global_risk (default: config.json)')
+    parser.add_argument('--reset', action='store_true',
+                        help='Start over after a global risk halt (check the open positions first)')
+    args = parser.parse_args()
+
+    label_log('supervisor')
+    if not os.path.exists(args.config):
+        logger.error(f"Configuration file not found: {args.config}")
+        sys.exit(1)
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+    if not config.get('supervisor', {}).get('workers'):
+        logger.error("No workers listed under supervisor.workers")
+        sys.exit(1)
+
+    try:
+        supervisor = Supervisor(config, reset=args.reset)
+        supervisor.run()
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
+    if supervisor.halted is not None:
+        sys.exit(2)  # Not a crash: a process manager should not simply start it again
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Shared fixtures: a SimulatedExchange with the optional endpoints the quoting
+code can use (amend, batch create and cancel), call counting and failure injection
+"""
+
+import os
+import sys
+
+import ccxt
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import SimulatedExchange  # noqa: E402
+
+SYMBOL = 'BTC/USDT:USDT'
+
+
+class FullExchange(SimulatedExchange):
+    """SimulatedExchange that also amends and batches, and records every request"""
+
+    def __init__(self, amend: bool = True, batch: bool = True, **kwargs):
+        super().__init__(SYMBOL, tick_size=0.1, lot_size=0.001, latency=0.0, **kwargs)
+        self.has = {'cancelAllOrders': True, 'editOrder': amend, 'createOrders': batch, 'cancelOrders': batch}
+        self.calls = []
+        self.edit_error = None  # Raised by the next edit_order
+        self.cancel_error = None  # Raised by every cancel_order while set
+        self.cancel_rejects = set()  # IDs a batch cancel reports as rejected
+
+    def create_limit_order(self, symbol, side, amount, price, params=None):
+        self.calls.append('create_limit_order')
+        return super().create_limit_order(symbol, side, amount, price, params)
+
+    def cancel_order(self, order_id, symbol=None, params=None):
+        self.calls.append('cancel_order')
+        if self.cancel_error is not None:
+            raise self.cancel_error
+        return super().cancel_order(order_id, symbol, params)
+
+    def edit_order(self, order_id, symbol, type, side, amount=None, price=None, params=None):
+        self.calls.append('edit_order')
+        error, self.edit_error = self.edit_error, None
+        if error is not None:
+            raise error
+        if order_id not in self.orders:
+            raise ccxt.OrderNotFound(f"Order {order_id} not found")
+        self.orders[order_id].update(price=price, amount=amount)
+        return dict(self.orders[order_id])
+
+    def create_orders(self, orders, params=None):
+        self.calls.append('create_orders')
+        return [SimulatedExchange.create_limit_order(self, order['symbol'], order['side'], order['amount'],
+                                                     order['price'], order.get('params'))
+                for order in orders]
+
+    def cancel_orders(self, order_ids, symbol=None, params=None):
+        self.calls.append('cancel_orders')
+        results = []
+        for order_id in order_ids:
+            if order_id in self.cancel_rejects:
+                results.append({'id': order_id, 'status': 'rejected', 'info': {'sMsg': 'order busy'}})
+            else:
+                results.append(SimulatedExchange.cancel_order(self, order_id, symbol))
+        return results
+
+    def cancel_all_orders(self, symbol=None, params=None):
+        self.calls.append('cancel_all_orders')
+        return [SimulatedExchange.cancel_order(self, order_id, symbol) for order_id in list(self.orders)]
+
+    def settle(self) -> None:
+        """Apply pending cancels"""
+        self.on_book(self.now, 99.0, 1.0, 101.0, 1.0)
+
+
+@pytest.fixture
+def exchange():
+    return FullExchange()
+
+
+@pytest.fixture
+def plain_exchange():
+    """No amend and no batch endpoints"""
+    return FullExchange(amend=False, batch=False)
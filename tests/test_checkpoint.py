@@ -0,0 +1,130 @@
+"""StateCheckpoint: round trips, torn-slot recovery and the checks that start a bot cold"""
+
+import pytest
+
+from checkpoint import HEADER, StateCheckpoint, WarmState
+from volatility import VolatilityEstimator
+
+SYMBOL = 'BTC/USDT:USDT'
+
+
+def make_checkpoint(tmp_path, capacity=8, mode='window', **kwargs):
+    return StateCheckpoint(str(tmp_path / 'bybit-BTC-USDT-USDT.state'), SYMBOL, capacity, mode, **kwargs)
+
+
+def warm_state(saved, inventory=0.5, prices=(100.0, 100.5, 101.0)):
+    estimator = VolatilityEstimator(lookback=8)
+    for index, price in enumerate(prices):
+        estimator.push(price, timestamp=saved - len(prices) + index)
+    return WarmState(saved, inventory, pnl=12.5, trades_count=7, horizon_start=None, fill_cursor=1700000000123,
+                     volatility=estimator.volatility, estimator=estimator.state(), prices=list(prices))
+
+
+def write(tmp_path, *states, **kwargs):
+    checkpoint = make_checkpoint(tmp_path, **kwargs)
+    checkpoint.open()
+    for state in states:
+        checkpoint.save(state)
+    checkpoint.close()
+    return checkpoint
+
+
+def test_round_trip_restores_every_field(tmp_path):
+    state = warm_state(1000.0)
+    state.horizon_start = 950.0
+    write(tmp_path, state)
+
+    loaded = make_checkpoint(tmp_path).load(now=1001.0)
+
+    assert (loaded.saved, loaded.inventory, loaded.pnl, loaded.trades_count) == (1000.0, 0.5, 12.5, 7)
+    assert loaded.horizon_start == 950.0 and loaded.fill_cursor == 1700000000123
+    assert loaded.prices == [100.0, 100.5, 101.0]
+    assert loaded.estimator == state.estimator
+
+
+def test_restored_estimator_continues_like_the_original(tmp_path):
+    state = warm_state(1000.0, prices=(100.0, 100.4, 99.8, 100.9, 101.2))
+    write(tmp_path, state)
+    original = VolatilityEstimator(lookback=8)
+    original.restore(*state.estimator)
+
+    resumed = VolatilityEstimator(lookback=8)
+    resumed.restore(*make_checkpoint(tmp_path).load(now=1000.0).estimator)
+
+    assert resumed.push(101.5, timestamp=1001.0) == original.push(101.5, timestamp=1001.0)
+
+
+def test_newest_of_the_two_slots_wins(tmp_path):
+    write(tmp_path, warm_state(1000.0, inventory=1.0), warm_state(1001.0, inventory=2.0),
+          warm_state(1002.0, inventory=3.0))
+
+    assert make_checkpoint(tmp_path).load(now=1002.0).inventory == 3.0
+
+
+def test_torn_slot_falls_back_to_the_previous_snapshot(tmp_path):
+    checkpoint = write(tmp_path, warm_state(1000.0, inventory=1.0), warm_state(1001.0, inventory=2.0))
+
+    # Sequence 2 went to the first slot: damage its payload as a crash mid-write would
+    path = tmp_path / 'bybit-BTC-USDT-USDT.state'
+    data = bytearray(path.read_bytes())
+    data[HEADER.size + 20:HEADER.size + 28] = b'\xff' * 8
+    path.write_bytes(bytes(data))
+
+    loaded = make_checkpoint(tmp_path).load(now=1001.0)
+    assert loaded.inventory == 1.0 and loaded.saved == 1000.0
+
+    # Both slots damaged: start cold
+    data[HEADER.size + checkpoint.slot_size + 20:HEADER.size + checkpoint.slot_size + 28] = b'\xff' * 8
+    path.write_bytes(bytes(data))
+    assert make_checkpoint(tmp_path).load(now=1001.0) is None
+
+
+def test_saving_after_a_load_continues_the_sequence(tmp_path):
+    write(tmp_path, warm_state(1000.0, inventory=1.0), warm_state(1001.0, inventory=2.0))
+
+    checkpoint = make_checkpoint(tmp_path)
+    assert checkpoint.load(now=1001.0).inventory == 2.0
+    checkpoint.open()
+    checkpoint.save(warm_state(1002.0, inventory=3.0))
+    checkpoint.close()
+
+    assert make_checkpoint(tmp_path).load(now=1002.0).inventory == 3.0
+
+
+def test_stale_checkpoints_are_ignored(tmp_path):
+    write(tmp_path, warm_state(1000.0))
+
+    assert make_checkpoint(tmp_path, max_age=60.0).load(now=1061.0) is None
+    assert make_checkpoint(tmp_path, max_age=60.0).load(now=1059.0) is not None
+
+
+def test_changed_volatility_settings_restore_prices_but_not_the_estimator(tmp_path):
+    write(tmp_path, warm_state(1000.0))
+
+    for checkpoint in (make_checkpoint(tmp_path, mode='ewma'), make_checkpoint(tmp_path, capacity=16)):
+        loaded = checkpoint.load(now=1000.0)
+        assert loaded.estimator is None
+        assert loaded.prices == [100.0, 100.5, 101.0] and loaded.inventory == 0.5
+
+
+def test_checkpoints_of_another_symbol_or_format_are_ignored(tmp_path):
+    write(tmp_path, warm_state(1000.0))
+    other = StateCheckpoint(str(tmp_path / 'bybit-BTC-USDT-USDT.state'), 'ETH/USDT:USDT', 8, 'window')
+    assert other.load(now=1000.0) is None
+
+    path = tmp_path / 'bybit-BTC-USDT-USDT.state'
+    path.write_bytes(b'JUNK' + path.read_bytes()[4:])
+    assert make_checkpoint(tmp_path).load(now=1000.0) is None
+
+
+def test_missing_file_and_disabled_config(tmp_path):
+    assert make_checkpoint(tmp_path).load() is None
+    assert StateCheckpoint.from_config({'enabled': False}, 'bybit', SYMBOL, 8, 'window') is None
+
+
+@pytest.mark.parametrize('keep', [3, 8])
+def test_prices_beyond_the_capacity_keep_the_newest(tmp_path, keep):
+    prices = [100.0 + index for index in range(12)]
+    write(tmp_path, warm_state(1000.0, prices=prices), capacity=keep)
+
+    assert make_checkpoint(tmp_path, capacity=keep).load(now=1000.0).prices == prices[-keep:]
@@ -0,0 +1,127 @@
+"""FillLedger: cursor paging, de-duplication and position reconciliation"""
+
+from conftest import SYMBOL
+from fill_ledger import FillLedger
+
+
+class TradeFeed:
+    """fetch_my_trades over a fixed trade list, oldest first from ``since`` (inclusive), ``limit`` per page"""
+
+    def __init__(self, trades=None, positions=None):
+        self.trades = list(trades or [])
+        self.positions = positions or []
+        self.has = {'fetchPositions': True}
+        self.requests = []
+
+    def fetch_my_trades(self, symbol, since=None, limit=None):
+        self.requests.append(since)
+        trades = [trade for trade in self.trades if since is None or trade['timestamp'] >= since]
+        return [dict(trade) for trade in trades[:limit]]
+
+    def fetch_positions(self, symbols=None):
+        return self.positions
+
+
+def trade(trade_id, timestamp, side='buy', amount=1.0):
+    return {'id': str(trade_id), 'timestamp': timestamp, 'side': side, 'amount': amount, 'price': 100.0,
+            'fee': {'cost': 0.01}}
+
+
+def make_ledger(exchange, **kwargs):
+    ledger = FillLedger(exchange, SYMBOL, poll_interval=0.0, **kwargs)
+    ledger.since = 0
+    return ledger
+
+
+def test_pages_forward_until_a_short_page():
+    exchange = TradeFeed([trade(i, 1000 + i) for i in range(25)])
+    ledger = make_ledger(exchange, limit=10)
+
+    fills = ledger.poll()
+
+    assert [fill['id'] for fill in fills] == [str(i) for i in range(25)]
+    # Each page starts at the last timestamp of the one before; the overlap is dropped by ID
+    assert exchange.requests == [0, 1009, 1018]
+    assert ledger.duplicates == 2
+    assert ledger.position == 25.0 and ledger.since == 1024
+
+
+def test_polls_resume_from_the_cursor_without_recounting():
+    exchange = TradeFeed([trade(1, 1000), trade(2, 2000, side='sell', amount=0.5)])
+    ledger = make_ledger(exchange)
+    assert len(ledger.poll()) == 2
+
+    exchange.trades.append(trade(3, 3000))
+    fills = ledger.poll()
+
+    assert [fill['id'] for fill in fills] == ['3']
+    assert exchange.requests[-1] == 2000
+    assert ledger.fills == 3 and ledger.position == 1.5
+    assert ledger.fees == 0.03
+
+
+def test_same_timestamp_fills_are_all_counted():
+    exchange = TradeFeed([trade(i, 5000) for i in range(4)])
+    ledger = make_ledger(exchange, limit=10)
+
+    assert len(ledger.poll()) == 4
+    assert ledger.poll() == []
+    assert ledger.fills == 4
+
+
+def test_a_full_page_at_one_timestamp_stops_paging():
+    exchange = TradeFeed([trade(i, 5000) for i in range(12)])
+    ledger = make_ledger(exchange, limit=10, max_pages=5)
+
+    assert len(ledger.poll()) == 10
+    assert exchange.requests == [0, 5000]
+
+
+def test_streamed_fills_are_not_counted_again_by_the_backfill():
+    exchange = TradeFeed([trade(1, 1000), trade(2, 2000)])
+    ledger = make_ledger(exchange)
+    ledger._queue.extend([trade(2, 2000)])
+
+    fills = ledger.poll()
+
+    assert [fill['id'] for fill in fills] == ['1', '2']
+    assert ledger.duplicates == 1
+
+
+def test_fills_without_ids_are_keyed_by_their_fields():
+    exchange = TradeFeed()
+    ledger = make_ledger(exchange)
+    anonymous = dict(trade(None, 1000), id=None, order='abc')
+    ledger._queue.extend([anonymous, dict(anonymous)])
+
+    assert len(ledger.poll()) == 1
+
+
+def test_stream_connection_hook_starts_the_backfill():
+    ledger = make_ledger(TradeFeed())
+    ledger.backfill = False
+    seen = []
+
+    ledger._on_connected(lambda client, message=None: seen.append(client))('client')
+
+    assert seen == ['client']
+    assert ledger.stream_connected and ledger.backfill
+
+
+def test_reconcile_reports_contracts_signed_by_side():
+    exchange = TradeFeed(positions=[
+        {'symbol': SYMBOL, 'contracts': 3.0, 'contractSize': 0.01, 'side': 'short'},
+        {'symbol': 'ETH/USDT:USDT', 'contracts': 7.0, 'contractSize': 1.0, 'side': 'long'},
+    ])
+    ledger = make_ledger(exchange)
+
+    assert ledger.reconcile(force=True) == -3.0
+
+
+def test_inventory_is_only_replaced_after_a_second_mismatch():
+    exchange = TradeFeed(positions=[{'symbol': SYMBOL, 'contracts': 2.0, 'side': 'long'}])
+    ledger = make_ledger(exchange, reconcile_interval=0.0)
+
+    assert ledger.check_inventory(2.0, 1e-9) is None
+    assert ledger.check_inventory(1.0, 1e-9) is None and ledger.mismatch
+    assert ledger.check_inventory(1.0, 1e-9) == 2.0 and not ledger.mismatch
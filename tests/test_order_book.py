@@ -0,0 +1,119 @@
+"""L2Book: snapshots, deltas, sequence gaps and fair price queries against a rebuilt reference book"""
+
+import random
+
+import pytest
+
+from order_book import L2Book, microprice
+
+BIDS = [[100.0, 1.0], [99.9, 2.0], [99.8, 3.0]]
+ASKS = [[100.1, 0.5], [100.2, 1.5], [100.3, 2.5]]
+
+
+def make_book(sequence=10):
+    book = L2Book()
+    book.apply_snapshot([list(level) for level in BIDS], [list(level) for level in ASKS], sequence)
+    return book
+
+
+def test_snapshot_sorts_both_sides_best_first():
+    book = L2Book()
+    book.apply_snapshot([[99.8, 3.0], [100.0, 1.0], [99.9, 2.0], [99.7, 0.0]],
+                        [[100.3, 2.5], [100.1, 0.5], [100.2, 1.5]])
+
+    assert book.ready and book.synced
+    assert book.as_dict() == {'bids': BIDS, 'asks': ASKS}  # Zero-size levels are dropped
+    assert (book.best_bid, book.best_ask) == (100.0, 100.1)
+
+
+def test_delta_changes_adds_and_removes_levels():
+    book = make_book()
+
+    assert book.apply_delta([[100.0, 0.0], [99.95, 4.0]], [[100.1, 0.7], [100.05, 0.2]], 11)
+
+    assert book.as_dict(3) == {'bids': [[99.95, 4.0], [99.9, 2.0], [99.8, 3.0]],
+                               'asks': [[100.05, 0.2], [100.1, 0.7], [100.2, 1.5]]}
+    assert book.sequence == 11
+
+
+def test_removing_a_missing_level_is_harmless():
+    book = make_book()
+
+    assert book.apply_delta([[98.0, 0.0]], [], 11)
+    assert book.as_dict() == {'bids': BIDS, 'asks': ASKS}
+
+
+def test_deltas_already_in_the_snapshot_are_skipped():
+    book = make_book(sequence=10)
+
+    assert book.apply_delta([[100.0, 9.0]], [], 10)
+    assert book.apply_delta([[100.0, 9.0]], [], 7)
+    assert book.as_dict()['bids'][0] == [100.0, 1.0]
+
+
+def test_a_sequence_gap_refuses_deltas_until_the_next_snapshot():
+    book = make_book(sequence=10)
+
+    assert not book.apply_delta([[100.0, 9.0]], [], 12)
+    assert not book.synced
+    assert not book.apply_delta([[100.0, 9.0]], [], 13)
+    assert book.as_dict()['bids'][0] == [100.0, 1.0]
+
+    book.apply_snapshot([[100.0, 5.0]], [[100.1, 5.0]], 20)
+    assert book.apply_delta([[100.0, 6.0]], [], 21)
+    assert book.as_dict()['bids'] == [[100.0, 6.0]]
+
+
+def test_unsequenced_feeds_apply_every_delta():
+    book = L2Book()
+    assert not book.apply_delta([[100.0, 1.0]], [])  # Nothing to apply it to before a snapshot
+
+    book.apply_snapshot(BIDS, ASKS)
+    assert book.apply_delta([[100.0, 9.0]], [])
+    assert book.apply_delta([[100.0, 8.0]], [])
+    assert book.as_dict()['bids'][0] == [100.0, 8.0]
+
+
+def test_random_deltas_match_a_rebuilt_book():
+    rng = random.Random(5)
+    book = make_book(sequence=0)
+    reference = {'bids': {price: size for price, size in BIDS}, 'asks': {price: size for price, size in ASKS}}
+
+    for sequence in range(1, 2000):
+        changes = {'bids': [], 'asks': []}
+        for side, base, step in (('bids', 100.0, -0.1), ('asks', 100.1, 0.1)):
+            for _ in range(rng.randint(1, 3)):
+                price = round(base + step * rng.randint(0, 20), 1)
+                size = 0.0 if rng.random() < 0.3 else round(rng.uniform(0.1, 5.0), 3)
+                changes[side].append([price, size])
+                if size:
+                    reference[side][price] = size
+                else:
+                    reference[side].pop(price, None)
+        assert book.apply_delta(changes['bids'], changes['asks'], sequence)
+
+    expected = {
+        'bids': [[price, reference['bids'][price]] for price in sorted(reference['bids'], reverse=True)],
+        'asks': [[price, reference['asks'][price]] for price in sorted(reference['asks'])],
+    }
+    assert book.as_dict(100) == expected
+
+
+def test_fair_prices_and_depth_queries():
+    book = make_book()
+
+    assert book.mid() == pytest.approx(100.05)
+    assert book.microprice() == pytest.approx(microprice(100.0, 1.0, 100.1, 0.5))
+    assert book.weighted_mid(2) == pytest.approx(((100.0 + 99.9 * 2) / 3 + (100.1 * 0.5 + 100.2 * 1.5) / 2) / 2)
+    assert book.imbalance(3) == pytest.approx((6.0 - 4.5) / 10.5)
+    assert book.cumulative_size('bids', 99.9) == 3.0
+    assert book.cumulative_size('asks', 100.2) == 2.0
+    assert book.top() == (100.0, 100.1, pytest.approx(100.05))
+
+
+def test_weighted_fair_price_never_crosses_the_spread():
+    book = L2Book()
+    book.apply_snapshot([[100.0, 0.1], [90.0, 100.0]], [[100.1, 0.1], [100.2, 0.1]])
+
+    assert book.weighted_mid(2) < book.best_bid
+    assert book.fair_price('weighted_mid', 2) == book.best_bid
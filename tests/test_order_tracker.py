@@ -0,0 +1,148 @@
+"""OrderTracker: state transitions from order entry, fills, cancels and stream updates"""
+
+import ccxt
+
+from conftest import SYMBOL
+from order_tracker import DONE, OPEN, PARTIALLY_FILLED, PENDING_CANCEL, PENDING_NEW, OrderTracker
+from quote_manager import QuoteManager
+from venues import Venue
+
+
+def make_tracker(exchange, **kwargs):
+    venue = Venue('test')
+    venue.resolve(exchange)
+    return OrderTracker(exchange, SYMBOL, venue=venue, **kwargs)
+
+
+def place(tracker, exchange, side='buy', price=99.5, amount=1.0):
+    client_id = tracker.new_client_id()
+    order = tracker.on_submit(client_id, side, price, amount)
+    assert order.state == PENDING_NEW
+    tracker.on_ack(order, exchange.create_limit_order(SYMBOL, side, amount, price))
+    return order
+
+
+def test_ack_opens_and_fills_complete_the_order(exchange):
+    tracker = make_tracker(exchange)
+    order = place(tracker, exchange)
+    assert order.state == OPEN and tracker.is_resting(order.id)
+
+    tracker.on_fill({'order': order.id, 'amount': 0.4})
+    assert order.state == PARTIALLY_FILLED and order.remaining == 0.6
+
+    tracker.on_fill({'order': order.id, 'amount': 0.6})
+    assert order.state == DONE and not tracker.is_resting(order.id)
+
+
+def test_fills_and_order_updates_for_the_same_execution_are_not_added(exchange):
+    tracker = make_tracker(exchange)
+    order = place(tracker, exchange)
+
+    tracker.on_fill({'order': order.id, 'amount': 0.4})
+    tracker.on_update({'id': order.id, 'filled': 0.4, 'status': 'open'})
+
+    assert order.filled == 0.4 and order.state == PARTIALLY_FILLED
+
+
+def test_failed_cancel_restores_the_previous_state(exchange):
+    tracker = make_tracker(exchange)
+    order = place(tracker, exchange)
+    tracker.on_fill({'order': order.id, 'amount': 0.5})
+
+    tracker.on_cancel_submit(order.id)
+    assert order.state == PENDING_CANCEL and tracker.is_resting(order.id)
+
+    tracker.on_cancel_result(order.id, ccxt.NetworkError('timeout'), gone=False)
+    assert order.state == PARTIALLY_FILLED
+
+    tracker.on_cancel_submit(order.id)
+    tracker.on_cancel_result(order.id)
+    assert order.state == DONE
+
+
+def test_cancel_of_an_order_that_is_already_gone_finishes_it(exchange):
+    tracker = make_tracker(exchange)
+    order = place(tracker, exchange)
+
+    tracker.on_cancel_submit(order.id)
+    tracker.on_cancel_result(order.id, ccxt.OrderNotFound('unknown order'), gone=True)
+
+    assert order.state == DONE
+
+
+def test_stream_updates_match_by_client_id_before_the_ack(exchange):
+    tracker = make_tracker(exchange)
+    client_id = tracker.new_client_id()
+    order = tracker.on_submit(client_id, 'sell', 100.5, 1.0)
+
+    tracker.on_update({'id': '42', 'clientOrderId': client_id, 'filled': 0.0, 'status': 'open'})
+    assert order.id == '42' and order.state == OPEN
+
+    tracker.on_update({'id': '42', 'filled': 1.0, 'status': 'closed'})
+    assert order.state == DONE
+
+
+def test_rejected_order_is_done_and_cancel_all_spares_pending_new(exchange):
+    tracker = make_tracker(exchange)
+    resting = place(tracker, exchange)
+    rejected = tracker.on_submit(tracker.new_client_id(), 'sell', 100.5, 1.0)
+    in_flight = tracker.on_submit(tracker.new_client_id(), 'sell', 100.6, 1.0)
+
+    tracker.on_reject(rejected)
+    tracker.on_cancel_all()
+
+    assert rejected.state == DONE and resting.state == DONE
+    assert in_flight.state == PENDING_NEW
+
+
+def test_start_adopts_orders_of_an_earlier_run_without_cancelling(exchange):
+    tracker = make_tracker(exchange)
+    assert tracker.resting_ids() is None  # Unknown until loaded
+
+    earlier = exchange.create_limit_order(SYMBOL, 'buy', 1.0, 99.0)
+    exchange.calls.clear()
+    tracker.start()
+
+    assert tracker.resting_ids() == [earlier['id']]
+    assert exchange.calls == []  # The bot's cancel-all removes it, in one pass
+
+
+def test_resting_ids_are_unknown_while_an_order_is_pending_new(exchange):
+    tracker = make_tracker(exchange)
+    tracker.start()
+    resting = place(tracker, exchange)
+
+    # Without a client ID the sent order is not even in the lookup tables yet
+    pending = tracker.on_submit(None, 'sell', 100.5, 1.0)
+    assert tracker.resting_ids() is None
+
+    tracker.on_ack(pending, exchange.create_limit_order(SYMBOL, 'sell', 1.0, 100.5))
+    assert sorted(tracker.resting_ids()) == sorted([resting.id, pending.id])
+
+    rejected = tracker.on_submit(tracker.new_client_id(), 'sell', 101.0, 1.0)
+    tracker.on_reject(rejected)
+    assert sorted(tracker.resting_ids()) == sorted([resting.id, pending.id])
+
+
+def test_finished_orders_are_forgotten_beyond_remember(exchange):
+    tracker = make_tracker(exchange, remember=2)
+    orders = [place(tracker, exchange) for _ in range(3)]
+    for order in orders:
+        tracker.on_cancel_submit(order.id)
+        tracker.on_cancel_result(order.id)
+
+    assert tracker.get(orders[0].id) is None
+    assert tracker.get(orders[2].id) is orders[2]
+
+
+def test_quote_manager_replaces_a_partly_filled_order_instead_of_amending(exchange):
+    tracker = make_tracker(exchange)
+    manager = QuoteManager(exchange, SYMBOL, reconcile_interval=3600.0, tracker=tracker)
+    orders = manager.update({'bid': None, 'ask': None}, 99.5, 100.5, 1.0)
+    tracker.on_fill({'order': orders['bid']['id'], 'amount': 0.3})
+    exchange.calls.clear()
+
+    orders = manager.update(orders, 99.0, 100.5, 1.0)
+
+    assert sorted(exchange.calls) == ['cancel_order', 'create_limit_order']
+    assert tracker.get(orders['bid']['id']).state == OPEN
@@ -0,0 +1,89 @@
+"""quote_kernel matches the scalar quote and size math the bots used before it, element for element"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from quote_kernel import QuoteConstants, inverse_step, order_sizes, quote_prices
+
+
+def legacy_quote_prices(mid, inventory, sigma, time_remaining, gamma, k, min_spread, max_spread,
+                        min_distance, precision):
+    """calculate_reservation_price, calculate_optimal_spread and calculate_quote_prices as they were"""
+    reservation = mid - inventory * gamma * sigma ** 2 * time_remaining
+    spread = gamma * sigma ** 2 * time_remaining + (2 / gamma) * math.log(1 + gamma / k)
+    spread = min(max(spread, min_spread) * mid, mid * max_spread)
+    bid = min(reservation - spread / 2, mid * (1 - min_distance))
+    ask = max(reservation + spread / 2, mid * (1 + min_distance))
+    if isinstance(precision, int):
+        return round(bid, precision), round(ask, precision)
+    return round(bid / precision) * precision, round(ask / precision) * precision
+
+
+def legacy_position_size(price, inventory, base_size, max_inventory, min_size, precision, hyperliquid):
+    """calculate_position_size as it was"""
+    inventory_value = abs(inventory * price)
+    multiplier = 0.5 if inventory_value > max_inventory * 0.7 else 0.75 if inventory_value > max_inventory * 0.5 else 1.0
+    size = max(base_size * multiplier, 0.001)
+    if isinstance(precision, int):
+        size = round(size, precision)
+    else:
+        size = round(size / precision) * precision
+    size = max(size, min_size, 0.001)
+    if hyperliquid:
+        size = round(max(size, 11.0 / price), 4)
+        if size * price < 10.0:
+            size = round(11.0 / price, 4)
+    return size
+
+
+def constants(price_precision, amount_precision, hyperliquid=False, **strategy):
+    return QuoteConstants(
+        gamma=strategy.get('gamma', 0.1), k=strategy.get('k', 1.5), min_spread=0.0001,
+        max_spread=strategy.get('max_spread', 0.01), min_distance=strategy.get('min_distance', 0.0002),
+        inverse_tick=inverse_step(price_precision), inverse_lot=inverse_step(amount_precision),
+        max_inventory=200.0, min_amount=0.01, min_order=0.001,
+        min_notional=10.0 if hyperliquid else 0.0, notional_target=11.0 if hyperliquid else 0.0
+    )
+
+
+@pytest.mark.parametrize('precision', [2, 0.01, 0.5])
+def test_quote_prices_match_the_legacy_math(precision):
+    rng = random.Random(1)
+    for _ in range(500):
+        gamma, k = rng.uniform(0.01, 1.0), rng.uniform(0.5, 5.0)
+        max_spread = rng.uniform(0.001, 0.05)
+        c = constants(precision, 3, gamma=gamma, k=k, max_spread=max_spread)
+        mid, inventory = rng.uniform(10, 50000), rng.uniform(-5, 5)
+        sigma, remaining = rng.uniform(0, 0.05), rng.uniform(0.01, 0.1)
+
+        expected = legacy_quote_prices(mid, inventory, sigma, remaining, gamma, k, 0.0001, max_spread,
+                                       0.0002, precision)
+        assert quote_prices(mid, inventory, sigma, remaining, c) == pytest.approx(expected, abs=1e-9)
+
+
+@pytest.mark.parametrize('precision, hyperliquid', [(3, False), (0.001, False), (0.1, False), (2, True)])
+def test_order_sizes_match_the_legacy_math(precision, hyperliquid):
+    rng = random.Random(2)
+    c = constants(2, precision, hyperliquid=hyperliquid)
+    for _ in range(500):
+        price, inventory, base = rng.uniform(1, 500), rng.uniform(-3, 3), rng.uniform(0, 2)
+        expected = legacy_position_size(price, inventory, base, 200.0, 0.01, precision, hyperliquid)
+        assert order_sizes(price, inventory, base, c) == pytest.approx(expected, abs=1e-9)
+
+
+def test_array_inputs_match_scalar_calls():
+    rng = np.random.default_rng(3)
+    gamma = rng.uniform(0.01, 1.0, 64)
+    c = constants(0.01, 0.001, gamma=gamma, k=1.5)
+    mid, inventory, sigma, remaining = 2500.0, 1.5, 0.02, 0.05
+
+    bids, asks = quote_prices(mid, inventory, sigma, remaining, c)
+    sizes = order_sizes(np.full(64, mid), np.linspace(-0.1, 0.1, 64), 0.05, c)
+    for i in range(64):
+        single = constants(0.01, 0.001, gamma=float(gamma[i]), k=1.5)
+        assert (bids[i], asks[i]) == pytest.approx(quote_prices(mid, inventory, sigma, remaining, single))
+        assert sizes[i] == pytest.approx(order_sizes(mid, float(np.linspace(-0.1, 0.1, 64)[i]), 0.05, single))
+
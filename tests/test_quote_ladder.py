@@ -0,0 +1,87 @@
+"""QuoteLadder: batched creates and cancels, kept levels and per-order batch cancel failures"""
+
+import pytest
+
+from conftest import SYMBOL
+from quote_kernel import QuoteConstants, ladder_quotes
+from quote_manager import QuoteLadder
+
+CONSTANTS = QuoteConstants(gamma=0.1, k=1.5, min_spread=0.0001, max_spread=0.01, min_distance=0.0002,
+                           inverse_tick=10.0, inverse_lot=1000.0, max_inventory=200.0, min_order=0.001)
+
+
+def make_ladder(exchange, levels=3, batch_size=10):
+    return QuoteLadder(exchange, SYMBOL, CONSTANTS, levels=levels, spacing=1.0, batch_size=batch_size,
+                       tick_tolerance=0, size_tolerance=0.1, reconcile_interval=3600.0)
+
+
+def test_levels_start_at_the_quotes_and_step_outwards():
+    bids, asks = ladder_quotes(99.5, 100.5, 0.01, 3, 1.0, 2.0, CONSTANTS)
+
+    assert bids[0] == (99.5, 0.01) and asks[0] == (100.5, 0.01)
+    assert [price for price, _ in bids] == pytest.approx([99.5, 99.0, 98.5])
+    assert [price for price, _ in asks] == pytest.approx([100.5, 101.0, 101.5])
+    assert [size for _, size in asks] == pytest.approx([0.01, 0.02, 0.04])
+
+
+def test_full_ladder_is_placed_in_batches(exchange):
+    ladder = make_ladder(exchange, levels=3, batch_size=4)
+    orders = ladder.update({'bid': None, 'ask': None}, 99.5, 100.5, 0.01)
+
+    assert exchange.calls == ['create_orders', 'create_orders']  # 6 orders, 4 per request
+    assert [order['price'] for order in orders['bid']] == pytest.approx([99.5, 99.0, 98.5])
+    assert [order['price'] for order in orders['ask']] == pytest.approx([100.5, 101.0, 101.5])
+
+
+def test_unchanged_ladder_sends_nothing(exchange):
+    ladder = make_ladder(exchange)
+    orders = ladder.update({'bid': None, 'ask': None}, 99.5, 100.5, 0.01)
+    exchange.calls.clear()
+
+    ladder.update(orders, 99.5, 100.5, 0.01)
+
+    assert exchange.calls == []
+    assert ladder.stats['kept'] == 6
+
+
+def test_shifted_ladder_keeps_overlapping_levels(exchange):
+    ladder = make_ladder(exchange)
+    orders = ladder.update({'bid': None, 'ask': None}, 99.5, 100.5, 0.01)
+    outer_bids = {order['id'] for order in orders['bid'][1:]}
+    exchange.calls.clear()
+
+    # Half a spread lower: 99.0 and 98.5 stay, 98.0 is new and 99.5 goes
+    orders = ladder.update(orders, 99.0, 100.0, 0.01)
+
+    assert exchange.calls == ['cancel_orders', 'create_orders']
+    assert outer_bids <= {order['id'] for order in orders['bid']}
+    assert [order['price'] for order in orders['bid']] == pytest.approx([99.0, 98.5, 98.0])
+
+
+def test_rejected_batch_cancel_is_retried(exchange):
+    ladder = make_ladder(exchange, levels=1)
+    orders = ladder.update({'bid': None, 'ask': None}, 99.5, 100.5, 0.01)
+    stuck = orders['bid'][0]['id']
+    exchange.cancel_rejects.add(stuck)
+
+    orders = ladder.update(orders, 99.0, 100.5, 0.01)
+    assert [order['id'] for order in ladder.orphans] == [stuck]
+    assert stuck not in exchange.pending_cancels
+
+    exchange.cancel_rejects.clear()
+    exchange.calls.clear()
+    ladder.update(orders, 99.0, 100.5, 0.01)
+
+    assert exchange.calls == ['cancel_order']
+    assert stuck in exchange.pending_cancels and ladder.orphans == []
+
+
+def test_single_order_endpoints_without_batch_support(plain_exchange):
+    ladder = make_ladder(plain_exchange, levels=2)
+    orders = ladder.update({'bid': None, 'ask': None}, 99.5, 100.5, 0.01)
+    assert plain_exchange.calls == ['create_limit_order'] * 4
+    plain_exchange.calls.clear()
+
+    ladder.update(orders, 99.0, 100.0, 0.01)
+
+    assert sorted(plain_exchange.calls) == ['cancel_order'] * 2 + ['create_limit_order'] * 2
@@ -0,0 +1,261 @@
+"""QuoteManager: keep, place, amend and replace decisions and their fallbacks"""
+
+import threading
+
+import ccxt
+
+from conftest import SYMBOL, FullExchange
+from order_entry import OrderEntry
+from quote_manager import QuoteManager
+
+
+def make_manager(exchange, **kwargs):
+    kwargs.setdefault('tick_tolerance', 1)
+    kwargs.setdefault('size_tolerance', 0.1)
+    kwargs.setdefault('reconcile_interval', 3600.0)
+    return QuoteManager(exchange, SYMBOL, **kwargs)
+
+
+def quote(manager, bid, ask, size=0.01, orders=None):
+    return manager.update(orders if orders is not None else {'bid': None, 'ask': None}, bid, ask, size)
+
+
+def test_places_both_sides_when_nothing_rests(exchange):
+    manager = make_manager(exchange)
+    orders = quote(manager, 99.5, 100.5)
+
+    assert orders['bid']['price'] == 99.5 and orders['ask']['price'] == 100.5
+    assert exchange.calls == ['create_limit_order', 'create_limit_order']
+    assert manager.stats['placed'] == 2
+
+
+def test_keeps_orders_within_tolerance(exchange):
+    manager = make_manager(exchange)
+    orders = quote(manager, 99.5, 100.5)
+    exchange.calls.clear()
+
+    # One tick and 5% of size away: both sides keep their queue position
+    orders = quote(manager, 99.4, 100.6, size=0.0105, orders=orders)
+
+    assert exchange.calls == []
+    assert manager.stats['kept'] == 2
+    assert orders['bid']['price'] == 99.5
+
+
+def test_amends_when_the_venue_supports_it(exchange):
+    manager = make_manager(exchange)
+    orders = quote(manager, 99.5, 100.5)
+    bid_id = orders['bid']['id']
+    exchange.calls.clear()
+
+    orders = quote(manager, 99.0, 100.5, orders=orders)
+
+    assert exchange.calls == ['edit_order']
+    assert orders['bid']['id'] == bid_id and orders['bid']['price'] == 99.0
+    assert manager.stats['amended'] == 1
+
+
+def test_replaces_without_amend_support(plain_exchange):
+    manager = make_manager(plain_exchange)
+    orders = quote(manager, 99.5, 100.5)
+    old_bid = orders['bid']['id']
+    plain_exchange.calls.clear()
+
+    orders = quote(manager, 99.0, 100.5, orders=orders)
+
+    assert sorted(plain_exchange.calls) == ['cancel_order', 'create_limit_order']
+    assert old_bid in plain_exchange.pending_cancels
+    assert orders['bid']['id'] != old_bid and orders['bid']['price'] == 99.0
+    assert manager.stats['replaced'] == 1
+
+
+def test_both_sides_replaced_share_one_batch_cancel():
+    exchange = FullExchange(amend=False)
+    manager = make_manager(exchange)
+    orders = quote(manager, 99.5, 100.5)
+    old_ids = {orders['bid']['id'], orders['ask']['id']}
+    exchange.calls.clear()
+    manager.stats['api_calls'] = manager.stats['updates'] = 0
+
+    orders = quote(manager, 99.0, 101.0, orders=orders)
+
+    assert sorted(exchange.calls) == ['cancel_orders', 'create_limit_order', 'create_limit_order']
+    assert old_ids <= set(exchange.pending_cancels)
+    assert manager.stats['replaced'] == 2 and manager.calls_saved() == 0
+
+
+def test_both_sides_replaced_with_cancel_all(plain_exchange):
+    manager = make_manager(plain_exchange)
+    orders = quote(manager, 99.5, 100.5)
+    plain_exchange.calls.clear()
+
+    orders = quote(manager, 99.0, 101.0, orders=orders)
+
+    assert sorted(plain_exchange.calls) == ['cancel_all_orders', 'create_limit_order', 'create_limit_order']
+    assert orders['bid']['price'] == 99.0 and orders['ask']['price'] == 101.0
+
+
+def test_rejected_order_in_a_batch_cancel_is_retried():
+    exchange = FullExchange(amend=False)
+    manager = make_manager(exchange)
+    orders = quote(manager, 99.5, 100.5)
+    old_bid = orders['bid']['id']
+    exchange.cancel_rejects.add(old_bid)
+
+    quote(manager, 99.0, 101.0, orders=orders)
+
+    assert [order['id'] for order in manager.orphans] == [old_bid]
+    assert orders['ask']['price'] == 101.0
+
+
+def test_failed_amend_falls_back_to_cancel_and_place(exchange):
+    manager = make_manager(exchange)
+    orders = quote(manager, 99.5, 100.5)
+    old_bid = orders['bid']['id']
+    exchange.calls.clear()
+    exchange.edit_error = ccxt.InvalidOrder('amend rejected')
+
+    orders = quote(manager, 99.0, 100.5, orders=orders)
+
+    assert exchange.calls == ['edit_order', 'cancel_order', 'create_limit_order']
+    assert old_bid in exchange.pending_cancels
+    assert orders['bid']['id'] != old_bid and orders['bid']['price'] == 99.0
+
+
+def test_amend_of_a_vanished_order_places_without_cancelling(exchange):
+    manager = make_manager(exchange)
+    orders = quote(manager, 99.5, 100.5)
+    exchange.calls.clear()
+    exchange.edit_error = ccxt.OrderNotFound('filled')
+
+    orders = quote(manager, 99.0, 100.5, orders=orders)
+
+    assert exchange.calls == ['edit_order', 'create_limit_order']
+    assert orders['bid']['price'] == 99.0
+
+
+def test_amend_fallback_keeps_the_order_when_its_cancel_fails(exchange):
+    manager = make_manager(exchange)
+    orders = quote(manager, 99.5, 100.5)
+    old_bid = dict(orders['bid'])
+    exchange.calls.clear()
+    exchange.edit_error = ccxt.InvalidOrder('amend rejected')
+    exchange.cancel_error = ccxt.NetworkError('timeout')
+
+    orders = quote(manager, 99.0, 100.5, orders=orders)
+
+    # No second bid is placed next to one that may still rest
+    assert exchange.calls == ['edit_order', 'cancel_order']
+    assert orders['bid']['id'] == old_bid['id']
+
+
+def test_failed_replace_cancel_is_retried_on_the_next_update(plain_exchange):
+    manager = make_manager(plain_exchange)
+    orders = quote(manager, 99.5, 100.5)
+    old_bid = orders['bid']['id']
+    plain_exchange.cancel_error = ccxt.NetworkError('timeout')
+
+    orders = quote(manager, 99.0, 100.5, orders=orders)
+    assert [order['id'] for order in manager.orphans] == [old_bid]
+
+    plain_exchange.cancel_error = None
+    plain_exchange.calls.clear()
+    quote(manager, 99.0, 100.5, orders=orders)
+
+    assert plain_exchange.calls == ['cancel_order']
+    assert manager.orphans == []
+    assert old_bid in plain_exchange.pending_cancels
+
+
+def test_reconcile_drops_orders_no_longer_open(plain_exchange):
+    manager = make_manager(plain_exchange)
+    orders = quote(manager, 99.5, 100.5)
+    del plain_exchange.orders[orders['ask']['id']]  # Filled or cancelled outside our requests
+
+    manager.reconcile(orders, force=True)
+
+    assert orders['ask'] is None and orders['bid'] is not None
+
+
+class GatedExchange(FullExchange):
+    """Creates (and cancels while ``gate_cancels`` is set) block until the gate opens"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.gate = threading.Event()
+        self.gate_cancels = False
+
+    def create_limit_order(self, symbol, side, amount, price, params=None):
+        self.gate.wait(5)
+        return super().create_limit_order(symbol, side, amount, price, params)
+
+    def cancel_order(self, order_id, symbol=None, params=None):
+        if self.gate_cancels:
+            self.gate.wait(5)
+        return super().cancel_order(order_id, symbol, params)
+
+
+def test_drain_applies_requests_that_missed_the_deadline():
+    exchange = GatedExchange()
+    order_entry = OrderEntry(deadline=0.01)
+    manager = make_manager(exchange, order_entry=order_entry)
+    orders = quote(manager, 99.5, 100.5)
+    assert set(manager.in_flight) == {'bid', 'ask'} and orders['bid'] is None
+
+    exchange.gate.set()
+    manager.drain(orders)
+    order_entry.shutdown()
+
+    assert manager.in_flight == {}
+    assert orders['bid']['price'] == 99.5 and orders['ask']['price'] == 100.5
+
+
+def test_amend_fallback_cancel_is_not_waited_for():
+    exchange = GatedExchange()
+    exchange.gate.set()
+    order_entry = OrderEntry(deadline=0.01)
+    manager = make_manager(exchange, order_entry=order_entry)
+    orders = quote(manager, 99.5, 100.5)
+    old_bid = orders['bid']['id']
+    exchange.gate.clear()
+    exchange.gate_cancels = True
+    exchange.edit_error = ccxt.InvalidOrder('amend rejected')
+
+    orders = quote(manager, 99.0, 100.5, orders=orders)
+
+    # The old bid stays current while its cancel is in flight
+    assert manager.in_flight['bid'].kind == 'cancel'
+    assert orders['bid']['id'] == old_bid
+
+    exchange.gate.set()
+    manager.drain(orders)
+    order_entry.shutdown()
+
+    assert exchange.calls == ['create_limit_order'] * 2 + ['edit_order', 'cancel_order', 'create_limit_order']
+    assert orders['bid']['id'] != old_bid and orders['bid']['price'] == 99.0
+
+
+def test_orphan_cancel_retries_are_not_waited_for(plain_exchange):
+    order_entry = OrderEntry(deadline=0.01)
+    manager = make_manager(plain_exchange)
+    orders = quote(manager, 99.5, 100.5)
+    old_bid = orders['bid']['id']
+    plain_exchange.cancel_error = ccxt.NetworkError('timeout')
+    orders = quote(manager, 99.0, 100.5, orders=orders)
+    plain_exchange.cancel_error = None
+
+    release = threading.Event()
+    manager.order_entry = order_entry
+    for _ in range(order_entry.max_workers):
+        order_entry.submit(release.wait, 5)  # Occupy every worker so the retry queues
+    quote(manager, 99.0, 100.5, orders=orders)
+
+    assert [order['id'] for order in manager.orphans] == [old_bid] and old_bid in manager.orphan_cancels
+
+    release.set()
+    manager.orphan_cancels[old_bid].result(5)
+    quote(manager, 99.0, 100.5, orders=orders)
+    order_entry.shutdown()
+
+    assert manager.orphans == [] and manager.orphan_cancels == {}
+    assert old_bid in plain_exchange.pending_cancels
@@ -0,0 +1,112 @@
+"""RateLimiter: reserve shares, priority ordering and single charging of nested calls"""
+
+import threading
+import time
+
+import ccxt
+import pytest
+
+from rate_limit import CALL_PRIORITY, RESERVE, RateLimiter
+
+
+def make_limiter(capacity=10.0, rate=1.0):
+    """One shared bucket that every scheduled call costs 1 from, at full headroom"""
+    return RateLimiter({'rest': (capacity, rate)}, {name: (('rest', 1),) for name in CALL_PRIORITY},
+                       headroom=1.0)
+
+
+def test_lower_classes_leave_their_reserve_untouched():
+    limiter = make_limiter(capacity=10.0, rate=0.001)
+    bucket = limiter.buckets['rest']
+
+    # Status calls stop at half the bucket, fills at 30%, quotes at 10%; cancels may empty it
+    for _ in range(5):
+        assert limiter.acquire('fetch_balance') < 0.01
+    assert bucket.wait_time(1, RESERVE['status']) > 0
+    assert bucket.wait_time(1, RESERVE['fills']) == 0
+    for _ in range(2):
+        limiter.acquire('fetch_my_trades')
+    assert bucket.wait_time(1, RESERVE['fills']) > 0
+    for _ in range(2):
+        limiter.acquire('create_limit_order')
+    assert bucket.wait_time(1, RESERVE['quote']) > 0
+    limiter.acquire('cancel_order')
+    assert bucket.tokens == pytest.approx(0.0, abs=0.01)
+
+
+def queue_calls(limiter, calls, stagger=0.02):
+    """Start ``calls`` one after the other on threads, each appending its name once it gets budget"""
+    served = []
+    threads = []
+    for call in calls:
+        thread = threading.Thread(target=lambda call=call: (limiter.acquire(call), served.append(call)))
+        thread.start()
+        threads.append(thread)
+        time.sleep(stagger)  # Queue them in a known order
+    for thread in threads:
+        thread.join(5)
+    return served
+
+
+def test_waiting_cancels_go_before_earlier_lower_priority_calls():
+    limiter = make_limiter(capacity=1.0, rate=10.0)
+    limiter.buckets['rest'].tokens = -1.0  # Nothing left for the next ~200ms
+
+    served = queue_calls(limiter, ['fetch_balance', 'fetch_my_trades', 'create_limit_order', 'cancel_order'])
+
+    assert served == ['cancel_order', 'create_limit_order', 'fetch_my_trades', 'fetch_balance']
+
+
+def test_same_priority_is_served_in_arrival_order():
+    limiter = make_limiter(capacity=1.0, rate=20.0)
+    limiter.buckets['rest'].tokens = -1.0
+
+    served = queue_calls(limiter, ['cancel_order', 'cancel_orders', 'cancel_all_orders'])
+
+    assert served == ['cancel_order', 'cancel_orders', 'cancel_all_orders']
+
+
+def test_unscheduled_calls_are_free():
+    limiter = make_limiter(capacity=1.0, rate=0.001)
+    limiter.buckets['rest'].tokens = 0.0
+
+    assert limiter.acquire('fetch_status') == 0.0
+
+
+class Client:
+    """Exchange whose create_limit_order delegates to create_order, as ccxt's does"""
+
+    def __init__(self):
+        self.error = None
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        if self.error is not None:
+            raise self.error
+        return {'id': '1'}
+
+    def create_limit_order(self, symbol, side, amount, price, params=None):
+        return self.create_order(symbol, 'limit', side, amount, price, params)
+
+
+def test_nested_limited_calls_are_charged_once():
+    limiter = make_limiter(capacity=10.0, rate=0.001)
+    client = Client()
+    limiter.instrument(client)
+
+    client.create_limit_order('BTC/USDT:USDT', 'buy', 1.0, 100.0)
+
+    assert limiter.buckets['rest'].tokens == pytest.approx(9.0, abs=0.01)
+    assert client.enableRateLimit is False
+
+
+def test_rate_limit_errors_empty_the_buckets():
+    limiter = make_limiter(capacity=10.0, rate=0.001)
+    client = Client()
+    limiter.instrument(client)
+    client.error = ccxt.RateLimitExceeded('429')
+
+    with pytest.raises(ccxt.RateLimitExceeded):
+        client.create_order('BTC/USDT:USDT', 'limit', 'buy', 1.0, 100.0)
+
+    assert limiter.rejections == 1
+    assert limiter.buckets['rest'].tokens <= 0.0
@@ -0,0 +1,101 @@
+"""VolatilityEstimator agrees with the stdev-over-history calculation it replaced"""
+
+import math
+import random
+import statistics
+
+import pytest
+
+from volatility import VolatilityEstimator
+
+
+def legacy_volatility(prices, lookback):
+    """calculate_volatility as it was: stdev of the last lookback log returns, scaled to one hour"""
+    history = prices[-(lookback + 1):]
+    returns = [math.log(history[i] / history[i - 1]) for i in range(1, len(history))]
+    return max(statistics.stdev(returns) * math.sqrt(3600), 0.001)
+
+
+def random_walk(n, seed=7, start=100.0):
+    rng = random.Random(seed)
+    prices = [start]
+    for _ in range(n - 1):
+        prices.append(prices[-1] * math.exp(rng.gauss(0.0, 0.002)))
+    return prices
+
+
+@pytest.mark.parametrize('lookback', [2, 10, 100])
+def test_window_matches_stdev_on_unit_spacing(lookback):
+    prices = random_walk(3 * lookback + 5)
+    estimator = VolatilityEstimator(lookback=lookback)
+    for i, price in enumerate(prices):
+        estimator.push(price, timestamp=float(i))
+        if i >= 2:
+            assert estimator.volatility == pytest.approx(legacy_volatility(prices[:i + 1], lookback), rel=1e-9)
+
+
+def test_rolling_window_does_not_drift():
+    prices = random_walk(20000, seed=11)
+    estimator = VolatilityEstimator(lookback=50)
+    for i, price in enumerate(prices):
+        estimator.push(price, timestamp=float(i))
+    assert estimator.volatility == pytest.approx(legacy_volatility(prices, 50), rel=1e-9)
+
+
+def test_irregular_spacing_is_normalised():
+    """A return over four seconds counts like a two-second-stdev move, not a one-second one"""
+    estimator = VolatilityEstimator(lookback=10, floor=0.0)
+    times = [0.0, 1.0, 5.0, 6.0, 10.0]
+    prices = [100.0, 101.0, 99.0, 100.0, 102.0]
+    for t, price in zip(times, prices):
+        estimator.push(price, timestamp=t)
+    returns = [math.log(prices[i] / prices[i - 1]) / math.sqrt(times[i] - times[i - 1])
+               for i in range(1, len(prices))]
+    assert estimator.volatility == pytest.approx(statistics.stdev(returns) * math.sqrt(3600), rel=1e-9)
+
+
+def test_initial_until_two_returns_and_floor():
+    estimator = VolatilityEstimator(initial=0.05, floor=0.001)
+    assert estimator.push(100.0, timestamp=0.0) == 0.05
+    assert estimator.push(101.0, timestamp=1.0) == 0.05
+    assert not estimator.ready
+    estimator.push(101.0, timestamp=2.0)
+    estimator.push(101.0, timestamp=3.0)
+    assert estimator.ready
+    flat = VolatilityEstimator(floor=0.001)
+    for i in range(5):
+        flat.push(100.0, timestamp=float(i))
+    assert flat.volatility == 0.001
+
+
+def test_non_positive_prices_are_ignored():
+    estimator = VolatilityEstimator()
+    estimator.push(100.0, timestamp=0.0)
+    estimator.push(0.0, timestamp=1.0)
+    estimator.push(-5.0, timestamp=2.0)
+    assert estimator.last_price == 100.0
+    assert estimator.count == 0
+
+
+def test_state_round_trip():
+    prices = random_walk(60, seed=3)
+    first = VolatilityEstimator(lookback=20)
+    for i, price in enumerate(prices[:40]):
+        first.push(price, timestamp=float(i))
+    second = VolatilityEstimator(lookback=20)
+    second.restore(*first.state())
+    for i, price in enumerate(prices[40:], start=40):
+        assert second.push(price, timestamp=float(i)) == first.push(price, timestamp=float(i))
+
+
+def test_ewma_tracks_squared_returns():
+    estimator = VolatilityEstimator(mode='ewma', halflife=1e-9, floor=0.0)
+    for i, price in enumerate([100.0, 101.0, 100.0, 103.0]):
+        estimator.push(price, timestamp=float(i))
+    # A vanishing half-life keeps only the latest squared return
+    assert estimator.per_second_stdev() == pytest.approx(abs(math.log(103.0 / 100.0)))
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        VolatilityEstimator(mode='garch')
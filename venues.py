@@ -0,0 +1,176 @@
+"""
+Exchange Adapters - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+Per-venue capabilities resolved once at startup, with the fastest cancel path for each
+"""
+
+import itertools
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Any
+
+import ccxt
+
+logger = logging.getLogger(__name__)
+
+
+class Venue:
+    """Capabilities and quirks of one exchange
+
+    Everything ccxt reports in ``exchange.has`` (native cancel-all, batch
+    cancel and create, amend, post-only) is read once by ``resolve`` so the
+    quoting loop only checks booleans. Venues that need extra credentials,
+    a minimum order value or other special handling subclass this and are
+    registered in ``VENUES``; any other ccxt exchange works with the base
+    class.
+    """
+
+    default_type = 'future'  # Perpetual contracts
+    min_notional = 0.0  # Smallest accepted order value in quote currency
+    notional_target = 0.0  # Value to size small orders up to when min_notional applies
+    has: Dict[str, bool] = {}  # Corrections to what ccxt reports in exchange.has
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cancel_all_native = False
+        self.batch_cancel = False
+        self.batch_create = False
+        self.amend = False
+        self.post_only = False
+        # Random prefix keeping our client order IDs apart from those of earlier runs and other processes
+        self.session = int.from_bytes(os.urandom(6), 'big')
+        self._client_ids = itertools.count(1)
+
+    def exchange_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """ccxt constructor options from the ``exchange`` config section"""
+        exchange_config = {
+            'enableRateLimit': True,
+            'options': {'defaultType': self.default_type}
+        }
+        if config.get('api_key'):
+            exchange_config['apiKey'] = config['api_key']
+            exchange_config['secret'] = config['api_secret']
+        if config.get('testnet', False):
+            exchange_config['sandbox'] = True
+        return exchange_config
+
+    def resolve(self, exchange) -> None:
+        """Read the exchange's capabilities once, after the client is created"""
+        has = dict(exchange.has, **self.has)
+        self.cancel_all_native = has.get('cancelAllOrders') is True
+        self.batch_cancel = has.get('cancelOrders') is True
+        self.batch_create = has.get('createOrders') is True
+        self.amend = has.get('editOrder') is True
+        self.post_only = has.get('createPostOnlyOrder') is True
+        logger.info(f"{self.name} capabilities: {self.describe()}")
+
+    def order_params(self, post_only: bool = False) -> Dict[str, Any]:
+        """Extra ccxt params for quote orders"""
+        if post_only and self.post_only:
+            return {'postOnly': True}
+        if post_only:
+            logger.warning(f"{self.name} does not support post-only orders, quoting without it")
+        return {}
+
+    def client_order_id(self) -> str:
+        """A new client order ID; letters and digits only, at most 32 characters, which every venue accepts"""
+        return f"rq{self.session:x}{next(self._client_ids)}"
+
+    def check_order_value(self, side: str, price: float, size: float) -> None:
+        """Warn when an order is below the venue's minimum value"""
+        if self.min_notional and size * price < self.min_notional:
+            logger.warning(f"{side} order value ${size * price:.2f} is below ${self.min_notional:.0f} minimum")
+
+    def cancel_all(self, exchange, symbol: str, cancel_orders: Callable[[List[str]], List[Any]],
+                   order_ids: Optional[List[str]] = None) -> Optional[int]:
+        """Cancel every open order for ``symbol`` in as few requests as the venue allows
+
+        Uses the native cancel-all (one request), else one batch cancel of
+        the open orders, else ``cancel_orders`` to cancel them one by one.
+        The open orders are fetched first unless ``order_ids`` already says
+        which are resting. Returns how many orders were cancelled, or None
+        when the exchange does not say.
+        """
+        if self.cancel_all_native:
+            exchange.cancel_all_orders(symbol)
+            return None
+
+        if order_ids is None:
+            order_ids = [order['id'] for order in exchange.fetch_open_orders(symbol)]
+        if not order_ids:
+            return 0
+        if self.batch_cancel:
+            results = batch_cancel_errors(order_ids, exchange.cancel_orders(order_ids, symbol))
+        else:
+            results = cancel_orders(order_ids)
+
+        failed = 0
+        for order_id, result in zip(order_ids, results):
+            if isinstance(result, Exception):
+                failed += 1
+                logger.warning(f"Could not cancel order {order_id}: {result}")
+        if failed:
+            raise RuntimeError(f"{failed} of {len(order_ids)} orders could not be cancelled")
+        return len(order_ids)
+
+    def describe(self) -> str:
+        """Capability summary for logs"""
+        flags = (('cancel-all', self.cancel_all_native), ('batch cancel', self.batch_cancel),
+                 ('batch create', self.batch_create), ('amend', self.amend), ('post-only', self.post_only))
+        return ', '.join(name for name, supported in flags if supported) or 'single orders only'
+
+
+class Hyperliquid(Venue):
+    """Hyperliquid signs with a wallet key and rejects orders under $10"""
+
+    min_notional = 10.0
+    notional_target = 11.0
+    has = {'createPostOnlyOrder': True}  # ccxt sends postOnly as an ALO order without listing it
+
+    def exchange_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        exchange_config = super().exchange_config(config)
+        if config.get('private_key'):
+            exchange_config['privateKey'] = config['private_key']
+            exchange_config['walletAddress'] = config['wallet_address']
+        return exchange_config
+
+    def client_order_id(self) -> str:
+        """Hyperliquid client order IDs (cloid) are 128-bit hex strings"""
+        return f"0x{self.session:016x}{next(self._client_ids):016x}"
+
+
+def batch_cancel_errors(order_ids: List[str], response: Any) -> List[Optional[Exception]]:
+    """Per-order outcome of a batch cancel that did not raise: None for cancelled, else the error
+
+    Bybit and OKX accept the batch and report failures per order, which ccxt
+    returns as rejected orders (or leaves out). When the response is not a
+    list of orders the exchange does not say, and every order counts as
+    cancelled.
+    """
+    if not isinstance(response, list):
+        return [None] * len(order_ids)
+    by_id = {order.get('id'): order for order in response if isinstance(order, dict) and order.get('id')}
+    positional = len(response) == len(order_ids)
+    errors: List[Optional[Exception]] = []
+    for index, order_id in enumerate(order_ids):
+        order = by_id.get(order_id) or (response[index] if positional else None)
+        if not isinstance(order, dict):
+            errors.append(ccxt.ExchangeError(f"order {order_id} missing from the batch cancel response"))
+        elif order.get('status') == 'rejected':
+            info = order.get('info') or {}
+            errors.append(ccxt.ExchangeError(info.get('sMsg') or info.get('msg') or f"cancel of {order_id} rejected"))
+        else:
+            errors.append(None)
+    return errors
+
+
+# Venues with special handling; every other exchange uses Venue as is
+VENUES = {
+    'hyperliquid': Hyperliquid,
+}
+
+
+def venue_for(name: str) -> Venue:
+    """The adapter for an exchange name"""
+    name = name.lower()
+    return VENUES.get(name, Venue)(name)
@@ -0,0 +1,133 @@
+"""
+Streaming Volatility Estimator - Roboquant
+© 2025 Roboquant - Professional Cryptocurrency Trading Solutions
+O(1) realized volatility shared by the market making bots
+"""
+
+import math
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+class VolatilityEstimator:
+    """Realized volatility with O(1) push and query
+
+    Each log return is normalised by the square root of the time since the
+    previous sample, so irregular tick spacing no longer biases sigma. The
+    result is scaled to ``horizon_seconds`` (one hour by default, matching
+    the hour-based time horizon of the strategy).
+
+    Modes:
+        window - sample stdev over the last ``lookback`` returns (rolling Welford)
+        ewma   - exponentially weighted variance with a half-life in seconds
+    """
+
+    MODES = ('window', 'ewma')
+
+    def __init__(self, lookback: int = 100, mode: str = 'window',
+                 halflife: float = 60.0, horizon_seconds: float = 3600.0,
+                 initial: float = 0.01, floor: float = 0.001,
+                 min_interval: float = 0.001):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown volatility mode: {mode}. Supported modes: {list(self.MODES)}")
+        self.lookback = max(int(lookback), 2)
+        self.mode = mode
+        self.halflife = halflife
+        self.horizon_seconds = horizon_seconds
+        self.initial = initial
+        self.floor = floor
+        self.min_interval = min_interval
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all samples"""
+        self.returns = deque(maxlen=self.lookback)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma_var = 0.0
+        self.last_price: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.volatility = self.initial
+
+    def state(self) -> Tuple[int, float, float, float, Optional[float], Optional[float], float, List[float]]:
+        """Everything needed to resume the estimate in another process (see ``restore``)"""
+        return (self.count, self.mean, self.m2, self.ewma_var, self.last_price, self.last_time,
+                self.volatility, list(self.returns))
+
+    def restore(self, count: int, mean: float, m2: float, ewma_var: float, last_price: Optional[float],
+                last_time: Optional[float], volatility: float, returns: List[float]) -> None:
+        """Continue from a saved ``state()`` of an estimator with the same mode and lookback"""
+        self.returns = deque(returns, maxlen=self.lookback)
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.ewma_var = ewma_var
+        self.last_price = last_price
+        self.last_time = last_time
+        self.volatility = volatility
+
+    @property
+    def ready(self) -> bool:
+        """True once enough returns have been seen to trust the estimate"""
+        return self.count > 1
+
+    def push(self, price: float, timestamp: Optional[float] = None) -> float:
+        """Add a price observation and return the updated volatility"""
+        if timestamp is None:
+            timestamp = time.time()
+        if price <= 0:
+            return self.volatility
+
+        if self.last_price is None:
+            self.last_price = price
+            self.last_time = timestamp
+            return self.volatility
+
+        dt = max(timestamp - self.last_time, self.min_interval)
+        x = math.log(price / self.last_price) / math.sqrt(dt)
+        self.last_price = price
+        self.last_time = timestamp
+
+        if self.mode == 'ewma':
+            self._push_ewma(x, dt)
+        else:
+            self._push_window(x)
+
+        if self.ready:
+            self.volatility = max(self.per_second_stdev() * math.sqrt(self.horizon_seconds), self.floor)
+        return self.volatility
+
+    def per_second_stdev(self) -> float:
+        """Standard deviation of returns per square-root second"""
+        if self.mode == 'ewma':
+            return math.sqrt(max(self.ewma_var, 0.0))
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(max(self.m2 / (self.count - 1), 0.0))
+
+    def _push_window(self, x: float) -> None:
+        """Rolling Welford update, evicting the oldest return once full"""
+        if self.count == self.lookback:
+            old = self.returns[0]
+            self.returns.append(x)
+            new_mean = self.mean + (x - old) / self.count
+            self.m2 += (x - old) * (x - new_mean + old - self.mean)
+            self.mean = new_mean
+        else:
+            self.returns.append(x)
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+
+    def _push_ewma(self, x: float, dt: float) -> None:
+        """Time-decayed variance update around a zero mean"""
+        self.returns.append(x)
+        if self.count == 0:
+            self.ewma_var = x * x
+        else:
+            alpha = 1.0 - math.exp(-dt * math.log(2) / self.halflife)
+            self.ewma_var += alpha * (x * x - self.ewma_var)
+        self.count += 1